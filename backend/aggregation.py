@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+城市价格分层汇总
+城市报价（叶子）按权重汇总为省份价格，省份再汇总为全国价格，层级和权重来自注册表
+（cities.json 中的城市权重，registry.json 中可选的省份权重）：
+
+    全国 ← 省份 ← 城市
+
+每个节点的值是有报价的下级节点的加权平均；省份未配置权重时，以其有报价城市的权重之和
+作为该省在全国中的权重（如城市权重为交易量，全国价格即为全部城市的交易量加权均价）。
+
+汇总数据按整数节点序号存放在数组中（地区节点序号与注册表地区序号相同，城市节点排在其后）：
+    load()    全部报价自下而上一次遍历，计算所有节点
+    update()  单个城市报价变化时，只沿父节点链向上修正各级的加权和，上级不变即停止
+
+城市报价文件 city_prices.json：
+    {"date": "2026-10-19", "products": {"pig": {"河北/石家庄": 12.4, "潍坊": 12.6}, "corn": {...}}}
+城市可写作 "省份/城市"，在全部省份中唯一的城市名也可单独使用；产品可用英文键或中文名。
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional
+
+from registry import Product, Registry, registry
+
+# 默认城市报价文件
+CITY_PRICES_FILE = 'city_prices.json'
+
+
+class Hierarchy:
+    """
+    汇总层级（只读）
+
+    parent[n] 为上级节点序号（根节点为 -1），weight[n] 为节点在上级中的固定权重
+    （None 表示使用其有报价下级的权重之和），order 为子节点先于父节点的遍历顺序
+    """
+
+    def __init__(self, names: List[str], parent: List[int], weight: List[Optional[float]],
+                 leaf_index: Mapping[str, int]):
+        self.names = tuple(names)
+        self.parent = tuple(parent)
+        self.weight = tuple(weight)
+        self.leaf_index = leaf_index
+
+        depth = [0] * len(parent)
+        for node in range(len(parent)):
+            level, ancestor = 0, parent[node]
+            while ancestor >= 0:
+                level += 1
+                ancestor = parent[ancestor]
+                if level > len(parent):
+                    raise ValueError(f"汇总层级存在循环: {names[node]}")
+            depth[node] = level
+        # 按深度从深到浅排列，保证每个节点都在其上级之前
+        self.order = tuple(sorted(range(len(parent)), key=lambda node: -depth[node]))
+
+        has_children = [False] * len(parent)
+        for node in parent:
+            if node >= 0:
+                has_children[node] = True
+        self.is_leaf = tuple(not flag for flag in has_children)
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    @classmethod
+    def from_registry(cls, reg: Registry = registry) -> 'Hierarchy':
+        """地区（全国、省份）在前、城市在后，地区节点序号与注册表地区序号一致"""
+        names = list(reg.region_names)
+        parent = [-1 if region.national else reg.national for region in reg.regions]
+        weight = [region.weight for region in reg.regions]
+
+        offset = len(reg.regions)
+        for city in reg.cities:
+            names.append(city.name)
+            parent.append(city.province)
+            weight.append(city.weight)
+        leaf_index = {name: offset + index for name, index in reg.city_index.items()}
+        return cls(names, parent, weight, leaf_index)
+
+    def lookup_leaf(self, name: str) -> int:
+        try:
+            return self.leaf_index[name]
+        except KeyError:
+            raise ValueError(f"注册表中没有城市: {name}") from None
+
+
+class Rollup:
+    """
+    一个产品的加权汇总状态
+
+    values[n] 为节点的加权平均（无报价时为 None），sums[n]、totals[n] 为其有报价下级的
+    加权和与权重和；update() 利用这两个累加量做增量修正，不需要重新遍历下级节点
+    """
+
+    def __init__(self, hierarchy: Hierarchy):
+        self.hierarchy = hierarchy
+        size = len(hierarchy)
+        self.values: List[Optional[float]] = [None] * size
+        self.sums = [0.0] * size
+        self.totals = [0.0] * size
+
+    def contribution(self, node: int):
+        """节点对上级的 (权重, 加权值)，无报价时为 (0, 0)"""
+        value = self.values[node]
+        if value is None:
+            return 0.0, 0.0
+        weight = self.hierarchy.weight[node]
+        if weight is None:
+            weight = self.totals[node]
+        return weight, weight * value
+
+    def load(self, observations: Mapping[int, float]) -> 'Rollup':
+        """
+        按叶子节点报价 {节点序号: 价格} 一次自下而上计算全部节点
+
+        非叶子节点的报价会被忽略（其值总是由下级汇总得到）
+        """
+        hierarchy = self.hierarchy
+        size = len(hierarchy)
+        values = self.values = [None] * size
+        sums = self.sums = [0.0] * size
+        totals = self.totals = [0.0] * size
+        for node, value in observations.items():
+            if hierarchy.is_leaf[node]:
+                values[node] = value
+
+        parent = hierarchy.parent
+        for node in hierarchy.order:
+            if not hierarchy.is_leaf[node] and totals[node] > 0:
+                values[node] = sums[node] / totals[node]
+            up = parent[node]
+            if up >= 0 and values[node] is not None:
+                weight, weighted = self.contribution(node)
+                sums[up] += weighted
+                totals[up] += weight
+        return self
+
+    def update(self, leaf: int, value: Optional[float]) -> List[int]:
+        """
+        修改单个叶子节点的报价（None 表示撤销报价），只重新计算其上级节点
+
+        Returns:
+            值发生变化的节点序号（从该叶子到最高一级变化的上级）
+        """
+        hierarchy = self.hierarchy
+        if not hierarchy.is_leaf[leaf]:
+            raise ValueError(f"只能修改城市报价: {hierarchy.names[leaf]}")
+
+        old_weight, old_weighted = self.contribution(leaf)
+        self.values[leaf] = value
+        new_weight, new_weighted = self.contribution(leaf)
+        changed = [leaf]
+
+        node = hierarchy.parent[leaf]
+        while node >= 0:
+            before = self.contribution(node)
+            self.sums[node] += new_weighted - old_weighted
+            self.totals[node] += new_weight - old_weight
+            if self.totals[node] > 1e-12:
+                self.values[node] = self.sums[node] / self.totals[node]
+            else:
+                # 下级全部撤销报价，清除累加误差
+                self.values[node] = None
+                self.sums[node] = self.totals[node] = 0.0
+            after = self.contribution(node)
+            if after == before:
+                break
+            changed.append(node)
+            (old_weight, old_weighted), (new_weight, new_weighted) = before, after
+            node = hierarchy.parent[node]
+        return changed
+
+
+def leaf_observations(hierarchy: Hierarchy, prices: Mapping[str, float]) -> Dict[int, float]:
+    """城市名称报价转换为节点序号报价，未注册的城市给出提示后跳过"""
+    observations = {}
+    unknown = []
+    for name, price in prices.items():
+        node = hierarchy.leaf_index.get(name)
+        if node is None:
+            unknown.append(name)
+        elif price is not None:
+            observations[node] = float(price)
+    if unknown:
+        print(f"    ⚠ 注册表中没有以下城市，已跳过: {', '.join(unknown)}")
+    return observations
+
+
+def aggregate_region_prices(product: Product, prices: Mapping[str, float],
+                            hierarchy: Optional[Hierarchy] = None) -> Dict[str, float]:
+    """
+    城市报价汇总为全国和各省份价格（按产品小数位数取整）
+
+    Args:
+        product: 注册表产品
+        prices: {城市: 价格}
+        hierarchy: 汇总层级，默认按注册表构建
+
+    Returns:
+        {地区名称: 价格}，与 generate_province_prices 格式相同；没有城市报价的省份不在结果中
+    """
+    hierarchy = hierarchy or Hierarchy.from_registry()
+    rollup = Rollup(hierarchy).load(leaf_observations(hierarchy, prices))
+    return {
+        hierarchy.names[index]: registry.round_price(product, rollup.values[index])
+        for index in range(len(registry.regions))
+        if rollup.values[index] is not None
+    }
+
+
+def load_city_prices(filename: str = CITY_PRICES_FILE, date: Optional[str] = None) -> Optional[Dict[str, Dict]]:
+    """
+    读取城市报价文件
+
+    Args:
+        filename: 城市报价文件
+        date: 报价日期（默认今天），文件日期不同时不使用
+
+    Returns:
+        {产品英文键: {城市: 价格}}，文件不存在或日期不符时返回 None
+    """
+    if not os.path.exists(filename):
+        return None
+    with open(filename, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    date = date or datetime.now().strftime('%Y-%m-%d')
+    if data.get('date') and data['date'] != date:
+        print(f"⚠ 城市报价日期为 {data['date']}，不是 {date}，不使用城市报价")
+        return None
+
+    city_prices = {}
+    for identifier, prices in data.get('products', {}).items():
+        product = registry.product(identifier)
+        if product is None:
+            print(f"⚠ 注册表中没有产品: {identifier}，已跳过其城市报价")
+            continue
+        city_prices.setdefault(product.key, {}).update(prices)
+    return city_prices
+
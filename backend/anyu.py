@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+安佑行情系统统一命令行入口
+
+    python anyu.py collect                 采集行情数据（data_collector_v2.py）
+    python anyu.py history --format csv    导出历史行情数据（history_exporter.py）
+    python anyu.py report                  生成每周周报（weekly_report_generator.py）
+    python anyu.py serve --port 5001       启动下载服务器（download_server.py）
+    python anyu.py render                  构建静态站点（build_static.py）
+    python anyu.py bench --only startup    性能基准测试（benchmark.py）
+    python anyu.py pipeline                执行数据处理流水线（pipeline.py）
+    python anyu.py schedule                运行定时任务调度器（scheduler.py）
+
+子命令之后的参数原样传给对应脚本，--profile 同样可用（如 anyu.py serve --profile）。
+各子命令的模块只在执行该子命令时导入，openpyxl、pyarrow、压缩库等较慢的依赖
+只由需要它们的子命令加载，定时任务和 CI 调用的启动时间不受其他子命令影响。
+"""
+
+import sys
+from collections import OrderedDict, namedtuple
+
+from profiling import run_with_profiling
+
+# 子命令：loader 导入模块并返回入口函数，profile_mode 为 --profile 的默认分析模式，
+# heavy 为该子命令启动时允许加载的较慢依赖
+Command = namedtuple('Command', ['loader', 'help', 'profile_mode', 'heavy'])
+
+# 较慢的依赖：除 Command.heavy 中列出的以外，子命令启动时都不应加载（由基准测试检查）
+HEAVY_MODULES = ('openpyxl', 'pyarrow', 'brotli', 'gzip', 'zipfile', 'multiprocessing',
+                 'concurrent.futures.process', 'http.server', 'inspect')
+
+
+def load_collect():
+    import random
+    from data_collector_v2 import main
+
+    # 与直接运行 data_collector_v2.py 一致，固定随机种子，确保数据稳定
+    random.seed(42)
+    return main
+
+
+def load_history():
+    from history_exporter import main
+    return main
+
+
+def load_report():
+    from weekly_report_generator import main
+    return main
+
+
+def load_serve():
+    from download_server import main
+    return main
+
+
+def load_render():
+    from build_static import main
+    return main
+
+
+def load_bench():
+    from benchmark import main
+    return main
+
+
+def load_pipeline():
+    from pipeline import main
+    return main
+
+
+def load_schedule():
+    from scheduler import run_scheduler
+    return run_scheduler
+
+
+COMMANDS = OrderedDict([
+    ('collect', Command(load_collect, '采集行情数据', 'cprofile', ())),
+    ('history', Command(load_history, '导出历史行情数据（CSV / Parquet / Arrow）', 'cprofile', ())),
+    ('report', Command(load_report, '生成每周周报（Excel、TXT 及省份周报）', 'cprofile', ())),
+    ('serve', Command(load_serve, '启动文档下载服务器', 'sample',
+                       ('brotli', 'gzip', 'zipfile', 'http.server'))),
+    ('render', Command(load_render, '构建静态站点（预渲染、内容哈希、预压缩）', 'cprofile', ('brotli', 'gzip'))),
+    ('bench', Command(load_bench, '性能基准测试（含启动时间预算检查）', 'cprofile', ())),
+    ('pipeline', Command(load_pipeline, '执行数据处理流水线', 'cprofile', ())),
+    ('schedule', Command(load_schedule, '运行定时任务调度器', 'sample', ())),
+])
+
+
+def usage() -> str:
+    lines = ["用法: anyu.py <子命令> [参数...]", "", "子命令:"]
+    for name, command in COMMANDS.items():
+        lines.append(f"  {name:<10}{command.help}")
+    lines += ["", "查看子命令的参数: anyu.py <子命令> --help（collect、report、schedule 没有参数）"]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """主函数"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return
+
+    name, args = argv[0], argv[1:]
+    command = COMMANDS.get(name)
+    if command is None:
+        print(f"未知的子命令: {name}\n", file=sys.stderr)
+        print(usage(), file=sys.stderr)
+        raise SystemExit(2)
+
+    # 子命令脚本自行解析 sys.argv，程序名显示为 "anyu.py <子命令>"
+    sys.argv = [f"anyu.py {name}"] + args
+    entry = command.loader()
+    return run_with_profiling(entry, f"anyu-{name}", default_mode=command.profile_mode)
+
+
+if __name__ == "__main__":
+    main()
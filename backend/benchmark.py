@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准测试
+按可配置的规模（年数、产品数、地区数）生成模拟历史数据，
+测量历史追加、日内快照、周均价计算、省份数据生成、城市报价汇总、Excel/TXT 周报生成、前端渲染和JSON序列化的耗时；
+结果保存为JSON基线，之后的运行与基线比较，超过阈值即视为性能回退
+
+startup.* 测量 anyu.py 各子命令的启动耗时（相对空解释器启动），超出预算或启动时加载了
+不需要的较慢依赖（如 openpyxl）同样视为失败：
+
+    python anyu.py bench --only startup --startup-budget 0.15
+
+    python benchmark.py --years 3 --save-baseline benchmark_baseline.json
+    python benchmark.py --years 3 --compare benchmark_baseline.json --threshold 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+# 城市报价汇总测试的模拟城市数量
+DEFAULT_CITIES = 3000
+
+# 默认结果文件
+RESULTS_FILE = 'benchmark_results.json'
+
+# 默认回退阈值（比基线慢 20% 以上视为回退）
+DEFAULT_THRESHOLD = 0.2
+
+# 单次计时的最短时间（秒），耗时很短的操作在一次计时内重复调用多次
+MIN_SAMPLE_SECONDS = 0.05
+
+# 子命令启动耗时预算（秒，扣除空解释器的启动耗时）
+STARTUP_BUDGET_SECONDS = 0.15
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 前端页面模板
+INDEX_HTML = os.path.join(BACKEND_DIR, '..', 'netlify-deploy', 'index.html')
+
+# 启动测试在子进程中执行的代码：导入 anyu 并加载子命令的入口模块（不执行），输出已加载的较慢依赖
+STARTUP_SCRIPT = (
+    "import json, sys, anyu\n"
+    "if {command!r}: anyu.COMMANDS[{command!r}].loader()\n"
+    "print(json.dumps([m for m in anyu.HEAVY_MODULES if m in sys.modules]))\n"
+)
+
+# 模拟数据中各产品的基准价格
+BASE_PRICES = {'生猪': 12.5, '仔猪': 20.4, '鸡蛋': 7.0, '淘汰鸡': 10.5, '玉米': 2320, '豆粕': 3245}
+
+
+def product_names(count: int) -> List[str]:
+    """模拟产品列表（前6个为实际产品，超出部分为虚拟产品）"""
+    names = list(BASE_PRICES)[:count]
+    names += [f"产品{i + 1}" for i in range(len(names), count)]
+    return names
+
+
+def region_names(count: Optional[int]) -> List[str]:
+    """模拟地区列表（默认使用注册表中的省份，指定数量时补充虚拟城市）"""
+    from registry import registry
+
+    provinces = [registry.regions[index].name for index in registry.provinces]
+    if count is None:
+        return provinces
+    return (provinces + [f"城市{i:04d}" for i in range(len(provinces), count)])[:count]
+
+
+def synthetic_registry(products: int, regions: Optional[int]):
+    """
+    按测试规模构建注册表：产品和地区与 product_names、region_names 一致，
+    虚拟产品使用默认配置，虚拟地区以前后相邻的地区为邻省，
+    使周均价、省份数据和周报等按注册表遍历的测试随规模变化
+    """
+    from registry import REGISTRY_FILE, Registry
+
+    with open(REGISTRY_FILE, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config.pop('cities_file', None)
+
+    real_products = {item['name']: item for item in config['products']}
+    config['products'] = [
+        real_products.get(name) or {'key': f"product{index + 1}", 'name': name, 'unit': '元/公斤', 'decimal': 2,
+                                    'default_price': BASE_PRICES.get(name, 100.0)}
+        for index, name in enumerate(product_names(products))
+    ]
+
+    names = region_names(regions)
+    kept = set(names)
+    real_regions = {item['name']: item for item in config['regions']}
+    region_config = [item for item in config['regions'] if item.get('national')]
+    for position, name in enumerate(names):
+        item = dict(real_regions.get(name) or {'name': name})
+        if name in real_regions:
+            item['neighbors'] = [neighbor for neighbor in item.get('neighbors', ()) if neighbor in kept]
+        else:
+            item['neighbors'] = [names[i] for i in (position - 1, position + 1) if 0 <= i < len(names)]
+        region_config.append(item)
+    config['regions'] = region_config
+    config['report_order'] = ([name for name in config.get('report_order', []) if name in kept or
+                               real_regions.get(name, {}).get('national')] +
+                              [name for name in names if name not in real_regions])
+    for item in config['products']:
+        if 'variations' in item:
+            item['variations'] = {name: bounds for name, bounds in item['variations'].items() if name in kept}
+    return Registry(config)
+
+
+def generate_history(days: int, products: List[str], regions: List[str], seed: int = 42,
+                     end: Optional[datetime] = None) -> Dict:
+    """
+    生成模拟历史数据（格式与 market_history.json 相同，每天包含各地区价格）
+
+    价格按随机游走变化，保证周均价、涨跌等计算与真实数据的分布相近。
+    """
+    rng = random.Random(seed)
+    end = end or datetime.now()
+    prices = {name: BASE_PRICES.get(name, 100.0) for name in products}
+    offsets = {(name, region): rng.uniform(0.95, 1.05) for name in products for region in regions}
+
+    history = {}
+    for i in range(days):
+        date = (end - timedelta(days=days - 1 - i)).strftime('%Y-%m-%d')
+        day = {'date': date, 'timestamp': f"{date}T09:00:00", 'products': {}}
+        for name in products:
+            prices[name] = round(prices[name] * rng.uniform(0.98, 1.02), 2)
+            day['products'][name] = {
+                'price': prices[name],
+                'sources': [{'source': '模拟数据', 'price': prices[name], 'date': date}],
+                'regions': {region: {'price': round(prices[name] * offsets[(name, region)], 2)}
+                            for region in regions}
+            }
+        history[date] = day
+    return history
+
+
+def synthetic_hierarchy(cities: int):
+    """在注册表各省份下平均分配模拟城市（权重随机），构建汇总层级"""
+    from aggregation import Hierarchy
+    from registry import REGISTRY_FILE, Registry, registry
+
+    with open(REGISTRY_FILE, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    rng = random.Random(42)
+    provinces = [registry.regions[index].name for index in registry.provinces]
+    city_config = {name: {} for name in provinces}
+    for index in range(cities):
+        city_config[provinces[index % len(provinces)]][f"城市{index + 1}"] = rng.uniform(0.5, 2.0)
+    return Hierarchy.from_registry(Registry(config, city_config))
+
+
+def market_snapshot(history: Dict, reg=None) -> Dict:
+    """以历史最后两天构造 market.json 格式的最新行情"""
+    from registry import registry
+
+    keys = {product.name: product.key for product in (reg or registry).products}
+    dates = sorted(history)
+    today, yesterday = history[dates[-1]], history[dates[-2]] if len(dates) > 1 else history[dates[-1]]
+    snapshot = {'update_date': dates[-1], 'update_time': '09:00', 'data_source': ['模拟数据'], 'products': {}}
+    for name, info in today['products'].items():
+        previous = yesterday['products'][name]
+        change = round(info['price'] - previous['price'], 2)
+        snapshot['products'][keys.get(name, name)] = {
+            'name': name,
+            'unit': '元/公斤',
+            'national_price': info['price'],
+            'national_change': change,
+            'national_change_ratio': round(change / previous['price'] * 100, 2) if previous['price'] else 0,
+            'regions': {
+                region: {'price': value['price'],
+                         'change': round(value['price'] - previous['regions'][region]['price'], 2)}
+                for region, value in info['regions'].items()
+            }
+        }
+    return snapshot
+
+
+def startup_argv(command: Optional[str]) -> List[str]:
+    """启动测试的命令行：command 为 None 时只启动空解释器，空字符串时只导入 anyu"""
+    if command is None:
+        return [sys.executable, '-c', 'pass']
+    return [sys.executable, '-c', STARTUP_SCRIPT.format(command=command)]
+
+
+def run_startup(command: Optional[str]) -> str:
+    """在新进程中启动一次（在当前目录中执行，避免 scheduler.log 等文件写入代码目录），返回子进程输出"""
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    process = subprocess.run(startup_argv(command), env=env, stdout=subprocess.PIPE,
+                             stderr=subprocess.DEVNULL, check=True)
+    return process.stdout.decode('utf-8')
+
+
+def check_startup(results: Dict, budget: float = STARTUP_BUDGET_SECONDS) -> List[Dict]:
+    """
+    检查各子命令的启动耗时（最快一次减去空解释器启动耗时）是否超出预算，
+    以及启动时是否加载了该子命令不需要的较慢依赖
+
+    Returns:
+        [{'name', 'overhead', 'unexpected', 'failed'}]
+    """
+    from anyu import COMMANDS
+
+    interpreter = results.get('startup.python')
+    if interpreter is None or 'error' in interpreter:
+        return []
+
+    checks = []
+    for name, result in results.items():
+        if not name.startswith('startup.') or name == 'startup.python' or 'error' in result:
+            continue
+        command = COMMANDS.get(name.split('.', 1)[1])
+        allowed = command.heavy if command is not None else ()
+        unexpected = [module for module in result.get('heavy_modules', []) if module not in allowed]
+        overhead = result['min'] - interpreter['min']
+        checks.append({
+            'name': name,
+            'overhead': overhead,
+            'unexpected': unexpected,
+            'failed': overhead > budget or bool(unexpected)
+        })
+    return checks
+
+
+def calibrate(func: Callable[[], None]) -> int:
+    """确定每次计时内的调用次数，使单次计时不短于 MIN_SAMPLE_SECONDS，降低计时噪声"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= MIN_SAMPLE_SECONDS or number >= 1 << 20:
+            return number
+        number *= 4
+
+
+def measure(func: Callable[[], None], repeats: int, setup: Optional[Callable[[], None]] = None) -> Dict:
+    """
+    多次执行并统计单次调用耗时（函数输出被丢弃）
+
+    有 setup 的测试（每次执行前需要重置状态）每次计时只调用一次，setup 不计入耗时。
+    """
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        number = 1 if setup is not None else calibrate(func)
+        for _ in range(repeats):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            timings.append((time.perf_counter() - start) / number)
+    return {
+        'median': statistics.median(timings),
+        'min': min(timings),
+        'max': max(timings),
+        'repeats': repeats,
+        'number': number
+    }
+
+
+def run_benchmarks(years: float, products: int, regions: Optional[int], repeats: int,
+                   only: Optional[List[str]] = None, cities: int = DEFAULT_CITIES) -> Dict:
+    """
+    执行全部基准测试
+
+    Returns:
+        {'meta': {...}, 'results': {名称: {'median', 'min', 'max', 'repeats'}}}
+    """
+    from aggregation import Rollup
+    from anyu import COMMANDS
+    from data_collector import append_to_history
+    from data_collector_v2 import generate_province_prices
+    from snapshots import SnapshotStore
+    from update_frontend import PageTemplate, normalize_market_data
+    from weekly_report_generator import (
+        calculate_week_average, calculate_weekly_change, generate_excel_report, generate_mock_provincial_data,
+        generate_province_report_set, generate_txt_report, get_week_data, get_week_range
+    )
+
+    # 按规模构建的注册表，传给所有按注册表遍历产品、地区的函数
+    reg = synthetic_registry(products, regions)
+    names = list(reg.product_names)
+    region_list = [reg.regions[index].name for index in reg.provinces]
+    days = int(years * 365)
+    history = generate_history(days, names, region_list)
+    history_json = json.dumps(history, ensure_ascii=False, indent=2)
+    snapshot = market_snapshot(history, reg)
+
+    last_date = datetime.strptime(max(history), '%Y-%m-%d')
+    week_start, week_end = get_week_range(last_date)
+    current_avg = calculate_week_average(get_week_data(history, week_start, week_end), reg)
+    previous_avg = calculate_week_average(
+        get_week_data(history, week_start - timedelta(days=7), week_end - timedelta(days=7)), reg)
+    change_info = calculate_weekly_change(current_avg, previous_avg)
+    provincial_data = generate_mock_provincial_data(current_avg, change_info, reg)
+    province = region_list[0]
+
+    with open(INDEX_HTML, 'r', encoding='utf-8') as f:
+        index_html = f.read()
+    template = PageTemplate(index_html)
+
+    workdir = tempfile.TemporaryDirectory(prefix='anyu-bench-')
+    history_file = os.path.join(workdir.name, 'market_history.json')
+    record = {'date': last_date.strftime('%Y-%m-%d'),
+              'products': {name: {'price': BASE_PRICES.get(name, 100.0), 'sources': []} for name in names}}
+
+    def write_history_file():
+        with open(history_file, 'w', encoding='utf-8') as f:
+            f.write(history_json)
+
+    # 当天已有 8 个快照（约每小时一次）时再保存一个快照
+    snapshot_dir = os.path.join(workdir.name, 'snapshots')
+    store = SnapshotStore(snapshot_dir, os.path.join(workdir.name, 'market.json'))
+
+    def prepare_snapshots():
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        store._index = None
+        for hour in range(9, 17):
+            store.add(dict(snapshot, update_time=f"{hour:02d}:00"))
+
+    def aggregate_all_weeks():
+        start = datetime.strptime(min(history), '%Y-%m-%d')
+        while start <= last_date:
+            calculate_week_average(get_week_data(history, *get_week_range(start)), reg)
+            start += timedelta(days=7)
+
+    hierarchy = synthetic_hierarchy(cities)
+    rng = random.Random(42)
+    leaves = [node for node in range(len(hierarchy)) if hierarchy.is_leaf[node]]
+    observations = {node: rng.uniform(11.0, 14.0) for node in leaves}
+    rollup = Rollup(hierarchy).load(observations)
+    updates = [(rng.choice(leaves), rng.uniform(11.0, 14.0)) for _ in range(1000)]
+
+    def update_cities():
+        for leaf, value in updates:
+            rollup.update(leaf, value)
+
+    def province_prices():
+        for product in reg.products:
+            generate_province_prices(BASE_PRICES.get(product.name, product.default_price), product.key, reg)
+
+    benchmarks = {
+        'history.append': (lambda: append_to_history(record, history_file), write_history_file),
+        'snapshots.add': (lambda: store.add(dict(snapshot, update_time='17:00')), prepare_snapshots),
+        'snapshots.latest': (store.latest, prepare_snapshots),
+        'history.week_average': (lambda: calculate_week_average(get_week_data(history, week_start, week_end), reg),
+                                 None),
+        'history.all_weeks': (aggregate_all_weeks, None),
+        'provinces.mock_weekly': (lambda: generate_mock_provincial_data(current_avg, change_info, reg), None),
+        'provinces.daily_prices': (province_prices, None),
+        'aggregate.load': (lambda: Rollup(hierarchy).load(observations), None),
+        'aggregate.update_1000': (update_cities, None),
+        'report.excel': (lambda: generate_excel_report(provincial_data, week_start, week_end, reg=reg), None),
+        'report.txt': (lambda: generate_txt_report(provincial_data, week_start, week_end,
+                                                   current_avg, change_info, reg), None),
+        'report.province': (lambda: generate_province_report_set(province, provincial_data, week_start, week_end,
+                                                                 reg), None),
+        'frontend.compile': (lambda: PageTemplate(index_html), None),
+        'frontend.render': (lambda: template.render(normalize_market_data(snapshot)), None),
+        'json.dumps_history': (lambda: json.dumps(history, ensure_ascii=False, indent=2), None),
+        'json.loads_history': (lambda: json.loads(history_json), None),
+        'json.dumps_market': (lambda: json.dumps(snapshot, ensure_ascii=False, indent=2), None),
+        'startup.python': (lambda: run_startup(None), None),
+        'startup.cli': (lambda: run_startup(''), None),
+    }
+    for command in COMMANDS:
+        benchmarks[f'startup.{command}'] = (lambda command=command: run_startup(command), None)
+
+    results = {}
+    cwd = os.getcwd()
+    os.chdir(workdir.name)
+    try:
+        for name, (func, setup) in benchmarks.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            try:
+                results[name] = measure(func, repeats, setup)
+                if name.startswith('startup.') and name != 'startup.python':
+                    results[name]['heavy_modules'] = json.loads(func())
+            except Exception as e:
+                # 单项失败不影响其他测试，失败信息记录在结果中
+                results[name] = {'error': f"{type(e).__name__}: {e}"}
+                print(f"  {name:<24} ❌ {results[name]['error']}")
+                continue
+            print(f"  {name:<24} {results[name]['median'] * 1000:10.2f}ms (最快 {results[name]['min'] * 1000:.2f}ms)")
+    finally:
+        os.chdir(cwd)
+        workdir.cleanup()
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': {'years': years, 'days': days, 'products': len(names), 'regions': len(region_list),
+                      'cities': cities},
+            'history_bytes': len(history_json.encode('utf-8')),
+            'repeats': repeats
+        },
+        'results': results
+    }
+
+
+def compare_results(current: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """
+    与基线比较（按最快一次的耗时，受系统负载干扰最小）
+
+    Returns:
+        每项的比较结果 [{'name', 'baseline', 'current', 'ratio', 'regression'}]
+    """
+    comparisons = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if 'error' in result or base is None or 'error' in base or base['min'] <= 0:
+            continue
+        ratio = result['min'] / base['min']
+        comparisons.append({
+            'name': name,
+            'baseline': base['min'],
+            'current': result['min'],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold
+        })
+    return comparisons
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='性能基准测试')
+    parser.add_argument('--years', type=float, default=1.0, help='模拟历史数据的年数')
+    parser.add_argument('--products', type=int, default=6, help='产品数量')
+    parser.add_argument('--regions', type=int, help='地区数量（默认使用注册表中的省份）')
+    parser.add_argument('--cities', type=int, default=DEFAULT_CITIES, help='城市报价汇总测试的城市数量')
+    parser.add_argument('--repeats', type=int, default=5, help='每项测试的重复次数')
+    parser.add_argument('--only', nargs='*', help='只运行名称以指定前缀开头的测试，如 history report')
+    parser.add_argument('--output', default=RESULTS_FILE, help='结果文件')
+    parser.add_argument('--save-baseline', metavar='FILE', help='同时保存为基线文件')
+    parser.add_argument('--compare', metavar='FILE', help='与基线文件比较')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='回退阈值（0.2 表示慢 20%%）')
+    parser.add_argument('--startup-budget', type=float, default=STARTUP_BUDGET_SECONDS,
+                        help=f'子命令启动耗时预算（秒，默认 {STARTUP_BUDGET_SECONDS}）')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("性能基准测试")
+    print("=" * 60)
+    print(f"规模: {args.years} 年，{args.products} 个产品，"
+          f"{args.regions if args.regions else len(region_names(None))} 个地区，每项重复 {args.repeats} 次")
+    print()
+
+    current = run_benchmarks(args.years, args.products, args.regions, args.repeats, args.only, args.cities)
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存: {path}")
+
+    failed = False
+    startup_checks = check_startup(current['results'], args.startup_budget)
+    if startup_checks:
+        print()
+        print("=" * 60)
+        print(f"启动时间预算: {args.startup_budget * 1000:.0f}ms（扣除解释器启动）")
+        print("=" * 60)
+        for item in startup_checks:
+            mark = '❌' if item['failed'] else '✅'
+            unexpected = f"  启动时加载了: {', '.join(item['unexpected'])}" if item['unexpected'] else ''
+            print(f"  {item['name']:<24} {item['overhead'] * 1000:10.2f}ms {mark}{unexpected}")
+        over = [item['name'] for item in startup_checks if item['failed']]
+        if over:
+            print(f"\n❌ {len(over)} 项超出启动预算: {', '.join(over)}")
+            failed = True
+
+    if not args.compare:
+        if failed:
+            sys.exit(1)
+        return
+
+    with open(args.compare, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['meta'].get('scale') != current['meta']['scale']:
+        print(f"⚠️  基线规模 {baseline['meta'].get('scale')} 与本次 {current['meta']['scale']} 不同，比较结果仅供参考")
+
+    print()
+    print("=" * 60)
+    print(f"与基线比较: {args.compare}（阈值 +{args.threshold * 100:.0f}%）")
+    print("=" * 60)
+    comparisons = compare_results(current, baseline, args.threshold)
+    for item in comparisons:
+        mark = '❌ 回退' if item['regression'] else '✅'
+        print(f"  {item['name']:<24} {item['baseline'] * 1000:10.2f}ms → {item['current'] * 1000:10.2f}ms "
+              f"({(item['ratio'] - 1) * 100:+.1f}%) {mark}")
+
+    regressions = [item['name'] for item in comparisons if item['regression']]
+    if regressions:
+        print(f"\n❌ {len(regressions)} 项性能回退: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n✅ 未发现性能回退")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
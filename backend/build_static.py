@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态站点预构建脚本
+用当前行情数据预渲染 netlify-deploy 下的页面，页面数据和 data-loader.js 输出为带内容哈希的
+JS 资源（长期缓存），页面通过 <script defer> 直接引用，不再运行时请求 market.json；
+其余静态文件原样复制。生成预压缩文件（.gz/.br）、响应头配置和构建清单，
+只重新写入内容发生变化的文件。
+
+Netlify 按 netlify-deploy/netlify.toml 在部署时运行本脚本并发布 dist 目录
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from tracing import traced
+from update_frontend import PageTemplate, normalize_market_data
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 需要构建的页面：(页面文件, 数据文件候选, 数据资源赋值的全局变量名, 是否预渲染价格)
+PAGES = [
+    ('index.html', ('market.json', 'market_data.json'), '__MARKET_DATA__', True),
+    ('weekly-report.html', ('weekly_report_index.json',), '__WEEKLY_REPORT_INDEX__', False),
+]
+
+# 需要生成内容哈希版本的脚本（相对页面目录），页面中对它们的引用改写为哈希路径
+SCRIPT_ASSETS = ['data-loader.js']
+
+# 带哈希资源的输出子目录
+ASSET_DIR = 'assets'
+
+# 不复制到输出目录的源文件
+SKIP_FILES = {'netlify.toml'}
+
+# 构建清单文件
+MANIFEST_FILENAME = 'manifest.json'
+
+# Netlify 响应头配置文件
+HEADERS_FILENAME = '_headers'
+
+# 需要预压缩的文件类型
+PRECOMPRESS_EXTENSIONS = ('.html', '.json', '.js')
+
+# 缓存策略：带哈希的资源内容不会变化，可长期缓存；页面每次都需重新验证
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+PAGE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+
+
+def content_hash(content: bytes) -> str:
+    """内容的 SHA-256 摘要"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def hashed_name(filename: str, content: bytes) -> str:
+    """带内容哈希的资源文件名，如 assets/market.3f2a9c01d4.js"""
+    stem, ext = os.path.splitext(os.path.basename(filename))
+    return f"{ASSET_DIR}/{stem}.{content_hash(content)[:10]}{ext}"
+
+
+def load_snapshot(data_dir: str, candidates: Tuple[str, ...],
+                  snapshots: Optional[Dict[str, Dict]] = None) -> Tuple[Optional[str], Optional[Dict]]:
+    """按顺序查找第一个可用的数据（优先使用调用方传入的内存数据，其次是数据文件）"""
+    for filename in candidates:
+        if snapshots and filename in snapshots:
+            return filename, snapshots[filename]
+    for filename in candidates:
+        path = os.path.join(data_dir, filename)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return filename, json.load(f)
+    return None, None
+
+
+def data_script(variable: str, data: Dict) -> bytes:
+    """数据资源的内容：把数据赋给页面脚本读取的全局变量"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'window.{variable}={payload};\n'.encode('utf-8')
+
+
+def script_tag(relpath: str) -> str:
+    """
+    引用资源的 script 标签
+
+    defer 脚本不阻塞页面渲染，并在 DOMContentLoaded 之前执行，页面脚本读取数据时已可用
+    """
+    return f'<script defer src="{relpath}"></script>\n'
+
+
+def rewrite_references(html_content: str, assets: Dict[str, str]) -> str:
+    """页面中对源脚本的引用（src="data-loader.js"）改写为哈希路径"""
+    for filename, relpath in assets.items():
+        for reference in (filename, f'./{filename}'):
+            html_content = html_content.replace(f'src="{reference}"', f'src="{relpath}"')
+    return html_content
+
+
+def static_files(source_dir: str, output_dir: str, skip: Set[str]) -> List[str]:
+    """源目录中需要原样复制的文件（相对路径），跳过输出目录、隐藏文件和 skip 中的文件"""
+    output_dir = os.path.abspath(output_dir)
+    files = []
+    for root, dirs, names in os.walk(source_dir):
+        dirs[:] = sorted(name for name in dirs
+                         if not name.startswith('.') and os.path.abspath(os.path.join(root, name)) != output_dir)
+        for name in sorted(names):
+            relpath = os.path.relpath(os.path.join(root, name), source_dir).replace(os.sep, '/')
+            if not name.startswith('.') and relpath not in skip:
+                files.append(relpath)
+    return files
+
+
+def inject_head(html_content: str, snippet: str) -> str:
+    """在 </head> 前插入内容"""
+    position = html_content.find('</head>')
+    if position < 0:
+        return snippet + html_content
+    return html_content[:position] + snippet + html_content[position:]
+
+
+def compress_variants(content: bytes) -> Dict[str, bytes]:
+    """预压缩版本（gzip 固定 mtime，保证相同内容输出相同字节）"""
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    return variants
+
+
+def write_atomic(path: str, content: bytes):
+    """先写入临时文件再替换，避免部署时读到写了一半的文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class StaticBuild:
+    """
+    一次静态构建
+
+    所有输出先登记到 outputs，最后统一与上次的清单比较：
+    内容摘要相同且文件（及压缩版本）仍在的跳过，不同的重新写入并压缩，
+    上次存在而本次不再生成的文件（如旧哈希版本的资源）被删除。
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.outputs: Dict[str, bytes] = {}
+        self.previous = self.load_manifest()
+
+    def load_manifest(self) -> Dict:
+        """读取上次构建的清单"""
+        path = os.path.join(self.output_dir, MANIFEST_FILENAME)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'assets': {}, 'files': {}}
+
+    def add(self, relpath: str, content: bytes):
+        """登记一个输出文件"""
+        self.outputs[relpath] = content
+
+    def add_asset(self, filename: str, content: bytes) -> str:
+        """登记带内容哈希的资源，返回其相对路径"""
+        relpath = hashed_name(filename, content)
+        self.add(relpath, content)
+        return relpath
+
+    def is_current(self, relpath: str, digest: str, encodings: List[str]) -> bool:
+        """上次构建的文件是否与本次内容一致且仍完整存在"""
+        entry = self.previous.get('files', {}).get(relpath)
+        if not entry or entry.get('sha256') != digest or entry.get('encodings') != encodings:
+            return False
+        path = os.path.join(self.output_dir, relpath)
+        return os.path.exists(path) and all(os.path.exists(path + suffix) for suffix in encodings)
+
+    def emit(self, relpath: str, content: bytes) -> Tuple[Dict, bool]:
+        """写入单个文件及其压缩版本，返回 (清单条目, 是否写入)"""
+        digest = content_hash(content)
+        compressible = relpath.endswith(PRECOMPRESS_EXTENSIONS)
+        encodings = ['.gz', '.br'] if brotli is not None else ['.gz']
+        encodings = encodings if compressible else []
+        entry = {'sha256': digest, 'size': len(content), 'encodings': encodings}
+
+        if self.is_current(relpath, digest, encodings):
+            return entry, False
+
+        path = os.path.join(self.output_dir, relpath)
+        write_atomic(path, content)
+        if compressible:
+            for suffix, compressed in compress_variants(content).items():
+                write_atomic(path + suffix, compressed)
+        return entry, True
+
+    def remove_stale(self, current: Dict[str, Dict]) -> List[str]:
+        """删除上次生成而本次不再需要的文件"""
+        removed = []
+        for relpath, entry in self.previous.get('files', {}).items():
+            if relpath in current:
+                continue
+            path = os.path.join(self.output_dir, relpath)
+            for suffix in [''] + entry.get('encodings', []):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            removed.append(relpath)
+        return removed
+
+    def finish(self, assets: Dict[str, str]) -> Dict[str, List[str]]:
+        """写出所有变化的文件、响应头配置和清单"""
+        self.add(HEADERS_FILENAME, render_headers().encode('utf-8'))
+
+        files = {}
+        written, unchanged = [], []
+        for relpath in sorted(self.outputs):
+            files[relpath], changed = self.emit(relpath, self.outputs[relpath])
+            (written if changed else unchanged).append(relpath)
+
+        removed = self.remove_stale(files)
+
+        manifest = {'assets': assets, 'files': files}
+        if manifest != self.previous or written or removed:
+            content = json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True).encode('utf-8')
+            write_atomic(os.path.join(self.output_dir, MANIFEST_FILENAME), content)
+
+        return {'written': written, 'unchanged': unchanged, 'removed': removed}
+
+
+def render_headers() -> str:
+    """Netlify _headers：哈希资源长期缓存，页面和清单每次重新验证"""
+    return (
+        f"/{ASSET_DIR}/*\n"
+        f"  Cache-Control: {ASSET_CACHE_CONTROL}\n"
+        f"/*.html\n"
+        f"  Cache-Control: {PAGE_CACHE_CONTROL}\n"
+        f"/\n"
+        f"  Cache-Control: {PAGE_CACHE_CONTROL}\n"
+        f"/{MANIFEST_FILENAME}\n"
+        f"  Cache-Control: {PAGE_CACHE_CONTROL}\n"
+    )
+
+
+@traced('render.site', args=('output_dir',))
+def build_site(source_dir: str, data_dir: str, output_dir: str,
+               snapshots: Optional[Dict[str, Dict]] = None) -> Dict[str, List[str]]:
+    """
+    构建静态站点
+
+    Args:
+        source_dir: 页面源文件目录（netlify-deploy）
+        data_dir: 数据文件目录（market.json、weekly_report_index.json 所在目录）
+        output_dir: 输出目录
+        snapshots: 已在内存中的数据（如 {'market.json': ...}），不再从 data_dir 读取
+
+    Returns:
+        {'written': [...], 'unchanged': [...], 'removed': [...]}
+    """
+    build = StaticBuild(output_dir)
+    # 源文件名（或数据文件名）到哈希资源路径的映射，写入清单
+    assets = {}
+
+    for filename in SCRIPT_ASSETS:
+        path = os.path.join(source_dir, filename)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                assets[filename] = build.add_asset(filename, f.read())
+
+    for page, candidates, variable, prerender in PAGES:
+        with open(os.path.join(source_dir, page), 'r', encoding='utf-8') as f:
+            html_content = rewrite_references(f.read(), assets)
+
+        data_file, data = load_snapshot(data_dir, candidates, snapshots)
+        if data is None:
+            print(f"⚠️  {page}: 未找到数据文件 {', '.join(candidates)}，页面保持运行时加载")
+        else:
+            if prerender:
+                html_content = PageTemplate(html_content).render(normalize_market_data(data))
+            stem = os.path.splitext(data_file)[0]
+            assets[data_file] = build.add_asset(f'{stem}.js', data_script(variable, data))
+            html_content = inject_head(html_content, script_tag(assets[data_file]))
+            print(f"{page}: 数据 {data_file} → {assets[data_file]}")
+
+        build.add(page, html_content.encode('utf-8'))
+
+    # 其余静态文件（profile.html、图片等）原样复制
+    skip = SKIP_FILES | {page for page, _, _, _ in PAGES}
+    for relpath in static_files(source_dir, output_dir, skip):
+        with open(os.path.join(source_dir, relpath), 'rb') as f:
+            build.add(relpath, f.read())
+
+    return build.finish(assets)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='预构建静态页面')
+    parser.add_argument('--source', default='../netlify-deploy', help='页面源文件目录')
+    parser.add_argument('--data-dir', default='.', help='数据文件目录')
+    parser.add_argument('--output', default='../netlify-deploy/dist', help='输出目录')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("静态页面预构建")
+    print("=" * 60)
+    print(f"执行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    if brotli is None:
+        print("⚠️  未安装 brotli，只生成 .gz 预压缩文件（pip install brotli）")
+
+    result = build_site(args.source, args.data_dir, args.output)
+
+    print(f"写入 {len(result['written'])} 个文件，"
+          f"未变化 {len(result['unchanged'])} 个，删除 {len(result['removed'])} 个")
+    for relpath in result['written']:
+        print(f"  + {relpath}")
+    for relpath in result['removed']:
+        print(f"  - {relpath}")
+
+    print("=" * 60)
+    print(f"✅ 构建完成: {args.output}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
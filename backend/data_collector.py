@@ -11,7 +11,13 @@ import subprocess
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
+from market_shards import publish_shards
+from profiling import run_with_profiling
+from registry import registry
+from tracing import span, traced
 
+
+@traced('search_web', args=('query', 'count'), result='count')
 def search_web(query: str, count: int = 5) -> List[Dict]:
     """
     使用系统的联网搜索功能搜索数据
@@ -57,6 +63,7 @@ def search_web(query: str, count: int = 5) -> List[Dict]:
         return []
 
 
+@traced('extract_price', args=('product_name',), result='found')
 def extract_price_from_text(text: str, product_name: str) -> Optional[float]:
     """
     从文本中提取价格
@@ -277,14 +284,7 @@ def merge_data(*data_sources: List[Dict]) -> Dict:
     merged = {
         'timestamp': datetime.now().isoformat(),
         'date': datetime.now().strftime('%Y-%m-%d'),
-        'products': {
-            '生猪': {'price': None, 'sources': []},
-            '仔猪': {'price': None, 'sources': []},
-            '鸡蛋': {'price': None, 'sources': []},
-            '淘汰鸡': {'price': None, 'sources': []},
-            '玉米': {'price': None, 'sources': []},
-            '豆粕': {'price': None, 'sources': []},
-        }
+        'products': {product.name: {'price': None, 'sources': []} for product in registry.products}
     }
 
     for source_data in data_sources:
@@ -327,16 +327,22 @@ def append_to_history(data: Dict, history_filename: str = 'market_history.json')
     Args:
         data: 数据字典
         history_filename: 历史记录文件名
+
+    Returns:
+        更新后的历史数据
     """
     history = {}
 
     # 读取现有历史记录
-    try:
-        if os.path.exists(history_filename):
-            with open(history_filename, 'r', encoding='utf-8') as f:
-                history = json.load(f)
-    except:
-        pass
+    with span('history.read', file=history_filename) as s:
+        try:
+            if os.path.exists(history_filename):
+                with open(history_filename, 'r', encoding='utf-8') as f:
+                    history = json.load(f)
+                s.set(bytes=os.path.getsize(history_filename))
+        except:
+            pass
+        s.set(days=len(history))
 
     # 提取今日数据
     today_date = data.get('date', datetime.now().strftime('%Y-%m-%d'))
@@ -352,7 +358,15 @@ def append_to_history(data: Dict, history_filename: str = 'market_history.json')
             'sources': product_info.get('sources', [])
         }
 
-    # 追加到历史记录
+    # 追加到历史记录：同一天多次采集时，当天记录为时间最晚的一次（收盘），
+    # snapshots 记录当天全部采集时间；补录较早的快照不会覆盖收盘数据
+    existing = history.get(today_date)
+    snapshots = {today_data['timestamp']}
+    if existing:
+        snapshots.update(existing.get('snapshots') or filter(None, [existing.get('timestamp')]))
+        if existing.get('timestamp', '') > today_data['timestamp']:
+            today_data = existing
+    today_data['snapshots'] = sorted(snapshots)
     history[today_date] = today_data
 
     # 只保留最近60天的数据（防止文件过大）
@@ -362,10 +376,13 @@ def append_to_history(data: Dict, history_filename: str = 'market_history.json')
             del history[date]
 
     # 保存
-    with open(history_filename, 'w', encoding='utf-8') as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+    with span('history.write', file=history_filename, days=len(history)) as s:
+        with open(history_filename, 'w', encoding='utf-8') as f:
+            json.dump(history, f, ensure_ascii=False, indent=2)
+        s.set(bytes=os.path.getsize(history_filename))
 
     print(f"历史数据已保存到: {history_filename} (共 {len(history)} 天)")
+    return history
 
 
 import os
@@ -436,7 +453,10 @@ def main():
     save_data_to_json(merged_data, 'market_data.json')
 
     # 追加到历史记录（用于周报生成）
-    append_to_history(merged_data, 'market_history.json')
+    history = append_to_history(merged_data, 'market_history.json')
+
+    # 发布各产品的近期历史分片
+    publish_shards(history=history)
 
     # 生成HTML数据
     html_data = generate_html_data(merged_data)
@@ -465,4 +485,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    run_with_profiling(main, 'data_collector')
@@ -2,7 +2,9 @@
 # -*- coding: utf-8 -*-
 """
 安佑预混料市场数据采集脚本（完整版）
-自动采集全国均价，并生成13个省份的完整价格数据
+自动采集全国均价，并按注册表（registry.json）生成各省份的完整价格数据；
+有城市报价（city_prices.json）的产品，全国和省份价格由城市报价加权汇总得到（见 aggregation.py）；
+同一天可多次采集，每次采集保存为日内快照，market.json 为最新快照（见 snapshots.py）
 """
 
 import json
@@ -12,141 +14,12 @@ import random
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
-# 配置参数
-PRODUCTS = {
-    'pig': {
-        'name': '生猪',
-        'unit': '元/公斤',
-        'decimal': 2
-    },
-    'piglet': {
-        'name': '仔猪',
-        'unit': '元/公斤',
-        'decimal': 2
-    },
-    'egg': {
-        'name': '鸡蛋',
-        'unit': '元/斤',
-        'decimal': 2
-    },
-    'hen': {
-        'name': '淘汰鸡',
-        'unit': '元/斤',
-        'decimal': 2
-    },
-    'corn': {
-        'name': '玉米',
-        'unit': '元/吨',
-        'decimal': 0
-    },
-    'soybean': {
-        'name': '豆粕',
-        'unit': '元/吨',
-        'decimal': 0
-    }
-}
-
-# 13个重点省份
-PROVINCES = [
-    '全国', '黑龙江', '河北', '山东', '陕西', '河南',
-    '甘肃', '湖北', '广西', '广东', '江西', '四川', '福建'
-]
-
-# 各省份价格波动范围（相对于全国均价的百分比）
-PROVINCE_VARIATIONS = {
-    'pig': {
-        '全国': (1.0, 1.0),
-        '黑龙江': (0.94, 0.98),
-        '河北': (1.01, 1.03),
-        '山东': (0.99, 1.02),
-        '陕西': (0.98, 1.02),
-        '河南': (1.00, 1.03),
-        '甘肃': (0.97, 1.00),
-        '湖北': (0.98, 1.02),
-        '广西': (0.98, 1.02),
-        '广东': (1.02, 1.05),
-        '江西': (0.97, 1.02),
-        '四川': (0.98, 1.03),
-        '福建': (0.98, 1.05)
-    },
-    'piglet': {
-        '全国': (1.0, 1.0),
-        '黑龙江': (0.95, 0.98),
-        '河北': (0.98, 1.02),
-        '山东': (1.02, 1.05),
-        '陕西': (0.98, 1.02),
-        '河南': (1.00, 1.05),
-        '甘肃': (0.95, 1.00),
-        '湖北': (1.00, 1.05),
-        '广西': (0.98, 1.02),
-        '广东': (1.02, 1.08),
-        '江西': (0.98, 1.02),
-        '四川': (0.98, 1.10),
-        '福建': (0.95, 1.08)
-    },
-    'egg': {
-        '全国': (1.0, 1.0),
-        '黑龙江': (0.90, 0.95),
-        '河北': (0.90, 0.95),
-        '山东': (0.95, 1.00),
-        '陕西': (1.05, 1.10),
-        '河南': (1.00, 1.05),
-        '甘肃': (1.00, 1.05),
-        '湖北': (0.95, 1.02),
-        '广西': (1.02, 1.08),
-        '广东': (1.02, 1.08),
-        '江西': (0.95, 1.02),
-        '四川': (0.95, 1.05),
-        '福建': (1.08, 1.15)
-    },
-    'hen': {
-        '全国': (1.0, 1.0),
-        '黑龙江': (0.95, 1.02),
-        '河北': (0.90, 0.98),
-        '山东': (0.95, 1.02),
-        '陕西': (0.90, 0.98),
-        '河南': (0.95, 1.02),
-        '甘肃': (0.85, 0.95),
-        '湖北': (0.88, 0.98),
-        '广西': (0.88, 0.95),
-        '广东': (0.88, 0.95),
-        '江西': (0.88, 0.95),
-        '四川': (0.85, 0.92),
-        '福建': (0.88, 0.95)
-    },
-    'corn': {
-        '全国': (1.0, 1.0),
-        '黑龙江': (0.95, 0.98),
-        '河北': (1.00, 1.03),
-        '山东': (1.00, 1.03),
-        '陕西': (1.06, 1.12),
-        '河南': (1.00, 1.03),
-        '甘肃': (0.90, 0.98),
-        '湖北': (0.99, 1.03),
-        '广西': (1.03, 1.08),
-        '广东': (0.98, 1.05),
-        '江西': (0.98, 1.10),
-        '四川': (1.02, 1.08),
-        '福建': (1.00, 1.10)
-    },
-    'soybean': {
-        '全国': (1.0, 1.0),
-        '黑龙江': (1.00, 1.05),
-        '河北': (1.00, 1.02),
-        '山东': (0.98, 1.02),
-        '陕西': (0.98, 1.02),
-        '河南': (0.98, 1.02),
-        '甘肃': (0.98, 1.02),
-        '湖北': (0.98, 1.02),
-        '广西': (0.97, 1.02),
-        '广东': (0.95, 1.00),
-        '江西': (0.95, 1.00),
-        '四川': (0.98, 1.04),
-        '福建': (0.98, 1.02)
-    }
-}
-
+from profiling import run_with_profiling
+from registry import registry
+from snapshots import SnapshotStore
+from tracing import traced
 
+@traced('search_web', args=('query',), result='count')
 def search_web(query: str) -> List[str]:
     """
     使用联网搜索功能搜索数据
@@ -166,6 +39,7 @@ def search_web(query: str) -> List[str]:
         return []
 
 
+@traced('extract_price', args=('product_name',), result='found')
 def extract_price_from_text(text: str, product_name: str) -> Optional[float]:
     """
     从文本中提取价格
@@ -222,38 +96,20 @@ def collect_national_price(product_key: str, product_name: str) -> Optional[floa
     return None
 
 
-def generate_province_prices(national_price: float, product_key: str) -> Dict[str, Dict[str, float]]:
+def generate_province_prices(national_price: float, product_key: str, reg=registry) -> Dict[str, Dict[str, float]]:
     """
-    基于全国均价生成各省份价格
+    基于全国均价生成各省份价格（波动范围见注册表，按地区序号逐个生成）
     """
-    province_prices = {}
-
-    variations = PROVINCE_VARIATIONS.get(product_key, {})
-
-    for province in PROVINCES:
-        if province == '全国':
-            province_prices[province] = national_price
-        else:
-            # 获取该省份的波动范围
-            if province in variations:
-                min_ratio, max_ratio = variations[province]
-            else:
-                min_ratio, max_ratio = 0.95, 1.05
+    product = reg.product(product_key)
+    variations = reg.variations[product.index]
+    prices = [national_price] * len(reg.regions)
 
-            # 随机生成价格
-            ratio = random.uniform(min_ratio, max_ratio)
-            province_price = national_price * ratio
+    for index in reg.provinces:
+        min_ratio, max_ratio = variations[index]
+        # 随机生成价格，根据小数位数四舍五入
+        prices[index] = reg.round_price(product, national_price * random.uniform(min_ratio, max_ratio))
 
-            # 根据小数位数四舍五入
-            decimal = PRODUCTS[product_key]['decimal']
-            if decimal == 0:
-                province_price = round(province_price)
-            else:
-                province_price = round(province_price, decimal)
-
-            province_prices[province] = province_price
-
-    return province_prices
+    return dict(zip(reg.region_names, prices))
 
 
 def calculate_change(current_price: float, previous_price: float) -> float:
@@ -274,34 +130,41 @@ def calculate_change_ratio(current_price: float, previous_price: float) -> float
     return ((current_price - previous_price) / previous_price) * 100
 
 
-def load_previous_data() -> Optional[Dict]:
+def load_previous_data(store: Optional[SnapshotStore] = None) -> Optional[Dict]:
     """
-    加载前一天的数据
+    加载前一天的数据（前一天的收盘快照；还没有快照时读取 market.json）
+
+    market.json 可能是今天早些时候采集的快照，只有其日期早于今天时才作为前一天数据，
+    否则返回 None（涨跌显示为 0），不与今天的行情对比
     """
+    store = store or SnapshotStore()
+    today = datetime.now().strftime('%Y-%m-%d')
+    previous = store.previous_close(today)
+    if previous is not None:
+        return previous
     try:
         with open('market.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
+            data = json.load(f)
     except:
         return None
+    if data.get('update_date', '') < today:
+        return data
+    return None
 
 
-def main():
+def collect_market_data(previous_data: Optional[Dict] = None,
+                        city_prices: Optional[Dict[str, Dict[str, float]]] = None) -> Dict:
     """
-    主函数
-    """
-    print("=" * 60)
-    print("开始采集市场行情数据（完整版）")
-    print(f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("=" * 60)
+    采集全国均价并生成各省份价格
 
-    # 加载前一天数据
-    previous_data = load_previous_data()
-    if previous_data:
-        print("✓ 已加载前一天数据")
-    else:
-        print("⚠ 未找到前一天数据，所有涨跌将显示为 0")
+    Args:
+        previous_data: 前一天的 market.json 数据，用于计算涨跌和在采集失败时兜底
+        city_prices: {产品英文键: {城市: 价格}}（见 aggregation.load_city_prices），
+                     有城市报价的产品不再联网搜索，全国和省份价格由城市报价汇总
 
-    # 采集数据
+    Returns:
+        market.json 格式的行情数据
+    """
     market_data = {
         'update_date': datetime.now().strftime('%Y-%m-%d'),
         'update_time': datetime.now().strftime('%H:%M'),
@@ -309,13 +172,28 @@ def main():
         'products': {}
     }
 
+    national = registry.national_name
+    hierarchy = None
+
     # 为每个产品采集数据
-    for product_key, product_info in PRODUCTS.items():
-        print(f"\n[产品] {product_info['name']}")
-        product_name = product_info['name']
+    for product in registry.products:
+        product_key = product.key
+        product_name = product.name
+        print(f"\n[产品] {product_name}")
+
+        # 有城市报价时由城市报价汇总全国和省份价格
+        aggregated = {}
+        if city_prices and city_prices.get(product_key):
+            from aggregation import Hierarchy, aggregate_region_prices
+            hierarchy = hierarchy or Hierarchy.from_registry()
+            print(f"  正在汇总 {len(city_prices[product_key])} 个城市报价...")
+            aggregated = aggregate_region_prices(product, city_prices[product_key], hierarchy)
 
         # 采集全国均价
-        national_price = collect_national_price(product_key, product_name)
+        if national in aggregated:
+            national_price = aggregated[national]
+        else:
+            national_price = collect_national_price(product_key, product_name)
 
         # 如果未采集到价格，使用前一天的价格或默认值
         if national_price is None:
@@ -324,23 +202,21 @@ def main():
                 print(f"    使用前一天价格: {national_price}")
             else:
                 # 使用默认值
-                default_prices = {
-                    'pig': 15.0,
-                    'piglet': 20.0,
-                    'egg': 7.0,
-                    'hen': 10.0,
-                    'corn': 2300,
-                    'soybean': 3200
-                }
-                national_price = default_prices[product_key]
+                national_price = product.default_price
                 print(f"    使用默认价格: {national_price}")
 
         # 生成各省份价格
         print(f"  正在生成各省份价格...")
         province_prices = generate_province_prices(national_price, product_key)
+        if aggregated:
+            missing = [name for name in province_prices if name not in aggregated]
+            if missing:
+                print(f"    {len(missing)} 个省份没有城市报价，按波动范围生成: {', '.join(missing)}")
+            province_prices.update(aggregated)
 
-        # 计算涨跌和涨跌幅
+        # 计算涨跌和涨跌幅（涨跌幅只用于全国均价，地区数据只保存价格和涨跌）
         provinces_data = {}
+        change_ratios = {}
 
         for province, price in province_prices.items():
             # 获取前一天的价格
@@ -348,7 +224,7 @@ def main():
             if previous_data and product_key in previous_data['products']:
                 if province in previous_data['products'][product_key]['regions']:
                     previous_price = previous_data['products'][product_key]['regions'][province]['price']
-                elif province == '全国':
+                elif province == national:
                     previous_price = previous_data['products'][product_key]['national_price']
 
             # 计算涨跌
@@ -356,7 +232,7 @@ def main():
             change_ratio = calculate_change_ratio(price, previous_price)
 
             # 根据小数位数格式化
-            decimal = product_info['decimal']
+            decimal = product.decimal
             if decimal == 0:
                 formatted_price = int(price)
                 formatted_change = int(change)
@@ -364,33 +240,79 @@ def main():
                 formatted_price = round(price, decimal)
                 formatted_change = round(change, decimal)
 
-            formatted_change_ratio = round(change_ratio, 2)
-
             provinces_data[province] = {
                 'price': formatted_price,
                 'change': formatted_change
             }
+            change_ratios[province] = round(change_ratio, 2)
 
         # 构建产品数据
         market_data['products'][product_key] = {
             'name': product_name,
-            'unit': product_info['unit'],
-            'national_price': provinces_data['全国']['price'],
-            'national_change': provinces_data['全国']['change'],
-            'national_change_ratio': provinces_data['全国']['change'],
-            'regions': {k: v for k, v in provinces_data.items() if k != '全国'}
+            'unit': product.unit,
+            'national_price': provinces_data[national]['price'],
+            'national_change': provinces_data[national]['change'],
+            'national_change_ratio': change_ratios[national],
+            'regions': {k: v for k, v in provinces_data.items() if k != national}
         }
 
-        print(f"  ✓ 全国均价: {market_data['products'][product_key]['national_price']} {product_info['unit']}")
+        print(f"  ✓ 全国均价: {market_data['products'][product_key]['national_price']} {product.unit}")
         print(f"  ✓ 涨跌: {market_data['products'][product_key]['national_change']}")
         print(f"  ✓ 涨跌幅: ({market_data['products'][product_key]['national_change_ratio']}%)")
 
-    # 保存数据
+    return market_data
+
+
+@traced('market.write', args=('filename',))
+def save_market_data(market_data: Dict, filename: str = 'market.json', store: Optional[SnapshotStore] = None):
+    """
+    保存行情数据：写入当天的日内快照，快照为最新时同时更新 filename（最新视图）
+    """
     print("\n正在保存数据...")
-    with open('market.json', 'w', encoding='utf-8') as f:
-        json.dump(market_data, f, ensure_ascii=False, indent=2)
+    store = store or SnapshotStore(latest_file=filename)
+    if store.add(market_data):
+        print(f"✓ 数据已保存到 {filename}")
+    else:
+        print(f"⚠ 已有更新的快照 ({store.latest_key})，{filename} 保持不变")
+
+    date = market_data['update_date']
+    print(f"✓ 快照已保存到 {store.day_path(date)}（当天第 {store.index['counts'][date]} 个）")
+
+
+def main():
+    """
+    主函数
+    """
+    print("=" * 60)
+    print("开始采集市场行情数据（完整版）")
+    print(f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 60)
+
+    # 加载前一天数据
+    previous_data = load_previous_data()
+    if previous_data:
+        print("✓ 已加载前一天数据")
+    else:
+        print("⚠ 未找到前一天数据，所有涨跌将显示为 0")
+
+    # 当天的城市报价（可选）
+    from aggregation import load_city_prices
+    city_prices = load_city_prices()
+    if city_prices:
+        print(f"✓ 已加载城市报价: {', '.join(registry.product(key).name for key in city_prices)}")
+
+    # 采集并保存数据
+    market_data = collect_market_data(previous_data, city_prices)
+    save_market_data(market_data)
+
+    # 追加到历史记录（与流水线的 history 阶段相同），CI 中历史分片和周报都以此为数据源
+    from data_collector import append_to_history
+    from pipeline import history_record
+    history = append_to_history(history_record(market_data), 'market_history.json')
 
-    print("✓ 数据已保存到 market.json")
+    # 按产品发布分片（market.json 继续保留，兼容现有页面）
+    from market_shards import publish_shards
+    publish_shards(market_data=market_data, history=history)
 
     # 打印摘要
     print("\n" + "=" * 60)
@@ -399,7 +321,7 @@ def main():
     print(f"更新日期: {market_data['update_date']}")
     print(f"更新时间: {market_data['update_time']}")
     print(f"数据源: {', '.join(market_data['data_source'])}")
-    print(f"覆盖地区: {', '.join(PROVINCES)}")
+    print(f"覆盖地区: {', '.join(registry.region_names)}")
 
     print("\n各产品数据:")
     for product_key, product_data in market_data['products'].items():
@@ -413,4 +335,4 @@ def main():
 if __name__ == "__main__":
     # 固定随机种子，确保数据稳定
     random.seed(42)
-    main()
+    run_with_profiling(main, 'data_collector_v2')
@@ -6,68 +6,1096 @@
 """
 
 from http.server import HTTPServer, SimpleHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import base64
+import bisect
+import gzip
+import hashlib
 import os
+import zipfile
 import mimetypes
-from datetime import datetime
+import re
+import signal
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime
+from email.utils import formatdate, parsedate_to_datetime
 import json
-from urllib.parse import unquote
+from urllib.parse import unquote, quote, urlparse, parse_qs
+
+from event_stream import EventBroadcaster
+from metrics import Registry
+from profiling import run_with_profiling
+from price_index import PriceIndex
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 默认工作线程数（同时处理的连接数上限）
+DEFAULT_WORKERS = 32
+
+# 等待下一个请求的空闲超时（秒）：空闲的长连接同样占用一个工作线程，
+# 超时较短才能在突发流量时尽快把线程让给新连接
+KEEPALIVE_TIMEOUT = 3
+
+# 处理请求过程中的读写超时（秒），慢速客户端下载文件时适用
+IO_TIMEOUT = 15
+
+# 无法使用 sendfile 时的分块复制大小
+COPY_CHUNK_SIZE = 64 * 1024
+
+# 响应写缓冲大小：响应头和较小的响应体合并为一次写入，长连接上的后续响应
+# 不会因 Nagle 算法等待客户端的延迟确认（约 40ms）
+WRITE_BUFFER_SIZE = 64 * 1024
+
+# 单个请求允许的最大区间数，超过时忽略 Range 返回完整文件
+MAX_RANGES = 16
+
+RANGE_SPEC_PATTERN = re.compile(r'^(\d*)-(\d*)$')
+
+# 周报文件名中的周期，如 本周行情数据_2026-01-12至2026-01-18.xlsx
+WEEK_STAMP_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})至(\d{4}-\d{2}-\d{2})')
+
+# 可通过条件请求获取的行情数据文件
+MARKET_DATA_FILES = {'market.json', 'market_data.json', 'weekly_report_index.json'}
+
+# 已结束周期的周报很少变化，可缓存一天；流水线仍可能以相同文件名重新生成，
+# 因此不标记 immutable，过期后用 ETag 重新验证（未变化时只返回304）。
+# 当前周的周报可能随时被重新生成，缓存时间更短
+PAST_WEEK_CACHE_CONTROL = 'public, max-age=86400, must-revalidate'
+CURRENT_WEEK_CACHE_CONTROL = 'public, max-age=300, must-revalidate'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# 可压缩的文本文件类型（xlsx 本身已是zip压缩格式，不再压缩）
+COMPRESSIBLE_EXTENSIONS = ('.txt', '.json')
+
+# 小于该大小的响应不压缩
+COMPRESS_MIN_SIZE = 512
+
+# 压缩缓存的内存上限（字节）
+COMPRESSION_CACHE_BYTES = 64 * 1024 * 1024
+
+# 指标
+metrics_registry = Registry()
+REQUESTS = metrics_registry.counter(
+    'download_server_requests_total', '按路由和状态码统计的请求数', ('route', 'status'))
+REQUEST_LATENCY = metrics_registry.histogram(
+    'download_server_request_duration_seconds', '请求处理耗时（秒）', ('route',))
+RESPONSE_BYTES = metrics_registry.counter(
+    'download_server_response_bytes_total', '响应体字节数', ('route',))
+IN_FLIGHT = metrics_registry.gauge(
+    'download_server_connections_in_flight', '正在由工作线程处理的连接数')
+CACHE_REQUESTS = metrics_registry.counter(
+    'download_server_cache_requests_total', '缓存查询次数（result 为 hit 或 miss）', ('cache', 'result'))
+
+# 指标中使用的路由名称（避免以文件名作为标签导致标签数量无限增长）
+API_ROUTES = ('/api/documents', '/api/prices', '/api/latest', '/api/events', '/metrics', '/download/bundle')
+
+
+def route_label(path):
+    """将请求路径归类为指标路由标签"""
+    path = path.split('?', 1)[0]
+    if path in API_ROUTES:
+        return path
+    if path.startswith('/download/'):
+        return '/download'
+    if path.lstrip('/') in MARKET_DATA_FILES:
+        return '/market-data'
+    return 'static'
+
+
+FileValidator = namedtuple('FileValidator', ['etag', 'mtime', 'last_modified'])
+
+
+class FileValidatorCache:
+    """
+    文件校验信息缓存
+
+    以文件的 mtime 和大小作为缓存键保存内容哈希（强 ETag），
+    文件未变化时不再重新读取计算。
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, stat_result):
+        """获取文件的校验信息，文件变化时重新计算"""
+        key = (stat_result.st_mtime_ns, stat_result.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry[0] == key:
+            CACHE_REQUESTS.inc('file_validator', 'hit')
+            return entry[1]
+
+        CACHE_REQUESTS.inc('file_validator', 'miss')
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+        validator = FileValidator(
+            etag=f'"{digest.hexdigest()[:32]}"',
+            mtime=stat_result.st_mtime,
+            last_modified=formatdate(stat_result.st_mtime, usegmt=True)
+        )
+        with self._lock:
+            self._entries[path] = (key, validator)
+        return validator
+
+
+validator_cache = FileValidatorCache()
+
+
+def supported_encodings():
+    """服务器支持的压缩编码（按优先级排列）"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    根据 Accept-Encoding 选择压缩编码
+
+    Returns:
+        'br'、'gzip'，或 None 表示不压缩
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for item in accept_encoding.split(','):
+        parts = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[parts[0].lower()] = quality
+
+    best = None
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+
+def compress_bytes(data, encoding):
+    """按指定编码压缩数据（结果会被缓存，因此使用最高压缩级别）"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def variant_etag(etag, encoding):
+    """压缩版本的 ETag（与未压缩版本区分）"""
+    return f'{etag[:-1]}-{encoding}"'
+
+
+class CompressionCache:
+    """
+    压缩结果缓存
+
+    以 (资源, 编码) 为键、以资源版本（ETag）校验，资源变化后自动重新压缩；
+    按LRU淘汰，总大小不超过 max_bytes。同一资源并发首次请求时只压缩一次。
+    """
+
+    def __init__(self, max_bytes=COMPRESSION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def get(self, resource, encoding, version, load):
+        """
+        获取压缩后的数据
+
+        Args:
+            resource: 资源标识（文件名等）
+            encoding: 压缩编码
+            version: 资源版本，变化时缓存失效
+            load: 缓存未命中时调用，返回未压缩的原始数据
+        """
+        key = (resource, encoding)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.inc('compression', 'hit')
+                return entry[1]
+            key_lock = self._pending.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # 等待期间其他线程可能已完成压缩
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == version:
+                    CACHE_REQUESTS.inc('compression', 'hit')
+                    return entry[1]
+
+            CACHE_REQUESTS.inc('compression', 'miss')
+            data = compress_bytes(load(), encoding)
+
+            with self._lock:
+                self._pending.pop(key, None)
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._size -= len(old[1])
+                if len(data) <= self.max_bytes:
+                    self._entries[key] = (version, data)
+                    self._size += len(data)
+                    while self._size > self.max_bytes:
+                        _, (_, evicted) = self._entries.popitem(last=False)
+                        self._size -= len(evicted)
+            return data
+
+
+compression_cache = CompressionCache()
+
+
+# 文档类型：(类型, 文件名前缀, 扩展名, 标题, 描述)
+# 省份文件名为 <前缀><省份>_<周期>，标题和描述中的 {region} 替换为省份名称
+DOCUMENT_TYPES = [
+    ('excel', '本周行情数据_', '.xlsx', '本周行情数据',
+     '本周六大品类（生猪、仔猪、鸡蛋、淘汰鸡、玉米、豆粕）行情数据'),
+    ('txt', '每周周报_', '.txt', '每周周报', '本周行情分析及下周市场预测'),
+    ('province_excel', '省份行情数据_', '.xlsx', '{region}行情数据',
+     '{region}、全国及相邻省份本周行情数据'),
+    ('province_txt', '省份周报_', '.txt', '{region}周报', '{region}本周行情分析（与全国及相邻省份对比）'),
+]
+
+# 文档索引的最长缓存时间（秒）。覆盖写入已有文件不会改变目录 mtime，
+# 超过该时间后重新扫描一次以更新文件大小
+DOCUMENT_INDEX_MAX_AGE = 60
+
+# 分页查询的默认和最大每页条数
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# timestamp 为文档列表最近一次变化的时间（/api/documents 和分页查询的响应都使用它，
+# 不是响应生成的时间）；body 为 /api/documents 的完整响应体，
+# 同一 ETag 对应的响应体（压缩与未压缩）内容完全相同，压缩版本只需生成一次
+DocumentIndexSnapshot = namedtuple('DocumentIndexSnapshot',
+                                   ['documents', 'documents_json', 'etag', 'archive', 'timestamp', 'body'])
+
+
+def document_sort_key(document):
+    """归档排序键：(周起始日期, 类型, 文件名)，没有周期的文件排在最前"""
+    match = WEEK_STAMP_PATTERN.search(document['name'])
+    week_start = match.group(1) if match else ''
+    return (week_start, document['type'], document['name'])
+
+
+def encode_cursor(key):
+    """将排序键编码为分页游标"""
+    return base64.urlsafe_b64encode(json.dumps(list(key), ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """解码分页游标，无效时抛出 ValueError"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError):
+        raise ValueError('invalid cursor')
+    if not isinstance(key, list) or len(key) != 3 or not all(isinstance(part, str) for part in key):
+        raise ValueError('invalid cursor')
+    return tuple(key)
+
+
+class ReportArchive:
+    """
+    按周排序的报告归档索引
+
+    每种类型（以及全部类型）各保存一份按排序键升序排列的文档列表，
+    按周过滤和游标定位都通过二分查找完成，查询一页的开销与归档总数无关。
+    """
+
+    def __init__(self, documents):
+        self._by_type = {}
+        for doc_type in [None] + [doc_type for doc_type, *_ in DOCUMENT_TYPES]:
+            selected = sorted(
+                (document_sort_key(document), document)
+                for document in documents
+                if doc_type is None or document['type'] == doc_type
+            )
+            self._by_type[doc_type] = ([key for key, _ in selected], [document for _, document in selected])
+
+    def query(self, doc_type=None, week_from=None, week_to=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        按周倒序查询一页文档
+
+        Args:
+            doc_type: 文档类型（excel / txt / province_excel / province_txt），None 表示全部
+            week_from: 周起始日期下限（含），格式 YYYY-MM-DD
+            week_to: 周起始日期上限（含），格式 YYYY-MM-DD
+            cursor: 上一页返回的游标
+            limit: 每页条数
+
+        Returns:
+            (文档列表, 下一页游标或 None, 过滤后的总数)
+        """
+        keys, documents = self._by_type[doc_type]
+        lo, hi = self.week_range(keys, week_from, week_to)
+        total = max(hi - lo, 0)
+
+        end = hi
+        if cursor is not None:
+            end = min(end, bisect.bisect_left(keys, cursor))
+        start = max(lo, end - limit)
+
+        page = documents[start:end][::-1]
+        next_cursor = encode_cursor(keys[start]) if start > lo and page else None
+        return page, next_cursor, total
+
+    def select(self, doc_type=None, week_from=None, week_to=None):
+        """按周升序返回指定范围内的全部文档"""
+        keys, documents = self._by_type[doc_type]
+        lo, hi = self.week_range(keys, week_from, week_to)
+        return documents[lo:hi]
+
+    @staticmethod
+    def week_range(keys, week_from, week_to):
+        """二分查找周范围对应的下标区间 [lo, hi)"""
+        lo = bisect.bisect_left(keys, (week_from,)) if week_from else 0
+        hi = bisect.bisect_right(keys, (week_to, '\uffff')) if week_to else len(keys)
+        return lo, hi
+
+
+class DocumentIndex:
+    """
+    文档索引
+
+    启动时扫描一次目录并缓存文档列表及其序列化结果，
+    之后只在目录 mtime 变化（新增、删除、重命名文件）或缓存过期时重新扫描，
+    每次请求只需一次 stat 调用，与归档文件数量无关。
+    多个请求同时发现目录变化时只有一个线程重新扫描，其他线程等待并使用其结果。
+    """
+
+    def __init__(self, directory='.', max_age=DOCUMENT_INDEX_MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+        self._snapshot = None
+        self._dir_mtime = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def scan(self):
+        """扫描目录，生成文档列表"""
+        found = {doc_type: [] for doc_type, *_ in DOCUMENT_TYPES}
+
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                for doc_type, prefix, extension, title, description in DOCUMENT_TYPES:
+                    if entry.name.startswith(prefix) and entry.name.endswith(extension):
+                        region = entry.name[len(prefix):].split('_', 1)[0]
+                        found[doc_type].append({
+                            'type': doc_type,
+                            'name': entry.name,
+                            'title': title.format(region=region),
+                            'description': description.format(region=region),
+                            'size': entry.stat().st_size,
+                            'download_url': f'/download/{entry.name}'
+                        })
+                        break
+
+        return [document for doc_type, *_ in DOCUMENT_TYPES for document in found[doc_type]]
+
+    def refresh(self):
+        """重新扫描目录并更新缓存"""
+        dir_mtime = os.stat(self.directory).st_mtime_ns
+        documents = self.scan()
+        documents_json = json.dumps(documents, ensure_ascii=False).encode('utf-8')
+        # ETag 只由文档列表决定；文档列表未变化时沿用原有的时间戳和响应体
+        etag = f'"{hashlib.sha256(documents_json).hexdigest()[:32]}"'
+
+        with self._lock:
+            previous = self._snapshot
+        if previous is not None and previous.etag == etag:
+            timestamp, body = previous.timestamp, previous.body
+        else:
+            timestamp = datetime.now().isoformat()
+            body = (b'{"success": true, "timestamp": "' + timestamp.encode('ascii')
+                    + b'", "documents": ' + documents_json + b'}')
+
+        snapshot = DocumentIndexSnapshot(documents, documents_json, etag, ReportArchive(documents),
+                                         timestamp, body)
+        with self._lock:
+            self._snapshot = snapshot
+            self._dir_mtime = dir_mtime
+            self._built_at = time.monotonic()
+        return snapshot
+
+    def current(self):
+        """当前缓存的索引，目录变化或缓存过期时返回 None"""
+        with self._lock:
+            snapshot = self._snapshot
+            dir_mtime = self._dir_mtime
+            built_at = self._built_at
+
+        if (snapshot is None
+                or time.monotonic() - built_at > self.max_age
+                or os.stat(self.directory).st_mtime_ns != dir_mtime):
+            return None
+        return snapshot
+
+    def load(self):
+        """
+        获取当前文档索引，目录变化或缓存过期时重建（不记录缓存指标，供内部轮询使用）
+
+        Returns:
+            (文档索引, 是否命中缓存)
+        """
+        snapshot = self.current()
+        if snapshot is None:
+            with self._refresh_lock:
+                # 等待锁期间其他线程可能已完成重建
+                snapshot = self.current()
+                if snapshot is None:
+                    return self.refresh(), False
+        return snapshot, True
+
+    def get(self):
+        """获取当前文档索引（处理请求时使用，记录缓存命中情况）"""
+        snapshot, hit = self.load()
+        CACHE_REQUESTS.inc('document_index', 'hit' if hit else 'miss')
+        return snapshot
+
+
+document_index = DocumentIndex()
+
+price_index = PriceIndex()
+
+
+class MarketEventSource:
+    """
+    检测行情数据和周报文件的变化，生成推送事件
+
+    - market：market.json 更新，数据为更新时间及全国均价发生变化的产品
+    - report：出现新的周报文件，数据为新增的文件名
+    """
+
+    def __init__(self):
+        self._latest = None
+        self._latest_etag = None
+        self._document_names = None
+        self._documents_etag = None
+
+    def __call__(self):
+        events = []
+
+        snapshot = price_index.get()
+        if snapshot.latest_etag != self._latest_etag:
+            if self._latest_etag is not None and snapshot.latest:
+                events.append(('market', self.market_delta(self._latest, snapshot.latest)))
+            self._latest = snapshot.latest
+            self._latest_etag = snapshot.latest_etag
+
+        # 内部轮询不计入文档索引的缓存指标，/metrics 中的命中率只反映请求
+        documents, _ = document_index.load()
+        if documents.etag != self._documents_etag:
+            names = [document['name'] for document in documents.documents]
+            if self._document_names is not None:
+                added = [name for name in names if name not in self._document_names]
+                if added:
+                    events.append(('report', {'documents': added}))
+            self._document_names = set(names)
+            self._documents_etag = documents.etag
+
+        return events
+
+    @staticmethod
+    def market_delta(previous, latest):
+        """计算两次行情之间全国均价的变化"""
+        previous_products = (previous or {}).get('products', {})
+        changed = {}
+        for product_key, product_info in latest.get('products', {}).items():
+            old = previous_products.get(product_key, {})
+            if old.get('national_price') != product_info.get('national_price'):
+                changed[product_key] = {
+                    'name': product_info.get('name'),
+                    'national_price': product_info.get('national_price'),
+                    'national_change': product_info.get('national_change')
+                }
+        return {
+            'update_date': latest.get('update_date'),
+            'update_time': latest.get('update_time'),
+            'products': changed
+        }
+
+
+event_broadcaster = EventBroadcaster(MarketEventSource())
+
+metrics_registry.gauge('download_server_event_subscribers', '事件推送订阅连接数',
+                       callback=lambda: event_broadcaster.client_count)
+
+
+def cache_control_for(filename):
+    """根据文件名决定缓存策略"""
+    match = WEEK_STAMP_PATTERN.search(filename)
+    if not match:
+        return REVALIDATE_CACHE_CONTROL
+    if date.fromisoformat(match.group(2)) < date.today():
+        return PAST_WEEK_CACHE_CONTROL
+    return CURRENT_WEEK_CACHE_CONTROL
+
+
+def etag_matches(header, etag):
+    """判断 If-None-Match 请求头是否匹配（弱比较）"""
+    if header.strip() == '*':
+        return True
+    tags = [tag.strip() for tag in header.split(',')]
+    return etag in tags or f'W/{etag}' in tags
+
+
+def parse_http_date(value):
+    """解析HTTP日期，无效时返回 None"""
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if parsed.tzinfo is None:
+        return None
+    return parsed.timestamp()
+
+
+def parse_range_header(header, file_size):
+    """
+    解析 Range 请求头
+
+    Args:
+        header: Range 请求头的值，如 "bytes=0-499,1000-"
+        file_size: 文件大小
+
+    Returns:
+        None 表示没有或忽略该请求头（返回完整文件），
+        空列表表示区间无法满足（416），否则为 [(start, end), ...]（闭区间）
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+
+    specs = [spec.strip() for spec in header[len('bytes='):].split(',')]
+    if len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for spec in specs:
+        match = RANGE_SPEC_PATTERN.match(spec)
+        if not match or spec == '-':
+            return None
+
+        first, last = match.groups()
+        if first == '':
+            # 后缀区间：最后 N 个字节
+            length = int(last)
+            if length == 0:
+                continue
+            start = max(file_size - length, 0)
+            end = file_size - 1
+        else:
+            start = int(first)
+            if last and int(last) < start:
+                return None
+            if start >= file_size:
+                continue
+            end = min(int(last), file_size - 1) if last else file_size - 1
+
+        ranges.append((start, end))
+
+    return ranges
+
+
+def parse_archive_filters(params):
+    """
+    解析归档过滤参数 type / from / to
+
+    Returns:
+        (类型, 周起始下限, 周起始上限)，参数无效时抛出 ValueError
+    """
+    def param(name):
+        values = params.get(name)
+        return values[0] if values else None
+
+    doc_type = param('type')
+    week_from = param('from')
+    week_to = param('to')
+    if doc_type is not None and doc_type not in {t for t, *_ in DOCUMENT_TYPES}:
+        raise ValueError(f'unknown type: {doc_type}')
+    for value in (week_from, week_to):
+        if value is not None:
+            date.fromisoformat(value)
+    return doc_type, week_from, week_to
+
+
+class ChunkedWriter:
+    """
+    HTTP/1.1 分块传输编码写入器
+
+    小块写入先合并到固定大小的缓冲区再作为一个分块发送，内存占用恒定。
+    chunked 为 False 时（HTTP/1.0 客户端）直接写出原始数据。
+    """
+
+    def __init__(self, wfile, chunked=True, buffer_size=COPY_CHUNK_SIZE):
+        self.wfile = wfile
+        self.chunked = chunked
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer += data
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if not self._buffer:
+            return
+        if self.chunked:
+            self.wfile.write(b'%x\r\n' % len(self._buffer) + bytes(self._buffer) + b'\r\n')
+        else:
+            self.wfile.write(bytes(self._buffer))
+        self._buffer.clear()
+
+    def close(self):
+        """发送剩余数据和结束分块"""
+        self.flush()
+        if self.chunked:
+            self.wfile.write(b'0\r\n\r\n')
+
+
+class ThreadPoolHTTPServer(HTTPServer):
+    """
+    线程池HTTP服务器
+
+    每个连接交给固定大小线程池中的一个线程处理，慢速下载不会阻塞其他请求；
+    线程数有上限，突发流量下多余的连接在队列中等待而不是无限创建线程。
+    """
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS):
+        super().__init__(server_address, handler_class)
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='download')
+        self._detached = set()
+        self._detached_lock = threading.Lock()
+
+    def detach_request(self, request):
+        """标记连接已被其他组件接管（如事件推送），请求结束时不关闭"""
+        with self._detached_lock:
+            self._detached.add(request)
+
+    def shutdown_request(self, request):
+        """关闭连接（已被接管的连接除外）"""
+        with self._detached_lock:
+            if request in self._detached:
+                self._detached.discard(request)
+                return
+        super().shutdown_request(request)
+
+    def get_request(self):
+        """接受连接，并关闭 Nagle 算法（缓冲区写出的最后一段不必等待确认）"""
+        request, client_address = super().get_request()
+        try:
+            request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+        return request, client_address
+
+    def process_request(self, request, client_address):
+        """将连接提交到线程池处理"""
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        """在工作线程中处理连接（与 ThreadingMixIn 相同）"""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        """停止接收新连接，并等待正在处理的请求完成"""
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
 
 class DownloadHandler(SimpleHTTPRequestHandler):
     """自定义请求处理器"""
 
+    # 使用HTTP/1.1以支持长连接，所有响应都必须带 Content-Length
+    protocol_version = 'HTTP/1.1'
+    timeout = IO_TIMEOUT
+    wbufsize = WRITE_BUFFER_SIZE
+
+    # 每个请求的响应状态码和响应体字节数（在 handle_one_request 中重置）
+    response_status = None
+    response_bytes = 0
+
+    def setup(self):
+        super().setup()
+        IN_FLIGHT.inc()
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            IN_FLIGHT.dec()
+
+    def handle_one_request(self):
+        """
+        处理连接上的一个请求，并记录请求指标（包括 HEAD 和解析请求时就返回的错误响应）
+
+        等待请求行时使用较短的空闲超时，空闲连接超时后关闭并释放工作线程
+        """
+        self.idle = True
+        self.path = None
+        self.response_status = None
+        self.response_bytes = 0
+        self.request_start = None
+        self.connection.settimeout(KEEPALIVE_TIMEOUT)
+        try:
+            super().handle_one_request()
+        finally:
+            if self.response_status is not None:
+                self.record_metrics()
+
+    def parse_request(self):
+        """已收到请求行，恢复读写超时"""
+        self.idle = False
+        self.request_start = time.perf_counter()
+        self.connection.settimeout(self.timeout)
+        return super().parse_request()
+
+    def record_metrics(self):
+        # 请求行无法解析（400、414）时没有路径
+        route = route_label(self.path) if self.path else 'invalid'
+        REQUESTS.inc(route, str(self.response_status))
+        if self.request_start is not None:
+            REQUEST_LATENCY.observe(time.perf_counter() - self.request_start, route)
+        if self.response_bytes:
+            RESPONSE_BYTES.inc(route, amount=self.response_bytes)
+
+    def log_error(self, format, *args):
+        # 空闲长连接超时关闭是正常情况，不记录；处理请求过程中的超时照常记录
+        if getattr(self, 'idle', False) and format.startswith('Request timed out'):
+            return
+        super().log_error(format, *args)
+
+    def send_response(self, code, message=None):
+        """记录响应状态码（用于指标）"""
+        self.response_status = code
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value):
+        """记录响应体大小（用于指标，HEAD 响应不发送响应体）"""
+        if keyword == 'Content-Length' and self.command != 'HEAD':
+            self.response_bytes += int(value)
+        super().send_header(keyword, value)
+
     def do_GET(self):
-        """处理GET请求"""
-        if self.path == '/api/documents':
+        """处理GET请求（请求指标在 handle_one_request 中记录）"""
+        self.route_request()
+
+    def route_request(self):
+        """按路径分发GET请求"""
+        parsed = urlparse(self.path)
+        if parsed.path == '/metrics':
+            self.handle_metrics()
+        elif parsed.path == '/api/documents' and parsed.query:
+            self.handle_documents_query(parse_qs(parsed.query))
+        elif self.path == '/api/documents':
             self.handle_documents_list()
+        elif parsed.path == '/api/prices':
+            self.handle_price_query(parse_qs(parsed.query))
+        elif parsed.path == '/api/latest':
+            self.handle_latest_prices()
+        elif parsed.path == '/api/events':
+            self.handle_event_stream()
+        elif parsed.path == '/download/bundle':
+            self.handle_bundle_download(parse_qs(parsed.query))
         elif self.path.startswith('/download/'):
             self.handle_download()
+        elif self.path.lstrip('/') in MARKET_DATA_FILES:
+            self.handle_market_data()
         else:
             super().do_GET()
 
+    def is_not_modified(self, etag, mtime=None):
+        """判断条件请求是否可以返回304（If-None-Match 优先于 If-Modified-Since）"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag_matches(if_none_match, etag)
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since and mtime is not None:
+            since = parse_http_date(if_modified_since)
+            return since is not None and int(mtime) <= since
+
+        return False
+
+    def choose_encoding(self, size):
+        """为可压缩的响应选择压缩编码"""
+        if size < COMPRESS_MIN_SIZE:
+            return None
+        return negotiate_encoding(self.headers.get('Accept-Encoding'))
+
+    def send_not_modified(self, etag, cache_control, last_modified=None, vary=False):
+        """返回304响应"""
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        if last_modified:
+            self.send_header('Last-Modified', last_modified)
+        self.send_header('Cache-Control', cache_control)
+        if vary:
+            self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
+    def handle_market_data(self):
+        """返回行情数据文件（支持条件请求和压缩）"""
+        filename = self.path.lstrip('/')
+        if not os.path.exists(filename):
+            self.send_error(404, 'File not found')
+            return
+
+        with open(filename, 'rb') as f:
+            stat_result = os.fstat(f.fileno())
+            validator = validator_cache.get(filename, stat_result)
+            encoding = self.choose_encoding(stat_result.st_size)
+            etag = variant_etag(validator.etag, encoding) if encoding else validator.etag
+            if self.is_not_modified(etag, validator.mtime):
+                self.send_not_modified(etag, REVALIDATE_CACHE_CONTROL, validator.last_modified, vary=True)
+                return
+
+            if encoding:
+                body = compression_cache.get(filename, encoding, validator.etag, f.read)
+            else:
+                body = f.read()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', validator.last_modified)
+        self.send_header('Cache-Control', REVALIDATE_CACHE_CONTROL)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
     def handle_documents_list(self):
-        """返回文档列表"""
-        documents = []
-
-        # 查找Excel文件
-        for filename in os.listdir('.'):
-            if filename.startswith('本周行情数据_') and filename.endswith('.xlsx'):
-                filepath = os.path.join('.', filename)
-                size = os.path.getsize(filepath)
-                documents.append({
-                    'type': 'excel',
-                    'name': filename,
-                    'title': '本周行情数据',
-                    'description': '本周六大品类（生猪、仔猪、鸡蛋、淘汰鸡、玉米、豆粕）行情数据',
-                    'size': size,
-                    'download_url': f'/download/{filename}'
-                })
-
-        # 查找TXT文件
-        for filename in os.listdir('.'):
-            if filename.startswith('每周周报_') and filename.endswith('.txt'):
-                filepath = os.path.join('.', filename)
-                size = os.path.getsize(filepath)
-                documents.append({
-                    'type': 'txt',
-                    'name': filename,
-                    'title': '每周周报',
-                    'description': '本周行情分析及下周市场预测',
-                    'size': size,
-                    'download_url': f'/download/{filename}'
-                })
+        """
+        返回文档列表（从缓存的文档索引直接输出）
+
+        timestamp 为文档列表最近一次变化的时间，列表不变时响应体不变，可按 ETag 缓存
+        """
+        snapshot = document_index.get()
+        encoding = self.choose_encoding(len(snapshot.body))
+        etag = variant_etag(snapshot.etag, encoding) if encoding else snapshot.etag
+        if self.is_not_modified(etag):
+            self.send_not_modified(etag, REVALIDATE_CACHE_CONTROL, vary=True)
+            return
+
+        # 响应体已随索引预先生成，压缩版本按索引版本缓存
+        if encoding:
+            body = compression_cache.get('/api/documents', encoding, snapshot.etag, lambda: snapshot.body)
+        else:
+            body = snapshot.body
 
         # 返回JSON响应
         self.send_response(200)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', REVALIDATE_CACHE_CONTROL)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
+        self.wfile.write(body)
+
+    def handle_documents_query(self, params):
+        """
+        分页查询文档归档
+
+        支持参数：type（excel / txt / province_excel / province_txt）、from / to（周起始日期 YYYY-MM-DD）、
+        cursor（上一页返回的 next_cursor）、limit（每页条数）；
+        timestamp 与 /api/documents 相同，为文档列表最近一次变化的时间
+        """
+        def param(name):
+            values = params.get(name)
+            return values[0] if values else None
+
+        try:
+            doc_type, week_from, week_to = parse_archive_filters(params)
+            cursor = decode_cursor(param('cursor')) if param('cursor') else None
+            limit = min(max(int(param('limit') or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+        except ValueError as e:
+            self.send_error(400, f'Bad request: {e}')
+            return
+
+        snapshot = document_index.get()
+        documents, next_cursor, total = snapshot.archive.query(doc_type, week_from, week_to, cursor, limit)
 
         response = {
             'success': True,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': snapshot.timestamp,
+            'total': total,
+            'next_cursor': next_cursor,
             'documents': documents
         }
-        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+        self.send_json(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+
+    def handle_price_query(self, params):
+        """
+        查询价格序列
+
+        支持参数：product（产品键如 pig，或中文名如 生猪，必填）、
+        province（地区，默认全国）、from / to（日期 YYYY-MM-DD，含边界）
+        """
+        def param(name):
+            values = params.get(name)
+            return values[0] if values else None
+
+        product = param('product')
+        province = param('province') or '全国'
+        date_from = param('from')
+        date_to = param('to')
+        try:
+            if not product:
+                raise ValueError('product is required')
+            for value in (date_from, date_to):
+                if value is not None:
+                    date.fromisoformat(value)
+        except ValueError as e:
+            self.send_error(400, f'Bad request: {e}')
+            return
+
+        prices = price_index.get().query(product, province, date_from, date_to)
+        if prices is None:
+            self.send_error(404, 'Unknown product or province')
+            return
+
+        response = {
+            'success': True,
+            'product': product,
+            'province': province,
+            'prices': prices
+        }
+        self.send_json(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+
+    def handle_latest_prices(self):
+        """返回最新行情（预先序列化）"""
+        snapshot = price_index.get()
+        if snapshot.latest is None:
+            self.send_error(404, 'No market data')
+            return
+
+        if self.is_not_modified(snapshot.latest_etag):
+            self.send_not_modified(snapshot.latest_etag, REVALIDATE_CACHE_CONTROL)
+            return
+        self.send_json(snapshot.latest_json, etag=snapshot.latest_etag)
+
+    def handle_metrics(self):
+        """以 Prometheus 文本格式输出指标"""
+        body = metrics_registry.render()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_event_stream(self):
+        """
+        订阅行情更新事件（Server-Sent Events）
+
+        发送响应头后将连接交给广播器，工作线程立即释放
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.flush()
+
+        self.close_connection = True
+        self.server.detach_request(self.request)
+        event_broadcaster.add_client(self.request)
+
+    def send_json(self, body, etag=None):
+        """发送JSON响应"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Cache-Control', REVALIDATE_CACHE_CONTROL)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_bundle_download(self, params):
+        """
+        打包下载归档文件（ZIP）
+
+        支持参数：type（excel / txt / province_excel / province_txt）、from / to（周起始日期 YYYY-MM-DD）。
+        边生成边发送，不在内存或临时文件中构建完整的压缩包；
+        xlsx 已是压缩格式，使用存储模式避免重复压缩
+        """
+        try:
+            doc_type, week_from, week_to = parse_archive_filters(params)
+        except ValueError as e:
+            self.send_error(400, f'Bad request: {e}')
+            return
+
+        documents = document_index.get().archive.select(doc_type, week_from, week_to)
+        documents = [document for document in documents if os.path.exists(document['name'])]
+        if not documents:
+            self.send_error(404, 'No matching documents')
+            return
+
+        bundle_name = f"周报合集_{week_from or '最早'}至{week_to or '最新'}.zip"
+        chunked = self.request_version == 'HTTP/1.1'
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Disposition', f"attachment; filename*=UTF-8''{quote(bundle_name, safe='')}")
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.close_connection = True
+        self.send_header('Cache-Control', REVALIDATE_CACHE_CONTROL)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
+        writer = ChunkedWriter(self.wfile, chunked=chunked)
+        with zipfile.ZipFile(writer, 'w') as bundle:
+            for document in documents:
+                filename = document['name']
+                stat_result = os.stat(filename)
+                member = zipfile.ZipInfo(filename, date_time=time.localtime(stat_result.st_mtime)[:6])
+                member.compress_type = zipfile.ZIP_STORED if filename.endswith('.xlsx') else zipfile.ZIP_DEFLATED
+                member.file_size = stat_result.st_size
+
+                with open(filename, 'rb') as source, \
+                        bundle.open(member, 'w', force_zip64=stat_result.st_size >= zipfile.ZIP64_LIMIT) as target:
+                    for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b''):
+                        target.write(chunk)
+        writer.close()
 
     def handle_download(self):
         """处理文件下载"""
@@ -89,24 +1117,133 @@ class DownloadHandler(SimpleHTTPRequestHandler):
             self.send_error(403, 'File type not allowed')
             return
 
-        # 获取文件大小和MIME类型
-        file_size = os.path.getsize(filename)
-        mime_type, _ = mimetypes.guess_type(filename)
+        with open(filename, 'rb') as f:
+            # 获取文件大小和MIME类型
+            stat_result = os.fstat(f.fileno())
+            file_size = stat_result.st_size
+            mime_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
 
-        # 设置响应头
-        self.send_response(200)
-        self.send_header('Content-Type', mime_type or 'application/octet-stream')
-        self.send_header('Content-Length', str(file_size))
+            # 文本文件在未请求区间时可压缩传输（xlsx 不压缩）
+            validator = validator_cache.get(filename, stat_result)
+            cache_control = cache_control_for(filename)
+            compressible = filename.endswith(COMPRESSIBLE_EXTENSIONS)
+            encoding = None
+            if compressible and 'Range' not in self.headers:
+                encoding = self.choose_encoding(file_size)
+            if encoding:
+                validator = validator._replace(etag=variant_etag(validator.etag, encoding))
+
+            # 条件请求：文件未变化时返回304
+            if self.is_not_modified(validator.etag, validator.mtime):
+                self.send_not_modified(validator.etag, cache_control, validator.last_modified, vary=compressible)
+                return
+
+            if encoding:
+                body = compression_cache.get(filename, encoding, validator.etag, f.read)
+                self.send_download_headers(200, filename, mime_type, len(body), validator, cache_control, encoding)
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            # If-Range 不匹配时忽略 Range，返回完整的新文件
+            ranges = parse_range_header(self.headers.get('Range'), file_size)
+            if_range = self.headers.get('If-Range')
+            if ranges is not None and if_range is not None:
+                if if_range.startswith('"') or if_range.startswith('W/'):
+                    if if_range != validator.etag:
+                        ranges = None
+                elif parse_http_date(if_range) != int(validator.mtime):
+                    ranges = None
+
+            if ranges == []:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{file_size}')
+                self.send_header('Content-Length', '0')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                return
+
+            if ranges is None:
+                self.send_download_headers(200, filename, mime_type, file_size, validator, cache_control)
+                self.end_headers()
+                self.send_file_range(f, 0, file_size)
+            elif len(ranges) == 1:
+                start, end = ranges[0]
+                self.send_download_headers(206, filename, mime_type, end - start + 1, validator, cache_control)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{file_size}')
+                self.end_headers()
+                self.send_file_range(f, start, end - start + 1)
+            else:
+                self.send_multipart_ranges(f, filename, mime_type, file_size, ranges, validator, cache_control)
+
+    def send_download_headers(self, status, filename, mime_type, content_length, validator, cache_control,
+                              encoding=None):
+        """发送下载响应的公共响应头（不含 end_headers）"""
+        self.send_response(status)
+        self.send_header('Content-Type', mime_type)
+        self.send_header('Content-Length', str(content_length))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+            self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', validator.etag)
+        self.send_header('Last-Modified', validator.last_modified)
+        self.send_header('Cache-Control', cache_control)
         # 使用RFC 2231编码处理中文文件名
-        from urllib.parse import quote
         encoded_filename = quote(filename, safe='')
         self.send_header('Content-Disposition', f"attachment; filename*=UTF-8''{encoded_filename}")
         self.send_header('Access-Control-Allow-Origin', '*')
+
+    def send_multipart_ranges(self, f, filename, mime_type, file_size, ranges, validator, cache_control):
+        """以 multipart/byteranges 格式发送多个区间"""
+        boundary = uuid.uuid4().hex
+        part_headers = [
+            (f'\r\n--{boundary}\r\n'
+             f'Content-Type: {mime_type}\r\n'
+             f'Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n').encode('ascii')
+            for start, end in ranges
+        ]
+        closing = f'\r\n--{boundary}--\r\n'.encode('ascii')
+        content_length = (sum(len(header) for header in part_headers)
+                          + sum(end - start + 1 for start, end in ranges)
+                          + len(closing))
+
+        self.send_download_headers(206, filename, f'multipart/byteranges; boundary={boundary}',
+                                   content_length, validator, cache_control)
         self.end_headers()
 
-        # 发送文件内容
-        with open(filename, 'rb') as f:
-            self.wfile.write(f.read())
+        for header, (start, end) in zip(part_headers, ranges):
+            self.wfile.write(header)
+            self.send_file_range(f, start, end - start + 1)
+        self.wfile.write(closing)
+
+    def send_file_range(self, f, offset, count):
+        """
+        发送文件的指定区间
+
+        优先使用内核 sendfile 零拷贝发送；不支持时按固定大小分块复制，
+        每个连接的内存占用与文件大小无关。
+        """
+        if count <= 0:
+            return
+
+        # sendfile 直接写套接字，先写出缓冲区中的响应头
+        self.wfile.flush()
+        try:
+            self.connection.sendfile(f, offset, count)
+            return
+        except (AttributeError, ValueError, NotImplementedError):
+            pass
+
+        f.seek(offset)
+        remaining = count
+        while remaining > 0:
+            chunk = f.read(min(COPY_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            self.wfile.write(chunk)
+            remaining -= len(chunk)
 
     def log_message(self, format, *args):
         """自定义日志格式"""
@@ -115,18 +1252,35 @@ class DownloadHandler(SimpleHTTPRequestHandler):
 
 def main():
     """启动下载服务器"""
-    server_address = ('', 5001)  # 使用5001端口
-    httpd = HTTPServer(server_address, DownloadHandler)
+    parser = argparse.ArgumentParser(description='文档下载服务器')
+    parser.add_argument('--port', type=int, default=5001, help='监听端口')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='工作线程数')
+    args = parser.parse_args()
+
+    server_address = ('', args.port)
+    httpd = ThreadPoolHTTPServer(server_address, DownloadHandler, workers=args.workers)
+    document_index.refresh()
+    price_index.reload()
+    event_broadcaster.poll()
+    event_broadcaster.start()
+
+    # 收到 SIGTERM 时与 Ctrl+C 一样优雅停止（shutdown 需在其他线程中调用）
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=httpd.shutdown).start())
 
     print("=" * 60)
     print("文档下载服务器已启动")
     print("=" * 60)
-    print(f"服务地址: http://localhost:5001")
+    print(f"服务地址: http://localhost:{args.port}")
+    print(f"工作线程: {args.workers}")
     print(f"启动时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
     print("可用接口:")
     print("  - GET /api/documents          获取文档列表")
     print("  - GET /download/<filename>    下载文档")
+    print("  - GET /api/prices?product=    查询价格序列")
+    print("  - GET /api/latest             获取最新行情")
+    print("  - GET /api/events             订阅行情更新推送（SSE）")
+    print("  - GET /metrics                运行指标（Prometheus格式）")
     print()
     print("按 Ctrl+C 停止服务器")
     print("=" * 60)
@@ -135,8 +1289,12 @@ def main():
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
-        print("\n服务器已停止")
+        pass
+    finally:
+        print("\n正在等待进行中的请求完成...")
+        event_broadcaster.stop()
         httpd.server_close()
+        print("服务器已停止")
 
 if __name__ == "__main__":
-    main()
+    run_with_profiling(main, 'download_server', default_mode='sample')
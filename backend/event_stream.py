@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务器推送事件（SSE）广播
+订阅连接交给单个广播线程统一管理，空闲连接不占用工作线程；
+广播线程定期检查数据变化，将事件一次编码后写入所有连接
+"""
+
+import json
+import threading
+import time
+from typing import Callable, Dict, Iterable, Tuple
+
+# 检查数据变化的间隔（秒）
+POLL_INTERVAL = 1.0
+
+# 心跳间隔（秒），用于保持代理连接并清理已断开的客户端
+HEARTBEAT_INTERVAL = 15.0
+
+# 客户端断线后的重连等待时间（毫秒）
+RETRY_MILLISECONDS = 5000
+
+
+def encode_event(event_id: int, event: str, data: Dict) -> bytes:
+    """按 text/event-stream 格式编码事件"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n".encode('utf-8')
+
+
+class EventBroadcaster:
+    """
+    SSE 广播器
+
+    客户端套接字设置为非阻塞模式，事件直接写入内核发送缓冲区；
+    缓冲区已满（客户端长期不读取）或连接已断开的客户端会被移除，
+    不会拖慢其他客户端。
+    """
+
+    def __init__(self, poll: Callable[[], Iterable[Tuple[str, Dict]]],
+                 poll_interval: float = POLL_INTERVAL, heartbeat_interval: float = HEARTBEAT_INTERVAL):
+        """
+        Args:
+            poll: 检查数据变化的函数，返回 (事件名, 数据) 列表
+            poll_interval: 检查间隔（秒）
+            heartbeat_interval: 心跳间隔（秒）
+        """
+        self.poll = poll
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._event_id = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def client_count(self) -> int:
+        """当前订阅连接数"""
+        with self._lock:
+            return len(self._clients)
+
+    def add_client(self, sock):
+        """接管已发送完响应头的连接"""
+        sock.setblocking(False)
+        if not self.send(sock, f"retry: {RETRY_MILLISECONDS}\n\n".encode('ascii')):
+            return
+        with self._lock:
+            self._clients.add(sock)
+
+    def send(self, sock, data: bytes) -> bool:
+        """向单个客户端写入数据，失败时关闭连接并返回 False"""
+        try:
+            if sock.send(data) == len(data):
+                return True
+        except OSError:
+            pass
+
+        # 发送不完整（缓冲区已满）或连接已断开
+        with self._lock:
+            self._clients.discard(sock)
+        try:
+            sock.close()
+        except OSError:
+            pass
+        return False
+
+    def broadcast(self, data: bytes):
+        """向所有客户端写入同一份数据"""
+        with self._lock:
+            clients = list(self._clients)
+        for sock in clients:
+            self.send(sock, data)
+
+    def publish(self, event: str, data: Dict):
+        """发布事件"""
+        self._event_id += 1
+        self.broadcast(encode_event(self._event_id, event, data))
+
+    def run(self):
+        """广播线程主循环"""
+        last_heartbeat = time.monotonic()
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                for event, data in self.poll():
+                    self.publish(event, data)
+            except Exception as e:
+                print(f"事件检查出错: {e}")
+
+            now = time.monotonic()
+            if now - last_heartbeat >= self.heartbeat_interval:
+                last_heartbeat = now
+                self.broadcast(b": heartbeat\n\n")
+
+    def start(self):
+        """启动广播线程"""
+        self._thread = threading.Thread(target=self.run, name='event-broadcaster', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止广播线程并关闭所有连接"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            clients = list(self._clients)
+            self._clients.clear()
+        for sock in clients:
+            try:
+                sock.close()
+            except OSError:
+                pass
@@ -5,11 +5,30 @@
 自动生成Excel（本周行情数据）和TXT（每周周报）文档
 """
 
-import openpyxl
-from openpyxl.styles import Font, Alignment
 from datetime import datetime, timedelta
 import os
 
+from profiling import run_with_profiling
+from registry import registry
+from tracing import traced
+
+# 模拟本周数据（地区 → 各产品的价格及涨跌），注册表中有而此处没有的地区或产品显示为“无数据”
+SAMPLE_PRICES = {
+    "全国": {"生猪": "12.50(+0.08)", "仔猪": "20.36(+0.13)", "鸡蛋": "7.04(-0.27)", "淘汰鸡": "10.52(-0.45)", "玉米": "2319(-5)", "豆粕": "3245(-15)"},
+    "河北": {"生猪": "12.17(-0.34)", "仔猪": "19.85(+0.25)", "鸡蛋": "6.85(-0.45)", "淘汰鸡": "10.15(-0.55)", "玉米": "2295(-10)", "豆粕": "3220(-18)"},
+    "山东": {"生猪": "12.49(-0.14)", "仔猪": "20.45(+0.18)", "鸡蛋": "7.02(-0.28)", "淘汰鸡": "10.45(-0.48)", "玉米": "2315(+0)", "豆粕": "3240(-12)"},
+    "河南": {"生猪": "12.42(-0.10)", "仔猪": "20.10(+0.12)", "鸡蛋": "6.98(-0.32)", "淘汰鸡": "10.38(-0.52)", "玉米": "2308(-8)", "豆粕": "3235(-14)"},
+    "湖北": {"生猪": "12.55(+0.10)", "仔猪": "20.74(+0.51)", "鸡蛋": "7.15(-0.18)", "淘汰鸡": "10.68(-0.35)", "玉米": "2335(-3)", "豆粕": "3260(-10)"},
+    "四川": {"生猪": "12.80(+0.00)", "仔猪": "21.05(+0.00)", "鸡蛋": "7.25(-0.15)", "淘汰鸡": "10.85(-0.28)", "玉米": "2350(+5)", "豆粕": "3275(-8)"},
+    "黑龙江": {"生猪": "11.95(-0.23)", "仔猪": "19.50(+0.30)", "鸡蛋": "7.00(+0.00)", "淘汰鸡": "10.25(-0.42)", "玉米": "2280(-12)", "豆粕": "3205(-22)"},
+    "陕西": {"生猪": "12.30(-0.15)", "仔猪": "20.20(+0.15)", "鸡蛋": "6.95(-0.38)", "淘汰鸡": "10.30(-0.50)", "玉米": "2305(-7)", "豆粕": "3230(-16)"},
+    "甘肃": {"生猪": "12.10(-0.28)", "仔猪": "19.95(+0.22)", "鸡蛋": "6.88(-0.42)", "淘汰鸡": "10.18(-0.58)", "玉米": "2290(-15)", "豆粕": "3215(-20)"},
+    "广西": {"生猪": "12.90(+0.05)", "仔猪": "20.90(+0.08)", "鸡蛋": "7.18(-0.20)", "淘汰鸡": "10.75(-0.32)", "玉米": "2340(+2)", "豆粕": "3265(-9)"},
+    "广东": {"生猪": "13.10(+0.08)", "仔猪": "21.20(-0.05)", "鸡蛋": "7.35(-0.08)", "淘汰鸡": "10.95(-0.18)", "玉米": "2360(+8)", "豆粕": "3285(-5)"},
+    "江西": {"生猪": "12.65(-0.07)", "仔猪": "20.65(+0.10)", "鸡蛋": "7.10(-0.25)", "淘汰鸡": "10.62(-0.40)", "玉米": "2330(-4)", "豆粕": "3255(-11)"},
+    "福建": {"生猪": "12.85(+0.12)", "仔猪": "20.85(+0.17)", "鸡蛋": "7.20(-0.12)", "淘汰鸡": "10.80(-0.25)", "玉米": "2345(+3)", "豆粕": "3270(-7)"}
+}
+
 def get_week_range():
     """获取本周的起止日期（周一到周日）"""
     today = datetime.now()
@@ -19,72 +38,44 @@ def get_week_range():
     sunday = monday + timedelta(days=6)
     return monday, sunday
 
+@traced('report.excel', result='file')
 def generate_excel_document():
     """生成Excel文档 - 本周行情数据"""
+    # openpyxl 导入较慢，只在实际生成Excel时加载
+    import openpyxl
+    from openpyxl.styles import Font, Alignment
+    from openpyxl.utils import get_column_letter
+
     # 创建工作簿
     wb = openpyxl.Workbook()
     sheet = wb.active
     sheet.title = "重点省份行情"
 
-    # 定义省份列表
-    provinces = ["全国", "河北", "山东", "河南", "湖北", "四川", "黑龙江", "陕西", "甘肃", "广西", "广东", "江西", "福建"]
-
-    # 模拟本周数据 - 生猪、仔猪、鸡蛋
-    data_table1 = [
-        ["地区", "生猪(元/kg)", "仔猪(元/kg)", "鸡蛋(元/kg)"],
-        ["全国", "12.50(+0.08)", "20.36(+0.13)", "7.04(-0.27)"],
-        ["河北", "12.17(-0.34)", "19.85(+0.25)", "6.85(-0.45)"],
-        ["山东", "12.49(-0.14)", "20.45(+0.18)", "7.02(-0.28)"],
-        ["河南", "12.42(-0.10)", "20.10(+0.12)", "6.98(-0.32)"],
-        ["湖北", "12.55(+0.10)", "20.74(+0.51)", "7.15(-0.18)"],
-        ["四川", "12.80(+0.00)", "21.05(+0.00)", "7.25(-0.15)"],
-        ["黑龙江", "11.95(-0.23)", "19.50(+0.30)", "7.00(+0.00)"],
-        ["陕西", "12.30(-0.15)", "20.20(+0.15)", "6.95(-0.38)"],
-        ["甘肃", "12.10(-0.28)", "19.95(+0.22)", "6.88(-0.42)"],
-        ["广西", "12.90(+0.05)", "20.90(+0.08)", "7.18(-0.20)"],
-        ["广东", "13.10(+0.08)", "21.20(-0.05)", "7.35(-0.08)"],
-        ["江西", "12.65(-0.07)", "20.65(+0.10)", "7.10(-0.25)"],
-        ["福建", "12.85(+0.12)", "20.85(+0.17)", "7.20(-0.12)"],
-    ]
-
-    # 模拟本周数据 - 淘汰鸡、玉米、豆粕
-    data_table2 = [
-        ["地区", "淘汰鸡(元/kg)", "玉米(元/吨)", "豆粕(元/吨)"],
-        ["全国", "10.52(-0.45)", "2319(-5)", "3245(-15)"],
-        ["河北", "10.15(-0.55)", "2295(-10)", "3220(-18)"],
-        ["山东", "10.45(-0.48)", "2315(+0)", "3240(-12)"],
-        ["河南", "10.38(-0.52)", "2308(-8)", "3235(-14)"],
-        ["湖北", "10.68(-0.35)", "2335(-3)", "3260(-10)"],
-        ["四川", "10.85(-0.28)", "2350(+5)", "3275(-8)"],
-        ["黑龙江", "10.25(-0.42)", "2280(-12)", "3205(-22)"],
-        ["陕西", "10.30(-0.50)", "2305(-7)", "3230(-16)"],
-        ["甘肃", "10.18(-0.58)", "2290(-15)", "3215(-20)"],
-        ["广西", "10.75(-0.32)", "2340(+2)", "3265(-9)"],
-        ["广东", "10.95(-0.18)", "2360(+8)", "3285(-5)"],
-        ["江西", "10.62(-0.40)", "2330(-4)", "3255(-11)"],
-        ["福建", "10.80(-0.25)", "2345(+3)", "3270(-7)"],
-    ]
-
-    # 写入第一个表格
-    for row_idx, row_data in enumerate(data_table1, start=1):
-        for col_idx, value in enumerate(row_data, start=1):
-            cell = sheet.cell(row=row_idx, column=col_idx, value=value)
-            cell.font = Font(name="Calibri", size=12)
-            cell.alignment = Alignment(horizontal="left", vertical="center")
-
-    # 写入第二个表格
-    row_start_table2 = len(data_table1) + 2
-    for row_idx, row_data in enumerate(data_table2, start=row_start_table2):
-        for col_idx, value in enumerate(row_data, start=1):
-            cell = sheet.cell(row=row_idx, column=col_idx, value=value)
-            cell.font = Font(name="Calibri", size=12)
-            cell.alignment = Alignment(horizontal="left", vertical="center")
+    # 产品按注册表顺序每3个一张表格，地区按注册表中的周报顺序排列
+    tables = []
+    for columns in registry.report_tables:
+        products = [registry.products[index] for index in columns]
+        table = [["地区"] + [f"{product.name}({product.report_unit})" for product in products]]
+        for region in registry.report_order:
+            name = registry.regions[region].name
+            prices = SAMPLE_PRICES.get(name, {})
+            table.append([name] + [prices.get(product.name, "无数据") for product in products])
+        tables.append(table)
+
+    # 依次写入各表格，表格之间空一行
+    row_start = 1
+    for table in tables:
+        for row_idx, row_data in enumerate(table, start=row_start):
+            for col_idx, value in enumerate(row_data, start=1):
+                cell = sheet.cell(row=row_idx, column=col_idx, value=value)
+                cell.font = Font(name="Calibri", size=12)
+                cell.alignment = Alignment(horizontal="left", vertical="center")
+        row_start += len(table) + 1
 
     # 设置列宽
     sheet.column_dimensions['A'].width = 12
-    sheet.column_dimensions['B'].width = 18
-    sheet.column_dimensions['C'].width = 18
-    sheet.column_dimensions['D'].width = 18
+    for col_idx in range(2, max(len(columns) for columns in registry.report_tables) + 2):
+        sheet.column_dimensions[get_column_letter(col_idx)].width = 18
 
     # 保存文件
     monday, sunday = get_week_range()
@@ -94,6 +85,7 @@ def generate_excel_document():
     print(f"✅ Excel文档已生成: {filename}")
     return filename
 
+@traced('report.txt', result='file')
 def generate_txt_document():
     """生成TXT文档 - 每周周报"""
     monday, sunday = get_week_range()
@@ -209,4 +201,4 @@ def main():
         raise
 
 if __name__ == "__main__":
-    main()
+    run_with_profiling(main, 'generate_weekly_documents')
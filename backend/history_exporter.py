@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史数据列式导出脚本
+将 market_history.json 展开为长表（日期、产品、地区、价格、涨跌、来源），
+导出为 CSV / Parquet / Arrow IPC，支持按月分区和增量导出
+
+增量导出记录已导出的最后日期及该日期行的哈希；同一天多次采集会改写当天的历史记录，
+因此每次增量导出都会重新检查最后日期，内容有变化时先删除已导出的旧行再重新导出
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# 导出列（顺序即文件中的列顺序）
+COLUMNS = ['date', 'product', 'province', 'price', 'change', 'source']
+
+# 支持的导出格式及文件扩展名
+FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'arrow': '.arrow'
+}
+
+# 增量导出状态文件（记录每个导出目录、每种格式已导出的最后日期及该日期行的哈希）
+STATE_FILENAME = '.export_state.json'
+
+
+def require_pyarrow(fmt: str):
+    """
+    加载 pyarrow（Parquet 和 Arrow 格式需要）
+
+    pyarrow 导入较慢，只在实际导出或读取列式文件时加载，CSV 导出不受影响。
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError(f"导出 {fmt} 格式需要 pyarrow，请先执行: pip install pyarrow")
+    return pyarrow
+
+
+def load_history(history_file: str = 'market_history.json') -> Dict:
+    """加载历史数据"""
+    if not os.path.exists(history_file):
+        print(f"⚠️  历史数据文件不存在: {history_file}")
+        return {}
+
+    with open(history_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def history_to_rows(history: Dict, since: Optional[str] = None) -> List[Dict]:
+    """
+    将历史数据展开为长表行
+
+    涨跌按同一产品、同一地区的上一个有数据的日期计算，
+    因此即使只导出 since 之后的日期，也会遍历完整历史。
+
+    Args:
+        history: 以日期为键的历史数据
+        since: 只返回该日期之后（不含）的行
+
+    Returns:
+        行列表，每行包含 COLUMNS 中的字段
+    """
+    rows = []
+    previous_prices = {}
+
+    for date in sorted(history.keys()):
+        day_data = history[date]
+
+        for product_name, product_info in day_data.get('products', {}).items():
+            sources = product_info.get('sources') or []
+            source = sources[0].get('source') if sources else None
+
+            observations = [('全国', product_info.get('price'))]
+            for province, region in (product_info.get('regions') or {}).items():
+                observations.append((province, region.get('price')))
+
+            for province, price in observations:
+                key = (product_name, province)
+                previous = previous_prices.get(key)
+                change = price - previous if price is not None and previous is not None else None
+                if price is not None:
+                    previous_prices[key] = price
+
+                if since is not None and date <= since:
+                    continue
+
+                rows.append({
+                    'date': date,
+                    'product': product_name,
+                    'province': province,
+                    'price': price,
+                    'change': change,
+                    'source': source
+                })
+
+    return rows
+
+
+def rows_to_arrow_table(rows: List[Dict]):
+    """将长表行转换为 Arrow 表"""
+    pa = require_pyarrow('arrow')
+    schema = pa.schema([
+        ('date', pa.string()),
+        ('product', pa.string()),
+        ('province', pa.string()),
+        ('price', pa.float64()),
+        ('change', pa.float64()),
+        ('source', pa.string())
+    ])
+    return pa.Table.from_pydict({column: [row[column] for row in rows] for column in COLUMNS}, schema=schema)
+
+
+def partition_rows(rows: List[Dict], by_month: bool) -> Dict[str, List[Dict]]:
+    """按月分区（不分区时所有行归入同一个分区）"""
+    if not by_month:
+        return {'': rows}
+
+    partitions = {}
+    for row in rows:
+        partitions.setdefault(f"month={row['date'][:7]}", []).append(row)
+    return partitions
+
+
+def write_csv(rows: List[Dict], path: str):
+    """追加写入CSV（文件不存在时写入表头）"""
+    is_new = not os.path.exists(path)
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        if is_new:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_columnar(rows: List[Dict], directory: str, fmt: str) -> str:
+    """
+    写入 Parquet 或 Arrow IPC 分片文件
+
+    这两种格式不支持原地追加，每次增量导出写一个以日期范围命名的新分片，
+    读取时将目录作为数据集整体读取。
+    """
+    pa = require_pyarrow(fmt)
+    table = rows_to_arrow_table(rows)
+    path = os.path.join(directory, f"history_{rows[0]['date']}_{rows[-1]['date']}{FORMATS[fmt]}")
+
+    if fmt == 'parquet':
+        pa.parquet.write_table(table, path)
+    else:
+        with pa.OSFile(path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    return path
+
+
+def rows_hash(rows: List[Dict]) -> str:
+    """行内容哈希（用于判断已导出的日期是否被改写）"""
+    content = json.dumps(rows, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+def remove_exported_date(output_dir: str, fmt: str, partition_by_month: bool, date: str):
+    """
+    删除已导出的某一天的行（只用于最后导出的日期，其行总在文件末尾或以该日期结尾的分片中）
+    """
+    directory = os.path.join(output_dir, f"month={date[:7]}") if partition_by_month else output_dir
+    if not os.path.isdir(directory):
+        return
+
+    if fmt == 'csv':
+        path = os.path.join(directory, 'history.csv')
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            content = f.read()
+        # 行按日期升序写入，该日期第一行之后的内容都属于该日期
+        position = content.find(b'\n' + date.encode('utf-8') + b',')
+        if position >= 0:
+            with open(path, 'r+b') as f:
+                f.truncate(position + 1)
+        return
+
+    pa = require_pyarrow(fmt)
+    suffix = f"_{date}{FORMATS[fmt]}"
+    for filename in os.listdir(directory):
+        if not (filename.startswith('history_') and filename.endswith(suffix)):
+            continue
+        path = os.path.join(directory, filename)
+        if fmt == 'parquet':
+            table = pa.parquet.read_table(path)
+        else:
+            with pa.OSFile(path, 'rb') as source:
+                table = pa.ipc.open_file(source).read_all()
+        kept = [row for row in table.to_pylist() if row['date'] != date]
+        os.remove(path)
+        if kept:
+            write_columnar(kept, directory, fmt)
+
+
+def clear_export(output_dir: str, fmt: str):
+    """删除已导出的文件（全量导出前调用，避免与旧分片重复）"""
+    for root, _, files in os.walk(output_dir):
+        for filename in files:
+            if filename.endswith(FORMATS[fmt]):
+                os.remove(os.path.join(root, filename))
+
+
+def load_export_state(output_dir: str) -> Dict:
+    """读取增量导出状态"""
+    path = os.path.join(output_dir, STATE_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_export_state(output_dir: str, state: Dict):
+    """保存增量导出状态"""
+    with open(os.path.join(output_dir, STATE_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+
+def export_history(history: Dict, output_dir: str, fmt: str = 'csv',
+                   partition_by_month: bool = False, full: bool = False) -> List[str]:
+    """
+    导出历史数据
+
+    Args:
+        history: 以日期为键的历史数据
+        output_dir: 导出目录
+        fmt: 导出格式（csv / parquet / arrow）
+        partition_by_month: 是否按月分区（month=YYYY-MM 子目录）
+        full: 是否忽略增量状态，重新导出全部数据
+
+    Returns:
+        本次写入的文件列表
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    if fmt != 'csv':
+        require_pyarrow(fmt)
+
+    os.makedirs(output_dir, exist_ok=True)
+    state = load_export_state(output_dir)
+    state_key = f"{fmt}:{'month' if partition_by_month else 'single'}"
+    exported = None if full else state.get(state_key)
+    if isinstance(exported, str):
+        # 旧版本状态只记录日期，没有哈希，最后日期按已改写处理
+        exported = {'date': exported, 'hash': None}
+    if full:
+        clear_export(output_dir, fmt)
+
+    last = exported['date'] if exported else None
+    # 从最后导出的日期开始（含）重新生成，检查该日期是否被改写
+    since = (datetime.strptime(last, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d') if last else None
+    rows = history_to_rows(history, since=since)
+    if last:
+        last_rows = [row for row in rows if row['date'] == last]
+        if last not in history or rows_hash(last_rows) == exported.get('hash'):
+            rows = [row for row in rows if row['date'] > last]
+        else:
+            print(f"{last} 的历史数据已改写，重新导出该日期")
+            remove_exported_date(output_dir, fmt, partition_by_month, last)
+
+    if not rows:
+        print(f"没有新数据需要导出（已导出至 {last}）")
+        return []
+
+    written = []
+    for partition, chunk in partition_rows(rows, partition_by_month).items():
+        directory = os.path.join(output_dir, partition) if partition else output_dir
+        os.makedirs(directory, exist_ok=True)
+
+        if fmt == 'csv':
+            path = os.path.join(directory, 'history.csv')
+            write_csv(chunk, path)
+        else:
+            path = write_columnar(chunk, directory, fmt)
+        written.append(path)
+
+    # 行按日期升序生成，最后一行即本次导出的最后日期
+    last = rows[-1]['date']
+    state[state_key] = {'date': last, 'hash': rows_hash([row for row in rows if row['date'] == last])}
+    save_export_state(output_dir, state)
+
+    print(f"✅ 已导出 {len(rows)} 行 ({fmt}) 到 {output_dir}")
+    return written
+
+
+def read_arrow_export(output_dir: str):
+    """
+    以零拷贝方式读取 Arrow IPC 导出
+
+    通过内存映射打开每个分片，返回的表中的数组直接引用映射内存，
+    进程内的消费者无需反序列化或复制数据。
+    """
+    pa = require_pyarrow('arrow')
+    tables = []
+    for root, _, files in sorted(os.walk(output_dir)):
+        for filename in sorted(files):
+            if filename.endswith(FORMATS['arrow']):
+                source = pa.memory_map(os.path.join(root, filename), 'r')
+                tables.append(pa.ipc.open_file(source).read_all())
+
+    if not tables:
+        return rows_to_arrow_table([])
+    return pa.concat_tables(tables)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='导出历史行情数据为列式文件')
+    parser.add_argument('--history', default='market_history.json', help='历史数据文件')
+    parser.add_argument('--output', default='exports', help='导出目录')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv', help='导出格式')
+    parser.add_argument('--partition-month', action='store_true', help='按月分区')
+    parser.add_argument('--full', action='store_true', help='忽略增量状态，全量导出')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("历史数据导出")
+    print("=" * 60)
+    print(f"执行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    history = load_history(args.history)
+    print(f"找到 {len(history)} 天的历史数据")
+
+    output_dir = os.path.join(args.output, args.format)
+    for path in export_history(history, output_dir, args.format, args.partition_month, args.full):
+        print(f"  - {path}")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+下载服务器压力测试
+在本机生成模拟周报归档（可配置周数和文件大小），启动 download_server.py，
+按设定比例混合以下请求并统计吞吐量、延迟分位数、错误率和服务器内存：
+
+    listing      文档列表及归档分页查询（突发请求）
+    download     完整下载大体积 xlsx
+    slow         慢速读取的下载（模拟弱网客户端长时间占用连接）
+    conditional  带 If-None-Match 的条件请求（预期 304）
+
+    python loadtest.py --duration 20 --concurrency 64 --mix listing=50,download=20,slow=5,conditional=25
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+# 默认请求比例
+DEFAULT_MIX = 'listing=50,download=20,slow=5,conditional=25'
+
+# 读取响应的块大小
+READ_CHUNK_SIZE = 64 * 1024
+
+# 慢速客户端的读取速度（字节/秒）
+SLOW_READ_RATE = 256 * 1024
+
+# 服务器内存采样间隔（秒）
+MEMORY_SAMPLE_INTERVAL = 0.5
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'download_server.py')
+
+
+def create_archive(directory: str, weeks: int, xlsx_bytes: int, txt_bytes: int) -> Dict[str, List[str]]:
+    """
+    生成模拟周报归档
+
+    Returns:
+        {'excel': [文件名...], 'txt': [文件名...]}，按周倒序
+    """
+    files = {'excel': [], 'txt': []}
+    monday = datetime.now() - timedelta(days=datetime.now().weekday())
+    line = "本周生猪价格小幅上涨，仔猪价格稳定，鸡蛋价格回落，玉米、豆粕价格震荡。\n".encode('utf-8')
+
+    for week in range(weeks):
+        start = monday - timedelta(weeks=week)
+        week_str = f"{start.strftime('%Y-%m-%d')}至{(start + timedelta(days=6)).strftime('%Y-%m-%d')}"
+
+        excel = f"本周行情数据_{week_str}.xlsx"
+        with open(os.path.join(directory, excel), 'wb') as f:
+            # xlsx 本身是压缩格式，用随机字节模拟其不可再压缩的内容
+            f.write(os.urandom(xlsx_bytes))
+        files['excel'].append(excel)
+
+        txt = f"每周周报_{week_str}.txt"
+        with open(os.path.join(directory, txt), 'wb') as f:
+            f.write((line * (txt_bytes // len(line) + 1))[:txt_bytes])
+        files['txt'].append(txt)
+
+    return files
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """解析请求比例，如 listing=50,download=20"""
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"未知的请求类型: {name}（可选: {', '.join(SCENARIOS)}）")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def process_rss(pid: int) -> Optional[int]:
+    """进程常驻内存（字节），读取 /proc，非 Linux 系统返回 None"""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """分位数（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Client:
+    """一个虚拟用户（保持一个长连接，出错时重建连接）"""
+
+    def __init__(self, host: str, port: int, files: Dict[str, List[str]], rng: random.Random):
+        self.host = host
+        self.port = port
+        self.files = files
+        self.rng = rng
+        self.conn = None
+        self.etags: Dict[str, str] = {}
+
+    def connection(self) -> http.client.HTTPConnection:
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        return self.conn
+
+    def reset(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def get(self, path: str, headers: Optional[Dict] = None, read_rate: Optional[int] = None) -> Tuple[int, int, Dict]:
+        """发送 GET 请求并读完响应体，返回 (状态码, 响应体字节数, 响应头)"""
+        conn = self.connection()
+        conn.request('GET', path, headers=headers or {})
+        response = conn.getresponse()
+        total = 0
+        while True:
+            chunk = response.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+            if read_rate:
+                time.sleep(len(chunk) / read_rate)
+        if response.will_close:
+            self.reset()
+        return response.status, total, dict(response.getheaders())
+
+    def download_path(self, doc_type: str = 'excel') -> str:
+        return '/download/' + quote(self.rng.choice(self.files[doc_type]))
+
+    def listing(self):
+        if self.rng.random() < 0.5:
+            return self.get('/api/documents')
+        return self.get("/api/documents?type=excel&limit=20")
+
+    def download(self):
+        return self.get(self.download_path('excel'))
+
+    def slow(self):
+        return self.get(self.download_path('excel'), read_rate=SLOW_READ_RATE)
+
+    def conditional(self):
+        path = self.download_path(self.rng.choice(['excel', 'txt']))
+        etag = self.etags.get(path)
+        if etag is None:
+            status, size, headers = self.get(path)
+            self.etags[path] = headers.get('ETag', '')
+            return status, size, headers
+        return self.get(path, headers={'If-None-Match': etag})
+
+
+SCENARIOS = ('listing', 'download', 'slow', 'conditional')
+
+
+class LoadTest:
+    """按比例混合请求的压力测试"""
+
+    def __init__(self, host: str, port: int, files: Dict[str, List[str]], mix: Dict[str, int],
+                 concurrency: int, duration: float, server_pid: Optional[int] = None, seed: int = 42):
+        self.host = host
+        self.port = port
+        self.files = files
+        self.mix = mix
+        self.concurrency = concurrency
+        self.duration = duration
+        self.server_pid = server_pid
+        self.seed = seed
+        self.records: Dict[str, List[Tuple[float, int, int, Optional[str]]]] = {name: [] for name in mix}
+        self.memory: List[int] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def worker(self, index: int, deadline: float):
+        rng = random.Random(self.seed + index)
+        client = Client(self.host, self.port, self.files, rng)
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+
+        while time.monotonic() < deadline:
+            scenario = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            error = None
+            status, size = 0, 0
+            try:
+                status, size, _ = getattr(client, scenario)()
+                if status >= 400:
+                    error = f"HTTP {status}"
+            except (OSError, http.client.HTTPException) as e:
+                error = type(e).__name__
+                client.reset()
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.records[scenario].append((elapsed, status, size, error))
+        client.reset()
+
+    def sample_memory(self):
+        while not self._stopped.wait(MEMORY_SAMPLE_INTERVAL):
+            rss = process_rss(self.server_pid)
+            if rss is not None:
+                self.memory.append(rss)
+
+    def run(self) -> Dict:
+        """执行压力测试并返回统计结果"""
+        sampler = None
+        if self.server_pid is not None:
+            sampler = threading.Thread(target=self.sample_memory, daemon=True)
+            sampler.start()
+
+        start = time.monotonic()
+        deadline = start + self.duration
+        threads = [threading.Thread(target=self.worker, args=(i, deadline), daemon=True)
+                   for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.monotonic() - start
+
+        self._stopped.set()
+        if sampler is not None:
+            sampler.join()
+        return self.report(wall)
+
+    def report(self, wall: float) -> Dict:
+        scenarios = {}
+        all_latencies = []
+        total_requests = total_errors = total_bytes = 0
+        for name, records in self.records.items():
+            latencies = sorted(record[0] for record in records)
+            errors = sum(1 for record in records if record[3])
+            size = sum(record[2] for record in records)
+            statuses = {}
+            for record in records:
+                statuses[str(record[1])] = statuses.get(str(record[1]), 0) + 1
+            scenarios[name] = summarize_latencies(latencies, wall, errors, size, statuses)
+            all_latencies.extend(latencies)
+            total_requests += len(records)
+            total_errors += errors
+            total_bytes += size
+
+        result = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'concurrency': self.concurrency,
+                'duration': wall,
+                'mix': self.mix
+            },
+            'total': summarize_latencies(sorted(all_latencies), wall, total_errors, total_bytes, None),
+            'scenarios': scenarios
+        }
+        if self.memory:
+            result['server_memory'] = {
+                'min': min(self.memory),
+                'max': max(self.memory),
+                'final': self.memory[-1]
+            }
+        return result
+
+
+def summarize_latencies(latencies: List[float], wall: float, errors: int, size: int,
+                        statuses: Optional[Dict[str, int]]) -> Dict:
+    """请求数、吞吐量、错误率和延迟分位数"""
+    count = len(latencies)
+    summary = {
+        'requests': count,
+        'throughput': count / wall if wall else 0,
+        'bytes_per_second': size / wall if wall else 0,
+        'errors': errors,
+        'error_rate': errors / count if count else 0,
+        'p50': percentile(latencies, 0.50),
+        'p90': percentile(latencies, 0.90),
+        'p99': percentile(latencies, 0.99),
+        'max': latencies[-1] if latencies else 0
+    }
+    if statuses is not None:
+        summary['statuses'] = statuses
+    return summary
+
+
+def print_report(result: Dict):
+    """打印统计结果"""
+    print("=" * 96)
+    print(f"{'类型':<12}{'请求数':>8}{'请求/秒':>10}{'MB/秒':>9}{'错误率':>9}"
+          f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'最大 ms':>10}  状态码")
+    print("-" * 96)
+    rows = list(result['scenarios'].items()) + [('合计', result['total'])]
+    for name, item in rows:
+        statuses = ', '.join(f"{code}×{count}" for code, count in sorted(item.get('statuses', {}).items()))
+        print(f"{name:<12}{item['requests']:>8}{item['throughput']:>10.1f}"
+              f"{item['bytes_per_second'] / 1024 / 1024:>9.2f}{item['error_rate'] * 100:>8.2f}%"
+              f"{item['p50'] * 1000:>10.1f}{item['p90'] * 1000:>10.1f}{item['p99'] * 1000:>10.1f}"
+              f"{item['max'] * 1000:>10.1f}  {statuses}")
+    print("=" * 96)
+    memory = result.get('server_memory')
+    if memory:
+        print(f"服务器内存: 最低 {memory['min'] / 1024 / 1024:.1f} MiB，"
+              f"最高 {memory['max'] / 1024 / 1024:.1f} MiB，结束时 {memory['final'] / 1024 / 1024:.1f} MiB")
+
+
+def free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port: int, timeout: float = 15.0):
+    """等待服务器开始监听"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"服务器在 {timeout:.0f} 秒内未启动")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='下载服务器压力测试')
+    parser.add_argument('--duration', type=float, default=10.0, help='测试时长（秒）')
+    parser.add_argument('--concurrency', type=int, default=32, help='并发虚拟用户数')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'请求比例（默认 {DEFAULT_MIX}）')
+    parser.add_argument('--weeks', type=int, default=26, help='模拟归档的周数')
+    parser.add_argument('--xlsx-mb', type=float, default=2.0, help='每个 xlsx 文件的大小（MB）')
+    parser.add_argument('--txt-kb', type=float, default=20.0, help='每个 txt 文件的大小（KB）')
+    parser.add_argument('--workers', type=int, help='服务器工作线程数（默认使用服务器默认值）')
+    parser.add_argument('--archive', help='归档目录（默认创建临时目录，测试后删除）')
+    parser.add_argument('--json', metavar='FILE', help='将结果保存为JSON')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    archive = args.archive or tempfile.mkdtemp(prefix='anyu-loadtest-')
+    os.makedirs(archive, exist_ok=True)
+
+    print("=" * 60)
+    print("下载服务器压力测试")
+    print("=" * 60)
+    print(f"生成模拟归档: {args.weeks} 周，xlsx {args.xlsx_mb}MB，txt {args.txt_kb}KB → {archive}")
+    files = create_archive(archive, args.weeks, int(args.xlsx_mb * 1024 * 1024), int(args.txt_kb * 1024))
+
+    port = free_port()
+    command = [sys.executable, SERVER_SCRIPT, '--port', str(port)]
+    if args.workers:
+        command += ['--workers', str(args.workers)]
+    server = subprocess.Popen(command, cwd=archive, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        wait_for_server(port)
+        print(f"服务器已启动: http://127.0.0.1:{port} (PID {server.pid})")
+        print(f"并发 {args.concurrency}，时长 {args.duration}s，比例 {mix}")
+        print()
+
+        result = LoadTest('127.0.0.1', port, files, mix, args.concurrency, args.duration, server.pid).run()
+        print_report(result)
+
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            print(f"结果已保存: {args.json}")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        if not args.archive:
+            shutil.rmtree(archive, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行情数据分片发布
+将 market.json 按产品拆分为独立分片（shards/products/<产品>.json），
+可选地为每个产品生成近期历史分片（shards/history/<产品>.json），
+并写入带内容哈希的轻量清单 shards/manifest.json。
+前端先加载清单，只请求当前页面需要、且哈希与本地缓存不同的分片
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from registry import registry
+
+# 默认分片输出目录
+SHARD_DIR = 'shards'
+
+# 清单文件名
+MANIFEST_FILENAME = 'manifest.json'
+
+# 历史分片默认保留的天数
+HISTORY_DAYS = 30
+
+# 清单格式版本
+MANIFEST_VERSION = 1
+
+def serialize(data) -> bytes:
+    """分片序列化（紧凑格式，键顺序固定，相同数据得到相同哈希）"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def shard_hash(content: bytes) -> str:
+    """分片内容哈希（SHA-256 前16位）"""
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+def load_manifest(output_dir: str) -> Dict:
+    """读取现有清单，不存在时返回空清单"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest.setdefault('version', MANIFEST_VERSION)
+    manifest.setdefault('products', {})
+    return manifest
+
+
+def write_shard(output_dir: str, relpath: str, content: bytes, previous: Optional[Dict]) -> Dict:
+    """
+    写入单个分片
+
+    哈希与清单中记录的一致且文件仍存在时不重写，文件修改时间保持不变，
+    便于下游按修改时间判断是否需要重新部署。
+
+    Returns:
+        清单条目 {'path', 'hash', 'size'}
+    """
+    digest = shard_hash(content)
+    entry = {'path': relpath, 'hash': digest, 'size': len(content)}
+
+    path = os.path.join(output_dir, relpath)
+    if previous and previous.get('hash') == digest and os.path.exists(path):
+        return entry
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return entry
+
+
+def product_shard(market_data: Dict, product_key: str) -> Dict:
+    """单个产品的最新行情分片"""
+    return {
+        'update_date': market_data.get('update_date'),
+        'update_time': market_data.get('update_time'),
+        'product': product_key,
+        **market_data['products'][product_key]
+    }
+
+
+def history_shards(history: Dict, days: int = HISTORY_DAYS) -> Dict[str, Dict]:
+    """
+    按产品拆分近期历史
+
+    Returns:
+        {产品英文键: {'product', 'days', 'series': [{'date', 'price', 'regions'?}, ...]}}，日期升序
+    """
+    shards = {}
+    for date in sorted(history)[-days:]:
+        for product_name, product_info in history[date].get('products', {}).items():
+            # market_history.json 以中文名存储，分片按注册表中的英文键命名
+            product = registry.product(product_name)
+            product_key = product.key if product is not None else product_name
+            shard = shards.setdefault(product_key, {'product': product_key, 'days': days, 'series': []})
+            point = {'date': date, 'price': product_info.get('price')}
+            if product_info.get('regions'):
+                point['regions'] = {province: region.get('price')
+                                    for province, region in product_info['regions'].items()}
+            shard['series'].append(point)
+    return shards
+
+
+def publish_shards(output_dir: str = SHARD_DIR, market_data: Optional[Dict] = None,
+                   history: Optional[Dict] = None, history_days: int = HISTORY_DAYS) -> Dict:
+    """
+    发布分片和清单
+
+    只更新传入的部分，清单中其余条目保持不变：
+    data_collector_v2 传入 market_data（最新行情分片）和追加当天行情后的 history，
+    data_collector 只传入 history（近期历史分片）。
+
+    Args:
+        output_dir: 分片输出目录
+        market_data: market.json 格式的最新行情
+        history: market_history.json 格式的历史数据
+        history_days: 历史分片保留的天数
+
+    Returns:
+        更新后的清单
+    """
+    manifest = load_manifest(output_dir)
+    products = manifest['products']
+    changed: List[str] = []
+
+    if market_data is not None:
+        manifest['update_date'] = market_data.get('update_date')
+        manifest['update_time'] = market_data.get('update_time')
+        for product_key, product_info in market_data.get('products', {}).items():
+            entry = products.setdefault(product_key, {})
+            entry['name'] = product_info.get('name')
+            entry['unit'] = product_info.get('unit')
+            previous = entry.get('latest')
+            entry['latest'] = write_shard(output_dir, f'products/{product_key}.json',
+                                          serialize(product_shard(market_data, product_key)), previous)
+            if entry['latest'] != previous:
+                changed.append(entry['latest']['path'])
+
+    if history is not None:
+        for product_key, shard in history_shards(history, history_days).items():
+            entry = products.setdefault(product_key, {})
+            product = registry.product(product_key)
+            if product is not None:
+                entry.setdefault('name', product.name)
+                entry.setdefault('unit', product.unit)
+            previous = entry.get('history')
+            entry['history'] = write_shard(output_dir, f'history/{product_key}.json', serialize(shard),
+                                           previous)
+            entry['history']['days'] = history_days
+            entry['history']['last_date'] = shard['series'][-1]['date'] if shard['series'] else None
+            if entry['history'] != previous:
+                changed.append(entry['history']['path'])
+
+    if changed or not os.path.exists(os.path.join(output_dir, MANIFEST_FILENAME)):
+        manifest['generated_at'] = datetime.now().isoformat(timespec='seconds')
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    print(f"分片已发布到: {output_dir} (更新 {len(changed)} 个分片)")
+    for path in changed:
+        print(f"  - {path}")
+    return manifest
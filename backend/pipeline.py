@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据处理流水线
+以有向无环图声明 采集 → 历史 → 周报 → 渲染 → 发布 各阶段及其依赖，
+没有依赖关系的阶段并行执行（如Excel、TXT、省份周报和前端渲染），
+阶段输出在内存中直接传给下游；输入未变化的阶段跳过并复用上次的输出
+"""
+
+import argparse
+import contextvars
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import traceback
+from collections import OrderedDict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+from tracing import span
+
+# 阶段缓存状态文件（记录每个阶段上次的输入指纹和输出）
+STATE_FILENAME = '.pipeline_state.json'
+
+# 默认并行阶段数
+DEFAULT_WORKERS = 4
+
+# 站点源文件与输出目录
+SITE_SOURCE = '../netlify-deploy'
+SITE_OUTPUT = '../netlify-deploy/dist'
+
+# 阶段执行结果：status 为 done / skipped / failed / blocked
+StageResult = namedtuple('StageResult', ['status', 'elapsed', 'output', 'error'])
+
+
+class Stage:
+    """流水线阶段"""
+
+    def __init__(self, name: str, func: Callable, deps: Sequence[str] = (), cache: bool = False,
+                 key: Optional[Callable[[], object]] = None):
+        """
+        Args:
+            name: 阶段名称
+            func: 阶段函数，以依赖阶段的名称为关键字参数接收其输出
+            deps: 依赖的阶段
+            cache: 输入未变化时是否跳过并复用上次输出（输出需可序列化为JSON）
+            key: 除依赖输出外影响结果的其他输入（如当前周），参与输入指纹计算
+        """
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.cache = cache
+        self.key = key
+
+
+def fingerprint(inputs: Dict, extra=None) -> str:
+    """阶段输入指纹"""
+    payload = json.dumps({'inputs': inputs, 'extra': extra}, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def outputs_present(output) -> bool:
+    """缓存的输出中声明的文件（output['files']）是否都还存在"""
+    if not isinstance(output, dict):
+        return True
+    return all(os.path.exists(path) for path in output.get('files', []))
+
+
+class Pipeline:
+    """
+    流水线
+
+    就绪（依赖均已完成）的阶段立即提交到线程池，任一阶段完成后再检查新的就绪阶段；
+    某阶段失败时，依赖它的阶段标记为 blocked，其余分支继续执行。
+    """
+
+    def __init__(self, state_file: str = STATE_FILENAME, max_workers: int = DEFAULT_WORKERS):
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.stages: Dict[str, Stage] = OrderedDict()
+        self.state = self.load_state()
+        self._lock = threading.Lock()
+
+    def load_state(self) -> Dict:
+        """读取阶段缓存状态"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self):
+        """保存阶段缓存状态"""
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2, default=str)
+
+    def stage(self, name: str, deps: Sequence[str] = (), cache: bool = False, key=None):
+        """注册阶段的装饰器"""
+        def decorator(func):
+            for dep in deps:
+                if dep not in self.stages:
+                    raise ValueError(f"阶段 {name} 依赖未声明的阶段: {dep}")
+            self.stages[name] = Stage(name, func, deps, cache, key)
+            return func
+        return decorator
+
+    def select(self, targets: Optional[Iterable[str]] = None) -> Sequence[str]:
+        """需要执行的阶段（目标阶段及其全部上游，按声明顺序）"""
+        if not targets:
+            return list(self.stages)
+
+        needed = set()
+        todo = list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in self.stages:
+                raise ValueError(f"未知的阶段: {name}")
+            if name not in needed:
+                needed.add(name)
+                todo.extend(self.stages[name].deps)
+        return [name for name in self.stages if name in needed]
+
+    def execute(self, stage: Stage, inputs: Dict, force: bool) -> StageResult:
+        """执行单个阶段（输入未变化时直接复用缓存的输出）"""
+        start = time.perf_counter()
+
+        digest = None
+        if stage.cache:
+            digest = fingerprint(inputs, stage.key() if stage.key else None)
+            cached = self.state.get(stage.name)
+            if not force and cached and cached.get('fingerprint') == digest and outputs_present(cached['output']):
+                print(f"⏭  [{stage.name}] 输入未变化，跳过")
+                return StageResult('skipped', time.perf_counter() - start, cached['output'], None)
+
+        print(f"▶  [{stage.name}] 开始")
+        try:
+            with span(f'stage.{stage.name}'):
+                output = stage.func(**inputs)
+        except Exception as e:
+            traceback.print_exc()
+            print(f"❌ [{stage.name}] 失败: {e}")
+            return StageResult('failed', time.perf_counter() - start, None, str(e))
+
+        elapsed = time.perf_counter() - start
+        if stage.cache:
+            with self._lock:
+                self.state[stage.name] = {'fingerprint': digest, 'output': output}
+        print(f"✅ [{stage.name}] 完成 ({elapsed:.2f}s)")
+        return StageResult('done', elapsed, output, None)
+
+    def run(self, targets: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, StageResult]:
+        """
+        执行流水线
+
+        Args:
+            targets: 目标阶段（默认全部）
+            force: 忽略缓存，强制执行所有阶段
+
+        Returns:
+            {阶段名称: StageResult}
+        """
+        pending = self.select(targets)
+        results: Dict[str, StageResult] = {}
+        running = {}
+
+        with span('pipeline', stages=len(pending)) as pipeline_span, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if not all(dep in results for dep in stage.deps):
+                        continue
+                    pending.remove(name)
+
+                    failed = [dep for dep in stage.deps if results[dep].status in ('failed', 'blocked')]
+                    if failed:
+                        print(f"⛔ [{name}] 上游阶段失败，未执行: {', '.join(failed)}")
+                        results[name] = StageResult('blocked', 0.0, None, f"上游阶段失败: {', '.join(failed)}")
+                        continue
+
+                    inputs = {dep: results[dep].output for dep in stage.deps}
+                    # 在当前上下文中执行，阶段 span 记录为 pipeline span 的子节点
+                    context = contextvars.copy_context()
+                    running[executor.submit(context.run, self.execute, stage, inputs, force)] = name
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+
+            pipeline_span.set(failed=[name for name, result in results.items()
+                                      if result.status in ('failed', 'blocked')])
+
+        self.save_state()
+        return {name: results[name] for name in self.select(targets)}
+
+
+def history_record(market_data: Dict) -> Dict:
+    """将 market.json 格式的行情转换为 append_to_history 使用的格式（产品以中文名为键）"""
+    return {
+        'date': market_data['update_date'],
+        # 时间戳取自采集时间而非当前时间，同一份行情重复写入时历史数据保持不变
+        'timestamp': f"{market_data['update_date']}T{market_data.get('update_time', '00:00')}:00",
+        'products': {
+            product_info['name']: {'price': product_info.get('national_price'), 'sources': []}
+            for product_info in market_data.get('products', {}).values()
+        }
+    }
+
+
+def parse_week(weekly: Dict):
+    """周报数据中的日期字符串转回 datetime"""
+    return (datetime.strptime(weekly['week_start'], '%Y-%m-%d'),
+            datetime.strptime(weekly['week_end'], '%Y-%m-%d'))
+
+
+def build_pipeline(skip_collect: bool = False, site_source: str = SITE_SOURCE, site_output: str = SITE_OUTPUT,
+                   state_file: str = STATE_FILENAME, max_workers: int = DEFAULT_WORKERS) -> Pipeline:
+    """声明各阶段及其依赖"""
+    # 各阶段按需导入，只运行部分阶段时不加载无关模块（如 openpyxl）
+    pipeline = Pipeline(state_file, max_workers)
+
+    @pipeline.stage('collect')
+    def collect():
+        from aggregation import load_city_prices
+        from data_collector_v2 import collect_market_data, load_previous_data, save_market_data
+        from snapshots import SnapshotStore
+
+        store = SnapshotStore()
+        if skip_collect:
+            latest = store.latest()
+            if latest:
+                print(f"  使用现有 market.json ({latest.get('update_date')} {latest.get('update_time')})")
+                return latest
+
+        # 与 data_collector_v2.py 相同，固定随机种子确保省份数据稳定
+        random.seed(42)
+        market_data = collect_market_data(load_previous_data(store), load_city_prices())
+        save_market_data(market_data, store=store)
+        return market_data
+
+    @pipeline.stage('history', deps=['collect'])
+    def history(collect):
+        from data_collector import append_to_history
+        return append_to_history(history_record(collect), 'market_history.json')
+
+    @pipeline.stage('weekly', deps=['history'], cache=True,
+                    key=lambda: datetime.now().strftime('%G-W%V'))
+    def weekly(history):
+        from weekly_report_generator import prepare_weekly_data
+
+        data = prepare_weekly_data(history)
+        data['week_start'] = data['week_start'].strftime('%Y-%m-%d')
+        data['week_end'] = data['week_end'].strftime('%Y-%m-%d')
+        print(f"  本周: {data['week_start']} 至 {data['week_end']}，共 {data['days']} 天数据")
+        return data
+
+    @pipeline.stage('excel', deps=['weekly'], cache=True)
+    def excel(weekly):
+        from weekly_report_generator import generate_excel_report
+
+        filename = generate_excel_report(weekly['provincial_data'], *parse_week(weekly))
+        return {'excel': filename, 'files': [filename]}
+
+    @pipeline.stage('txt', deps=['weekly'], cache=True)
+    def txt(weekly):
+        from weekly_report_generator import generate_txt_report
+
+        filename = generate_txt_report(weekly['provincial_data'], *parse_week(weekly),
+                                       weekly['current_avg'], weekly['change_info'])
+        return {'txt': filename, 'files': [filename]}
+
+    @pipeline.stage('provinces', deps=['weekly'], cache=True)
+    def provinces(weekly):
+        import multiprocessing
+        from weekly_report_generator import generate_province_reports
+
+        reports = generate_province_reports(weekly['provincial_data'], *parse_week(weekly),
+                                            mp_context=multiprocessing.get_context('spawn'))
+        files = [path for report in reports for path in (report['excel'], report['txt'])]
+        return {'reports': reports, 'files': files}
+
+    @pipeline.stage('index', deps=['weekly', 'excel', 'txt', 'provinces'], cache=True)
+    def index(weekly, excel, txt, provinces):
+        from weekly_report_generator import update_weekly_report_index
+
+        week_start, week_end = parse_week(weekly)
+        report_index = update_weekly_report_index(excel['excel'], txt['txt'], week_start, week_end,
+                                                  provinces['reports'])
+        return {'index': report_index, 'files': ['weekly_report_index.json']}
+
+    @pipeline.stage('shards', deps=['collect', 'history'])
+    def shards(collect, history):
+        from market_shards import publish_shards
+        return publish_shards(market_data=collect, history=history)
+
+    @pipeline.stage('render', deps=['collect'])
+    def render(collect):
+        from build_static import build_site
+        return build_site(site_source, '.', site_output, snapshots={'market.json': collect})
+
+    @pipeline.stage('publish', deps=['collect', 'index', 'render', 'shards'])
+    def publish(collect, index, render, shards):
+        from build_static import build_site
+
+        # 周报索引更新后再构建一次，增量构建只会重新写入周报页面
+        result = build_site(site_source, '.', site_output, snapshots={
+            'market.json': collect,
+            'weekly_report_index.json': index['index']
+        })
+        return {'written': sorted(set(render['written']) | set(result['written']))}
+
+    return pipeline
+
+
+def print_timings(results: Dict[str, StageResult], total: float):
+    """打印各阶段耗时"""
+    labels = {'done': '完成', 'skipped': '跳过', 'failed': '失败', 'blocked': '未执行'}
+    print("=" * 60)
+    print("阶段耗时:")
+    print("=" * 60)
+    for name, result in results.items():
+        print(f"  {name:<10} {labels[result.status]:<4} {result.elapsed:8.2f}s")
+    print(f"  {'总计':<10}      {total:8.2f}s")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='执行数据处理流水线')
+    parser.add_argument('targets', nargs='*', help='目标阶段（默认执行全部阶段）')
+    parser.add_argument('--skip-collect', action='store_true', help='不重新采集，使用现有 market.json')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，强制执行所有阶段')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='并行阶段数')
+    parser.add_argument('--site-output', default=SITE_OUTPUT, help='静态站点输出目录')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("数据处理流水线")
+    print("=" * 60)
+    print(f"执行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    pipeline = build_pipeline(skip_collect=args.skip_collect, site_output=args.site_output,
+                              max_workers=args.workers)
+    start = time.perf_counter()
+    results = pipeline.run(args.targets, force=args.force)
+    print_timings(results, time.perf_counter() - start)
+
+    failed = [name for name, result in results.items() if result.status in ('failed', 'blocked')]
+    print("=" * 60)
+    if failed:
+        print(f"❌ 流水线未全部完成: {', '.join(failed)}")
+        raise SystemExit(1)
+    print("✅ 流水线执行完成！")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
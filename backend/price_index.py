@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行情价格内存索引
+加载 market_history.json 和 market.json，按产品、地区建立按日期排序的价格序列，
+供下载服务器的价格查询接口使用；数据文件更新后自动重新加载
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from registry import registry
+
+# 两次检查数据文件是否更新的最小间隔（秒）
+RELOAD_CHECK_INTERVAL = 1.0
+
+# 产品标识（英文键或中文名）到中文名的映射
+PRODUCT_NAMES = {product.key: product.name for product in registry.products}
+PRODUCT_NAMES.update({product.name: product.name for product in registry.products})
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """文件的 (mtime, 大小)，文件不存在时返回 None"""
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return (stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def load_json(path: str) -> Optional[Dict]:
+    """读取JSON文件，不存在或格式错误时返回 None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class PriceSnapshot:
+    """
+    某一时刻的价格索引（构建后只读，可被多个线程同时查询）
+
+    series[(产品中文名, 地区)] = (日期列表, 价格列表)，日期升序排列
+    """
+
+    def __init__(self, history: Dict, latest: Optional[Dict]):
+        points = {}
+        for date in sorted(history):
+            for product_name, product_info in history[date].get('products', {}).items():
+                name = PRODUCT_NAMES.get(product_name, product_name)
+                if product_info.get('price') is not None:
+                    points.setdefault((name, '全国'), []).append((date, product_info['price']))
+                for province, region in (product_info.get('regions') or {}).items():
+                    if region.get('price') is not None:
+                        points.setdefault((name, province), []).append((date, region['price']))
+
+        # market.json 的地区价格补充到序列末尾（历史中没有当天数据时）
+        if latest:
+            date = latest.get('update_date')
+            for product_key, product_info in latest.get('products', {}).items():
+                name = PRODUCT_NAMES.get(product_key, product_info.get('name', product_key))
+                observations = [('全国', product_info.get('national_price'))]
+                observations += [(province, region.get('price'))
+                                 for province, region in product_info.get('regions', {}).items()]
+                for province, price in observations:
+                    series = points.setdefault((name, province), [])
+                    if price is not None and date and (not series or series[-1][0] < date):
+                        series.append((date, price))
+
+        self.series = {
+            key: ([date for date, _ in values], [price for _, price in values])
+            for key, values in points.items()
+        }
+        self.latest = latest if latest is not None else self.latest_from_history(history)
+        self.latest_json = json.dumps({'success': True, 'data': self.latest}, ensure_ascii=False).encode('utf-8')
+        self.latest_etag = f'"{hashlib.sha256(self.latest_json).hexdigest()[:32]}"'
+
+    @staticmethod
+    def latest_from_history(history: Dict) -> Optional[Dict]:
+        """没有 market.json 时，以历史中最新一天作为最新行情"""
+        if not history:
+            return None
+        return history[max(history)]
+
+    def query(self, product: str, province: str = '全国',
+              date_from: Optional[str] = None, date_to: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        查询价格序列
+
+        Returns:
+            [{'date': ..., 'price': ...}, ...]，产品或地区不存在时返回 None
+        """
+        name = PRODUCT_NAMES.get(product)
+        if name is None or (name, province) not in self.series:
+            return None
+
+        dates, prices = self.series[(name, province)]
+        lo = bisect.bisect_left(dates, date_from) if date_from else 0
+        hi = bisect.bisect_right(dates, date_to) if date_to else len(dates)
+        return [{'date': dates[i], 'price': prices[i]} for i in range(lo, hi)]
+
+
+class PriceIndex:
+    """
+    价格索引（自动热加载）
+
+    请求线程只读取当前快照；发现数据文件变化时在后台线程构建新快照后整体替换，
+    重建期间的查询继续使用旧快照，不等待重建（只有首次加载在请求线程中完成）。
+    """
+
+    def __init__(self, history_file: str = 'market_history.json', latest_file: str = 'market.json'):
+        self.history_file = history_file
+        self.latest_file = latest_file
+        self._snapshot = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._reloading_lock = threading.Lock()
+
+    def current_signature(self):
+        """数据文件的当前版本"""
+        return (file_signature(self.history_file), file_signature(self.latest_file))
+
+    def reload(self) -> PriceSnapshot:
+        """重新加载数据文件并构建快照"""
+        with self._lock:
+            signature = self.current_signature()
+            if self._snapshot is not None and signature == self._signature:
+                return self._snapshot
+
+            snapshot = PriceSnapshot(load_json(self.history_file) or {}, load_json(self.latest_file))
+            self._snapshot = snapshot
+            self._signature = signature
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def get(self) -> PriceSnapshot:
+        """获取当前快照，数据文件更新时重新加载（最多每秒检查一次）"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.reload()
+
+        now = time.monotonic()
+        if now - self._checked_at >= RELOAD_CHECK_INTERVAL:
+            self._checked_at = now
+            if self.current_signature() != self._signature:
+                self.schedule_reload()
+        return snapshot
+
+    def schedule_reload(self):
+        """在后台线程重新加载（已有重建在进行时不重复启动）"""
+        with self._reloading_lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self.background_reload, name='price-index-reload', daemon=True).start()
+
+    def background_reload(self):
+        try:
+            self.reload()
+        except Exception as e:
+            print(f"⚠️  价格索引重新加载失败: {e}")
+        finally:
+            with self._reloading_lock:
+                self._reloading = False
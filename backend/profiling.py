@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能分析模式
+各脚本入口通过 --profile 参数或 ANYU_PROFILE 环境变量开启，无需修改代码：
+
+    python data_collector_v2.py --profile            # cProfile 确定性分析（主线程）
+    python download_server.py --profile=sample       # 采样分析（所有线程）
+    ANYU_PROFILE=1 python weekly_report_generator.py
+
+同时用 tracemalloc 记录内存分配；结果写入 profiles/<脚本>-<时间>-<进程号>/：
+    summary.txt   耗时最多的函数（cProfile 按累计/自身耗时，采样按样本数）
+    cpu.prof      cProfile 原始数据（可用 snakeviz 等工具查看）
+    stacks.txt    采样模式下的折叠调用栈（可直接生成火焰图）
+    memory.txt    内存分配最多的代码行及峰值
+    memory.dump   tracemalloc 快照（可用 tracemalloc.Snapshot.load 读取）
+"""
+
+import io
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Optional
+
+# 环境变量：1 / cprofile 为确定性分析，sample 为采样分析
+PROFILE_ENV = 'ANYU_PROFILE'
+
+# 结果输出目录
+PROFILE_DIR = 'profiles'
+
+# 采样间隔（秒）
+SAMPLE_INTERVAL = 0.005
+
+# tracemalloc 记录的调用栈深度
+TRACEMALLOC_FRAMES = 10
+
+# 摘要中列出的条目数
+TOP_ENTRIES = 30
+
+MODES = ('cprofile', 'sample')
+
+
+def parse_profile_mode(argv, default_mode: str = 'cprofile') -> Optional[str]:
+    """
+    从命令行参数（--profile 或 --profile=sample）或环境变量解析分析模式，
+    并从 argv 中移除 --profile，使脚本自身的参数解析不受影响
+    """
+    mode = None
+    for arg in list(argv[1:]):
+        if arg == '--profile' or arg.startswith('--profile='):
+            argv.remove(arg)
+            mode = arg.partition('=')[2] or default_mode
+
+    if mode is None:
+        value = os.environ.get(PROFILE_ENV, '')
+        if value and value != '0':
+            mode = default_mode if value == '1' else value
+
+    if mode is not None and mode not in MODES:
+        raise SystemExit(f"未知的分析模式: {mode}（可选: {', '.join(MODES)}）")
+    return mode
+
+
+class StackSampler:
+    """
+    采样分析器
+
+    后台线程按固定间隔读取所有线程的当前调用栈，统计每个函数出现的次数；
+    对多线程程序（如下载服务器）也能看到工作线程的耗时分布。
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._labels = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self.run, name='profile-sampler', daemon=True)
+
+    def frame_label(self, frame) -> str:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self.frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def summary(self) -> str:
+        """按自身样本数和包含子调用的样本数列出最耗时的函数"""
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                inclusive[label] += count
+
+        total = sum(self.stacks.values()) or 1
+        lines = [f"采样次数: {self.samples}，采样间隔: {self.interval * 1000:.1f}ms，栈样本: {total}", ""]
+        for title, counter in (('自身耗时', own), ('累计耗时（含子调用）', inclusive)):
+            lines.append(f"按{title}排序:")
+            for label, count in counter.most_common(TOP_ENTRIES):
+                lines.append(f"  {count:>8}  {count * 100 / total:6.2f}%  {label}")
+            lines.append("")
+        return '\n'.join(lines)
+
+    def collapsed(self) -> str:
+        """折叠调用栈格式（每行：栈帧;栈帧;... 样本数）"""
+        return '\n'.join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+
+def cprofile_summary(profiler) -> str:
+    """cProfile 按累计耗时和自身耗时排序的摘要"""
+    import pstats
+
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.strip_dirs()
+    for sort_key in ('cumulative', 'tottime'):
+        output.write(f"按 {sort_key} 排序:\n")
+        stats.sort_stats(sort_key).print_stats(TOP_ENTRIES)
+    return output.getvalue()
+
+
+def memory_summary(snapshot, baseline, peak: int) -> str:
+    """tracemalloc 摘要：按代码行统计的分配量及相对启动时的增长"""
+    lines = [f"内存峰值: {peak / 1024 / 1024:.2f} MiB", "", "当前分配最多的代码行:"]
+    for stat in snapshot.statistics('lineno')[:TOP_ENTRIES]:
+        lines.append(f"  {stat}")
+    lines += ["", "相对启动时增长最多的代码行:"]
+    for stat in snapshot.compare_to(baseline, 'lineno')[:TOP_ENTRIES]:
+        lines.append(f"  {stat}")
+    return '\n'.join(lines) + '\n'
+
+
+def run_with_profiling(main: Callable, name: str, default_mode: str = 'cprofile', argv=None):
+    """
+    执行脚本入口函数，按需开启性能分析
+
+    Args:
+        main: 脚本的 main 函数
+        name: 脚本名称（用于输出目录名）
+        default_mode: 只给出 --profile 时使用的模式（多线程服务建议 sample）
+        argv: 命令行参数列表（默认 sys.argv，会移除其中的 --profile）
+    """
+    mode = parse_profile_mode(sys.argv if argv is None else argv, default_mode)
+    if mode is None:
+        return main()
+
+    import tracemalloc
+
+    run_dir = os.path.join(PROFILE_DIR, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+    os.makedirs(run_dir, exist_ok=True)
+    print(f"性能分析已开启（{mode}），结果目录: {run_dir}")
+
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    baseline = tracemalloc.take_snapshot()
+
+    if mode == 'cprofile':
+        import cProfile
+        profiler = cProfile.Profile()
+    else:
+        profiler = StackSampler()
+
+    start = time.perf_counter()
+    if mode == 'cprofile':
+        profiler.enable()
+    else:
+        profiler.start()
+    try:
+        return main()
+    finally:
+        if mode == 'cprofile':
+            profiler.disable()
+        else:
+            profiler.stop()
+        elapsed = time.perf_counter() - start
+
+        # 排除分析器自身的分配
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        header = (f"脚本: {name}\n模式: {mode}\n参数: {' '.join(sys.argv[1:])}\n"
+                  f"开始时间: {datetime.fromtimestamp(time.time() - elapsed).strftime('%Y-%m-%d %H:%M:%S')}\n"
+                  f"总耗时: {elapsed:.3f}s\n内存峰值: {peak / 1024 / 1024:.2f} MiB\n\n")
+
+        if mode == 'cprofile':
+            profiler.dump_stats(os.path.join(run_dir, 'cpu.prof'))
+            summary = cprofile_summary(profiler)
+        else:
+            with open(os.path.join(run_dir, 'stacks.txt'), 'w', encoding='utf-8') as f:
+                f.write(profiler.collapsed())
+            summary = profiler.summary()
+
+        with open(os.path.join(run_dir, 'summary.txt'), 'w', encoding='utf-8') as f:
+            f.write(header + summary)
+        with open(os.path.join(run_dir, 'memory.txt'), 'w', encoding='utf-8') as f:
+            f.write(memory_summary(snapshot, baseline, peak))
+        snapshot.dump(os.path.join(run_dir, 'memory.dump'))
+
+        print(f"性能分析结果已保存: {run_dir}（总耗时 {elapsed:.3f}s，内存峰值 {peak / 1024 / 1024:.2f} MiB）")
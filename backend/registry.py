@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+产品与地区注册表
+产品（名称、单位、小数位数、默认价格、周报文案、各地区价格波动范围）和地区（全国、各省份、
+周报对比的相邻省份、周报中的排列顺序）统一在 registry.json 中配置，
+增加省份或产品（如肉鸡、小麦）只需修改配置文件
+
+配置加载后编译为按整数序号索引的表：产品和地区各有固定序号，
+波动范围、小数位数、相邻省份等逐格计算用到的数据都是按序号访问的元组，
+只有在读写 JSON 文件的边界处才用名称查找序号
+
+    from registry import registry
+    product = registry.product('pig')                # 英文键或中文名
+    low, high = registry.variations[product.index][registry.region_index['河北']]
+
+城市（价格采集点）在 cities_file 指定的文件中按省份配置，每个城市带权重（如交易量占比），
+用于 aggregation.py 将城市价格按权重汇总为省份和全国价格
+
+使用其他配置文件时通过环境变量 ANYU_REGISTRY 指定。例如自行编写一份覆盖全部省份的配置
+my_registry.json（仓库中只提供 registry.json），格式与 registry.json 相同：
+
+    ANYU_REGISTRY=my_registry.json python anyu.py collect
+"""
+
+import json
+import os
+from collections import namedtuple
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 配置文件路径环境变量
+REGISTRY_ENV = 'ANYU_REGISTRY'
+
+# 默认配置文件
+REGISTRY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'registry.json')
+
+# 周报表格每张表的产品列数（产品按注册顺序依次分组）
+REPORT_TABLE_COLUMNS = 3
+
+Product = namedtuple('Product', ['index', 'key', 'name', 'unit', 'report_unit', 'decimal', 'default_price',
+                                 'analysis', 'forecast'])
+
+# neighbors 为相邻省份的地区序号；weight 为汇总到全国时的固定权重，None 表示使用下属城市权重之和
+Region = namedtuple('Region', ['index', 'name', 'national', 'neighbors', 'weight'])
+
+# province 为所属省份的地区序号
+City = namedtuple('City', ['index', 'name', 'province', 'weight'])
+
+
+class Registry:
+    """编译后的产品与地区注册表（只读）"""
+
+    def __init__(self, config: Dict, cities: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        Args:
+            config: registry.json 的内容
+            cities: {省份: {城市: 权重}}（cities_file 的内容），没有城市数据时为 None
+        """
+        default_variation = tuple(config.get('default_variation', (0.95, 1.05)))
+
+        self.region_index: Dict[str, int] = {}
+        for index, item in enumerate(config['regions']):
+            if item['name'] in self.region_index:
+                raise ValueError(f"注册表中地区重复: {item['name']}")
+            self.region_index[item['name']] = index
+        national = [index for index, item in enumerate(config['regions']) if item.get('national')]
+        if len(national) != 1:
+            raise ValueError("注册表中必须有且只有一个全国地区（national: true）")
+        self.national: int = national[0]
+        self.regions: Tuple[Region, ...] = tuple(
+            Region(index, item['name'], index == self.national,
+                   tuple(self.lookup_region(name) for name in item.get('neighbors', ())), item.get('weight'))
+            for index, item in enumerate(config['regions'])
+        )
+        # 各省份序号（不含全国），按注册顺序
+        self.provinces: Tuple[int, ...] = tuple(r.index for r in self.regions if not r.national)
+        self.report_order: Tuple[int, ...] = tuple(
+            self.lookup_region(name) for name in config.get('report_order', [r.name for r in self.regions]))
+
+        products = []
+        variations = []
+        self._products_by_id: Dict[str, Product] = {}
+        for index, item in enumerate(config['products']):
+            product = Product(index, item['key'], item['name'], item['unit'], item.get('report_unit', item['unit']),
+                              item.get('decimal', 2), item.get('default_price'), item.get('analysis', ''),
+                              item.get('forecast', ''))
+            for identifier in (product.key, product.name):
+                if identifier in self._products_by_id:
+                    raise ValueError(f"注册表中产品重复: {identifier}")
+                self._products_by_id[identifier] = product
+            products.append(product)
+
+            # 每个产品一行、每个地区一格的波动范围表，全国固定为 1
+            row = [default_variation] * len(self.regions)
+            row[self.national] = (1.0, 1.0)
+            for name, bounds in item.get('variations', {}).items():
+                row[self.lookup_region(name)] = tuple(bounds)
+            variations.append(tuple(row))
+
+        self.products: Tuple[Product, ...] = tuple(products)
+        self.variations: Tuple[Tuple[Tuple[float, float], ...], ...] = tuple(variations)
+        self.product_names: Tuple[str, ...] = tuple(p.name for p in self.products)
+        self.region_names: Tuple[str, ...] = tuple(r.name for r in self.regions)
+        self.report_tables: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(range(start, min(start + REPORT_TABLE_COLUMNS, len(self.products))))
+            for start in range(0, len(self.products), REPORT_TABLE_COLUMNS)
+        )
+
+        # 城市按省份依次编号；城市名可写作 "省份/城市"，在全部省份中唯一的城市名也可单独使用
+        cities_list = []
+        self.city_index: Dict[str, int] = {}
+        plain_names: Dict[str, List[int]] = {}
+        for province, items in (cities or {}).items():
+            province_index = self.lookup_region(province)
+            if province_index == self.national:
+                raise ValueError("城市不能直接属于全国地区")
+            for name, weight in items.items():
+                city = City(len(cities_list), name, province_index, float(weight))
+                cities_list.append(city)
+                self.city_index[f"{province}/{name}"] = city.index
+                plain_names.setdefault(name, []).append(city.index)
+        self.city_index.update({name: indices[0] for name, indices in plain_names.items() if len(indices) == 1})
+        self.cities: Tuple[City, ...] = tuple(cities_list)
+
+    def lookup_region(self, name: str) -> int:
+        try:
+            return self.region_index[name]
+        except KeyError:
+            raise ValueError(f"注册表中没有地区: {name}") from None
+
+    @property
+    def national_name(self) -> str:
+        return self.regions[self.national].name
+
+    def product(self, identifier: str) -> Optional[Product]:
+        """按英文键或中文名查找产品，未注册时返回 None"""
+        return self._products_by_id.get(identifier)
+
+    def region_indices(self, names: Sequence[str]) -> List[int]:
+        """地区名称列表转换为序号列表"""
+        return [self.lookup_region(name) for name in names]
+
+    @staticmethod
+    def round_price(product: Product, value: float):
+        """按产品小数位数取整（小数位数为 0 时返回整数）"""
+        if product.decimal == 0:
+            return round(value)
+        return round(value, product.decimal)
+
+    @staticmethod
+    def format_value(product: Product, value: float) -> str:
+        """按产品小数位数格式化（小数位数为 0 时截断为整数，与周报原有格式一致）"""
+        if product.decimal == 0:
+            return f"{int(value)}"
+        return f"{value:.{product.decimal}f}"
+
+
+def load_registry(path: Optional[str] = None) -> Registry:
+    """读取并编译注册表（默认读取 ANYU_REGISTRY 指定的文件或 registry.json）"""
+    path = path or os.environ.get(REGISTRY_ENV) or REGISTRY_FILE
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    cities = None
+    if config.get('cities_file'):
+        # 相对路径相对于注册表文件所在目录
+        cities_path = os.path.join(os.path.dirname(os.path.abspath(path)), config['cities_file'])
+        with open(cities_path, 'r', encoding='utf-8') as f:
+            cities = json.load(f)
+    return Registry(config, cities)
+
+
+registry = load_registry()
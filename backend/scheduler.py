@@ -2,14 +2,23 @@
 # -*- coding: utf-8 -*-
 """
 定时任务调度器
-每周日中午12:00自动生成文档
+每天9:00采集行情数据，每周日中午12:00自动生成文档
+
+调度器只在下一个任务到期时醒来，不做周期性轮询；
+每个任务最近一次成功执行的时间保存在状态文件中，
+重启后对停机期间错过的任务只补执行一次
 """
 
-import schedule
-import time
+import json
 import logging
-from datetime import datetime
-from generate_weekly_documents import generate_excel_document, generate_txt_document
+import os
+import signal
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from tracing import span
 
 # 配置日志
 logging.basicConfig(
@@ -22,8 +31,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 任务执行状态文件（记录每个任务最近一次成功执行对应的计划时间）
+STATE_FILE = 'scheduler_state.json'
+
+# 单次休眠的最长时间（秒）；系统休眠或调整时钟后最多延迟这么久重新计算
+MAX_SLEEP_SECONDS = 3600
+
+WEEKDAY_NAMES = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+
+
 def generate_documents():
     """生成文档的任务函数"""
+    from generate_weekly_documents import generate_excel_document, generate_txt_document
+
     logger.info("=" * 60)
     logger.info("开始执行定时任务：生成文档")
     logger.info("=" * 60)
@@ -47,42 +67,204 @@ def generate_documents():
         logger.error(f"❌ 定时任务执行失败: {str(e)}")
         raise
 
+
+def collect_market_data():
+    """每日采集任务：采集行情、写入历史、发布分片并渲染页面"""
+    from pipeline import build_pipeline
+
+    logger.info("开始执行定时任务：采集行情数据")
+    results = build_pipeline().run(['history', 'shards', 'render'])
+    failed = [name for name, result in results.items() if result.status in ('failed', 'blocked')]
+    if failed:
+        raise RuntimeError(f"流水线阶段失败: {', '.join(failed)}")
+    logger.info("✅ 行情数据采集完成")
+
+
+class Job:
+    """每天（或每周固定某天）在指定时间执行的任务"""
+
+    def __init__(self, name: str, func: Callable[[], None], at: str, weekday: Optional[int] = None,
+                 description: str = ''):
+        """
+        Args:
+            name: 任务名称（状态文件中的键）
+            func: 任务函数
+            at: 执行时间，如 "09:00"
+            weekday: 每周执行的星期（0=周一 … 6=周日），None 表示每天执行
+            description: 任务说明
+        """
+        self.name = name
+        self.func = func
+        self.hour, self.minute = (int(part) for part in at.split(':'))
+        self.weekday = weekday
+        self.description = description
+        self.next_run: Optional[datetime] = None
+        # 同一任务同时只允许一个实例运行
+        self.running = threading.Lock()
+
+    @property
+    def period(self) -> timedelta:
+        return timedelta(days=1 if self.weekday is None else 7)
+
+    def previous_run_time(self, now: datetime) -> datetime:
+        """不晚于 now 的最近一次计划执行时间"""
+        candidate = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if self.weekday is not None:
+            candidate -= timedelta(days=(candidate.weekday() - self.weekday) % 7)
+        if candidate > now:
+            candidate -= self.period
+        return candidate
+
+    def next_run_time(self, now: datetime) -> datetime:
+        """晚于 now 的下一次计划执行时间"""
+        return self.previous_run_time(now) + self.period
+
+    def describe_schedule(self) -> str:
+        day = '每天' if self.weekday is None else f"每{WEEKDAY_NAMES[self.weekday]}"
+        return f"{day} {self.hour:02d}:{self.minute:02d}"
+
+
+class Scheduler:
+    """
+    事件驱动的调度器
+
+    主线程休眠到最近一个任务的到期时间，到期任务各自在独立线程中执行，
+    互不依赖的任务可以同时运行；任务上一次执行尚未结束时跳过本次执行。
+    """
+
+    def __init__(self, jobs: List[Job], state_file: str = STATE_FILE):
+        self.jobs = jobs
+        self.state_file = state_file
+        self.state = self.load_state()
+        self._state_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def load_state(self) -> Dict[str, str]:
+        """读取各任务最近一次成功执行的计划时间"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def record_success(self, job: Job, scheduled: datetime):
+        """记录任务成功执行（先写临时文件再替换，避免中途退出导致状态文件损坏）"""
+        with self._state_lock:
+            self.state[job.name] = scheduled.isoformat(timespec='minutes')
+            directory = os.path.dirname(os.path.abspath(self.state_file))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.state_file)
+
+    def last_success(self, job: Job) -> Optional[datetime]:
+        value = self.state.get(job.name)
+        return datetime.fromisoformat(value) if value else None
+
+    def run_job(self, job: Job, scheduled: datetime):
+        """在独立线程中执行任务"""
+        if not job.running.acquire(blocking=False):
+            logger.warning(f"⚠️  任务 {job.name} 上一次执行尚未结束，跳过 {scheduled:%Y-%m-%d %H:%M} 的执行")
+            return
+
+        def target():
+            try:
+                logger.info(f"▶  任务 {job.name} 开始（计划时间 {scheduled:%Y-%m-%d %H:%M}）")
+                with span(f'job.{job.name}', scheduled=scheduled.isoformat(timespec='minutes')):
+                    job.func()
+                self.record_success(job, scheduled)
+                logger.info(f"✅ 任务 {job.name} 完成")
+            except Exception as e:
+                logger.error(f"❌ 任务 {job.name} 失败: {e}")
+            finally:
+                job.running.release()
+
+        thread = threading.Thread(target=target, name=f"job-{job.name}")
+        self._threads = [t for t in self._threads if t.is_alive()]
+        self._threads.append(thread)
+        thread.start()
+
+    def catch_up(self, now: datetime):
+        """
+        补执行停机期间错过的任务
+
+        无论错过多少次，每个任务只补执行一次（对应最近一次计划时间）；
+        从未成功执行过的任务不补执行，等待下一次计划时间。
+        """
+        for job in self.jobs:
+            last = self.last_success(job)
+            scheduled = job.previous_run_time(now)
+            if last is not None and last < scheduled:
+                logger.info(f"任务 {job.name} 错过了 {scheduled:%Y-%m-%d %H:%M} 的执行，立即补执行一次")
+                self.run_job(job, scheduled)
+
+    def run(self):
+        """调度器主循环"""
+        now = datetime.now()
+        self.catch_up(now)
+        for job in self.jobs:
+            job.next_run = job.next_run_time(now)
+
+        announced = None
+        while not self.stopped.is_set():
+            job = min(self.jobs, key=lambda j: j.next_run)
+            if announced != (job.name, job.next_run):
+                announced = (job.name, job.next_run)
+                logger.info(f"下次执行: {job.name} @ {job.next_run:%Y-%m-%d %H:%M}")
+
+            delay = (job.next_run - datetime.now()).total_seconds()
+            if delay > 0 and self.stopped.wait(min(delay, MAX_SLEEP_SECONDS)):
+                break
+
+            now = datetime.now()
+            for job in self.jobs:
+                if job.next_run <= now:
+                    # 休眠期间错过多次（如系统挂起）时同样只执行一次
+                    self.run_job(job, job.previous_run_time(now))
+                    job.next_run = job.next_run_time(now)
+
+    def stop(self):
+        """停止调度器并等待正在执行的任务结束"""
+        self.stopped.set()
+        for thread in self._threads:
+            thread.join()
+
+
 def run_scheduler():
     """运行定时任务调度器"""
     logger.info("=" * 60)
     logger.info("定时任务调度器已启动")
     logger.info("=" * 60)
     logger.info(f"启动时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info()
 
-    # 配置定时任务：每周日中午12:00执行
-    schedule.every().sunday.at("12:00").do(generate_documents)
+    jobs = [
+        Job('daily_collection', collect_market_data, at='09:00', description='采集行情数据并更新页面'),
+        Job('weekly_documents', generate_documents, at='12:00', weekday=6, description='生成Excel和TXT文档'),
+    ]
+    scheduler = Scheduler(jobs)
 
     logger.info("定时任务已配置:")
-    logger.info("  - 执行时间: 每周日中午12:00")
-    logger.info("  - 任务内容: 生成Excel和TXT文档")
-    logger.info()
+    for job in jobs:
+        last = scheduler.last_success(job)
+        last_str = last.strftime('%Y-%m-%d %H:%M') if last else '从未执行'
+        logger.info(f"  - {job.name}: {job.describe_schedule()}，{job.description}（上次成功: {last_str}）")
 
-    # 立即执行一次（用于测试）
-    logger.info("首次启动，立即执行一次文档生成...")
-    generate_documents()
-    logger.info()
-
-    # 启动调度器循环
     logger.info("调度器运行中，等待下次执行...")
     logger.info("按 Ctrl+C 停止调度器")
     logger.info("=" * 60)
-    logger.info()
 
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stopped.set())
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # 每分钟检查一次
+        scheduler.run()
     except KeyboardInterrupt:
-        logger.info()
+        pass
+    finally:
+        scheduler.stop()
         logger.info("=" * 60)
         logger.info("调度器已停止")
         logger.info("=" * 60)
 
+
 if __name__ == "__main__":
     run_scheduler()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日内行情快照存储
+同一天可多次采集（如上午、下午报价），每次采集的完整行情按时间保存为快照，不再互相覆盖：
+
+    snapshots/2026-10-19.json   当天全部快照 {"date", "snapshots": {"2026-10-19T09:00": {...}, ...}}
+    snapshots/index.json        索引：最新快照时间、每天的收盘快照时间和快照数量
+    market.json                 最新视图（最新一次快照），页面和各脚本照常读取
+
+最新视图只在新快照的时间不早于现有最新快照时重写，读取最新行情只需读 market.json，
+不需要扫描当天的快照；收盘视图为每天最后一个快照，由索引直接定位。
+快照时间取自行情的 update_date 和 update_time，同一分钟内重复保存视为同一快照（覆盖）。
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# 默认快照目录
+SNAPSHOT_DIR = 'snapshots'
+
+# 索引文件名
+INDEX_FILENAME = 'index.json'
+
+# 最新视图
+LATEST_FILE = 'market.json'
+
+# 快照保留天数（与 market_history.json 一致）
+RETENTION_DAYS = 60
+
+# 索引格式版本
+INDEX_VERSION = 1
+
+
+def snapshot_key(market_data: Dict) -> str:
+    """快照时间（YYYY-MM-DDTHH:MM，按字符串排序即按时间排序）"""
+    return f"{market_data['update_date']}T{market_data.get('update_time') or '00:00'}"
+
+
+def write_json(path: str, data, indent: Optional[int] = None):
+    """原子写入 JSON 文件（先写临时文件再替换，读取方不会读到写了一半的文件）"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_json(path: str):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class SnapshotStore:
+    """按时间索引的行情快照存储，维护最新视图和每日收盘视图"""
+
+    def __init__(self, directory: str = SNAPSHOT_DIR, latest_file: str = LATEST_FILE,
+                 retention_days: int = RETENTION_DAYS):
+        self.directory = directory
+        self.latest_file = latest_file
+        self.retention_days = retention_days
+        self._index = None
+
+    @property
+    def index(self) -> Dict:
+        if self._index is None:
+            index = read_json(os.path.join(self.directory, INDEX_FILENAME))
+            if not index or index.get('version') != INDEX_VERSION:
+                index = {'version': INDEX_VERSION, 'latest': None, 'closes': {}, 'counts': {}}
+            self._index = index
+        return self._index
+
+    @property
+    def latest_key(self) -> Optional[str]:
+        return self.index['latest']
+
+    def day_path(self, date: str) -> str:
+        return os.path.join(self.directory, f"{date}.json")
+
+    def add(self, market_data: Dict) -> bool:
+        """
+        保存一次采集的行情快照
+
+        Returns:
+            是否成为最新快照（是则已重写最新视图）
+        """
+        key = snapshot_key(market_data)
+        date = key[:10]
+
+        day = read_json(self.day_path(date)) or {'date': date, 'snapshots': {}}
+        day['snapshots'][key] = market_data
+        day['snapshots'] = dict(sorted(day['snapshots'].items()))
+        write_json(self.day_path(date), day)
+
+        index = self.index
+        index['closes'][date] = max(day['snapshots'])
+        index['counts'][date] = len(day['snapshots'])
+
+        is_latest = index['latest'] is None or key >= index['latest']
+        if is_latest:
+            write_json(self.latest_file, market_data, indent=2)
+            index['latest'] = key
+
+        self.prune()
+        write_json(os.path.join(self.directory, INDEX_FILENAME), index, indent=2)
+        return is_latest
+
+    def prune(self):
+        """删除超出保留天数的快照"""
+        index = self.index
+        dates = sorted(index['closes'])
+        cutoff = (datetime.strptime(dates[-1], '%Y-%m-%d') -
+                  timedelta(days=self.retention_days - 1)).strftime('%Y-%m-%d') if dates else ''
+        for date in dates:
+            if date >= cutoff:
+                break
+            del index['closes'][date]
+            index['counts'].pop(date, None)
+            if os.path.exists(self.day_path(date)):
+                os.remove(self.day_path(date))
+
+    def latest(self) -> Optional[Dict]:
+        """最新视图（直接读取 market.json）"""
+        return read_json(self.latest_file)
+
+    def day(self, date: str) -> List[Dict]:
+        """某天的全部快照（按时间排序）"""
+        day = read_json(self.day_path(date)) or {}
+        return list(day.get('snapshots', {}).values())
+
+    def close(self, date: str) -> Optional[Dict]:
+        """某天的收盘视图（当天最后一个快照）"""
+        key = self.index['closes'].get(date)
+        if key is None:
+            return None
+        day = read_json(self.day_path(date)) or {}
+        return day.get('snapshots', {}).get(key)
+
+    def previous_close(self, date: str) -> Optional[Dict]:
+        """指定日期之前最近一天的收盘视图（用于计算日涨跌）"""
+        earlier = [day for day in self.index['closes'] if day < date]
+        return self.close(max(earlier)) if earlier else None
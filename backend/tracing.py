@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轻量级分阶段追踪
+记录搜索、价格提取、历史数据读写、Excel/TXT 渲染和流水线各阶段的耗时，
+每个 span 以一行 JSON 写入追踪文件；附带汇总工具，列出一次运行中最慢的阶段
+
+通过环境变量开启（未开启时 span 几乎没有开销）：
+    ANYU_TRACE=traces.jsonl python data_collector_v2.py
+    python tracing.py summarize traces.jsonl
+"""
+
+import argparse
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence
+
+# 追踪文件路径（设为 1 时使用 TRACE_FILE）
+TRACE_ENV = 'ANYU_TRACE'
+TRACE_FILE = 'traces.jsonl'
+
+# 同一次运行（包括其子进程）共享的追踪ID
+TRACE_ID_ENV = 'ANYU_TRACE_ID'
+
+# 当前线程（或异步上下文）所在的 span，用于记录父子关系
+_current_span = contextvars.ContextVar('anyu_current_span', default=None)
+
+
+def new_id() -> str:
+    """16位十六进制随机ID"""
+    return os.urandom(8).hex()
+
+
+class Span:
+    """一个计时区间"""
+
+    __slots__ = ('name', 'span_id', 'parent_id', 'attributes', 'start', 'status', 'error')
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict):
+        self.name = name
+        self.span_id = new_id()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time()
+        self.status = 'ok'
+        self.error = None
+
+    def set(self, **attributes):
+        """补充属性（如结果大小、是否找到价格）"""
+        self.attributes.update(attributes)
+
+
+class NullSpan:
+    """追踪未开启时使用的空 span"""
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """追踪记录器（每条记录写入后立即刷新，进程被终止时也不会丢失已完成的 span）"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.trace_id = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def configure(self, path: Optional[str]):
+        """开启（或关闭，path 为 None）追踪"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.path = path
+            if path is not None:
+                self.trace_id = os.environ.setdefault(TRACE_ID_ENV, new_id())
+
+    def write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+
+    def finish(self, span: Span):
+        end = time.time()
+        record = {
+            'trace': self.trace_id,
+            'span': span.span_id,
+            'parent': span.parent_id,
+            'name': span.name,
+            'start': round(span.start, 6),
+            'duration_ms': round((end - span.start) * 1000, 3),
+            'status': span.status,
+            'pid': os.getpid(),
+            'thread': threading.current_thread().name,
+            'attrs': span.attributes
+        }
+        if span.error:
+            record['error'] = span.error
+        self.write(record)
+
+
+def tracer_from_env() -> Tracer:
+    value = os.environ.get(TRACE_ENV)
+    tracer = Tracer()
+    if value and value != '0':
+        tracer.configure(TRACE_FILE if value == '1' else value)
+    return tracer
+
+
+tracer = tracer_from_env()
+
+
+def configure(path: Optional[str]):
+    """在代码中开启追踪（同时设置环境变量，子进程也会写入同一文件）"""
+    if path is None:
+        os.environ.pop(TRACE_ENV, None)
+    else:
+        os.environ[TRACE_ENV] = path
+    tracer.configure(path)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    记录一个 span
+
+        with span('history.write', file=filename) as s:
+            ...
+            s.set(bytes=size)
+
+    代码块抛出异常时 span 标记为 error 并记录异常信息，异常继续向上抛出。
+    """
+    if not tracer.enabled:
+        yield NULL_SPAN
+        return
+
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent is not None else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = 'error'
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.finish(current)
+
+
+def describe_result(kind: Optional[str], result) -> Dict:
+    """根据返回值生成属性"""
+    if kind == 'file':
+        size = os.path.getsize(result) if isinstance(result, str) and os.path.exists(result) else None
+        return {'file': result, 'bytes': size}
+    if kind == 'count':
+        return {'count': len(result) if result is not None else 0}
+    if kind == 'found':
+        return {'found': result is not None}
+    return {}
+
+
+def traced(name: str, args: Sequence[str] = (), result: Optional[str] = None) -> Callable:
+    """
+    为函数记录 span 的装饰器
+
+    Args:
+        name: span 名称
+        args: 作为属性记录的参数名
+        result: 返回值记录方式：'file'（文件名及大小）、'count'（长度）、'found'（是否为 None）
+    """
+    def decorator(func):
+        # 函数签名只在追踪开启后首次调用时解析（inspect 导入较慢，不拖慢脚本启动）
+        signature = None
+
+        @functools.wraps(func)
+        def wrapper(*call_args, **call_kwargs):
+            nonlocal signature
+            if not tracer.enabled:
+                return func(*call_args, **call_kwargs)
+
+            attributes = {}
+            if args:
+                if signature is None:
+                    import inspect
+                    signature = inspect.signature(func)
+                bound = signature.bind_partial(*call_args, **call_kwargs)
+                attributes = {arg: bound.arguments[arg] for arg in args if arg in bound.arguments}
+
+            with span(name, **attributes) as current:
+                value = func(*call_args, **call_kwargs)
+                current.set(**describe_result(result, value))
+                return value
+        return wrapper
+    return decorator
+
+
+def load_spans(path: str, trace_id: Optional[str] = None) -> List[Dict]:
+    """读取追踪文件，默认只返回最后一次运行的 span"""
+    spans = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+
+    if trace_id is None and spans:
+        trace_id = spans[-1]['trace']
+    return [record for record in spans if record['trace'] == trace_id]
+
+
+def summarize(spans: List[Dict], top: int = 10) -> str:
+    """按 span 名称汇总耗时，并列出最慢的单个 span"""
+    if not spans:
+        return "没有找到追踪记录"
+
+    groups = {}
+    for record in spans:
+        group = groups.setdefault(record['name'], {'count': 0, 'total': 0.0, 'max': 0.0, 'errors': 0})
+        group['count'] += 1
+        group['total'] += record['duration_ms']
+        group['max'] = max(group['max'], record['duration_ms'])
+        if record['status'] != 'ok':
+            group['errors'] += 1
+
+    start = min(record['start'] for record in spans)
+    end = max(record['start'] + record['duration_ms'] / 1000 for record in spans)
+
+    lines = [
+        f"追踪ID: {spans[0]['trace']}  共 {len(spans)} 个 span，墙钟时间 {(end - start) * 1000:.1f}ms",
+        "",
+        "按阶段汇总（按总耗时排序）:",
+        f"  {'阶段':<24}{'次数':>6}{'总耗时ms':>12}{'平均ms':>10}{'最大ms':>10}{'失败':>6}",
+    ]
+    for name, group in sorted(groups.items(), key=lambda item: item[1]['total'], reverse=True)[:top]:
+        lines.append(f"  {name:<24}{group['count']:>6}{group['total']:>12.1f}"
+                     f"{group['total'] / group['count']:>10.1f}{group['max']:>10.1f}{group['errors']:>6}")
+
+    lines += ["", f"最慢的 {top} 个 span:"]
+    for record in sorted(spans, key=lambda r: r['duration_ms'], reverse=True)[:top]:
+        attrs = ', '.join(f"{key}={value}" for key, value in record.get('attrs', {}).items())
+        status = '' if record['status'] == 'ok' else f"  [{record['status']}: {record.get('error', '')}]"
+        lines.append(f"  {record['duration_ms']:>10.1f}ms  {record['name']}  {attrs}{status}")
+
+    return '\n'.join(lines)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='追踪记录工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    summary_parser = subparsers.add_parser('summarize', help='汇总一次运行中最慢的阶段')
+    summary_parser.add_argument('file', nargs='?', default=TRACE_FILE, help='追踪文件')
+    summary_parser.add_argument('--trace', help='追踪ID（默认最后一次运行）')
+    summary_parser.add_argument('--top', type=int, default=10, help='显示条数')
+    args = parser.parse_args()
+
+    if args.command == 'summarize':
+        print(summarize(load_spans(args.file, args.trace), args.top))
+
+
+if __name__ == "__main__":
+    main()
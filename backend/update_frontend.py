@@ -2,108 +2,232 @@
 # -*- coding: utf-8 -*-
 """
 更新前端HTML页面
-从market_data.json读取数据，更新index.html中的价格数据
+从market.json（或market_data.json）读取数据，更新index.html中的全国及各省份价格数据
 """
 
+import html
 import json
+import os
 import re
+import tempfile
 from datetime import datetime
 
+from profiling import run_with_profiling
+from registry import registry
+from tracing import span
 
-def load_market_data():
+# 各产品价格保留的小数位数（按中文名）
+PRODUCT_DECIMALS = {product.name: product.decimal for product in registry.products}
+
+# 页面中所有可填充的位置，一次扫描即可找到全部插槽
+# 产品名称和地区名称不会被替换，只用于确定后续插槽属于哪个产品、哪个地区
+SLOT_PATTERN = re.compile(
+    r'(?P<date><p class="date-text">[^<]*</p>)'
+    r'|(?P<product_name><span class="product-name">[^<]*</span>)'
+    r'|(?P<national_price><span class="national-price">[^<]*</span>)'
+    r'|(?P<national_change><span class="national-change[^"]*">[^<]*</span>)'
+    r'|(?P<national_ratio><span class="national-ratio[^"]*">[^<]*</span>)'
+    r'|(?P<region_name><span class="region-name">[^<]*</span>)'
+    r'|(?P<region_price><span class="region-price">[^<]*</span>)'
+    r'|(?P<region_change><span class="region-change[^"]*">[^<]*</span>)'
+)
+
+TAG_TEXT_PATTERN = re.compile(r'>([^<]*)<')
+
+
+def load_market_data(filename='market_data.json'):
     """加载市场数据"""
-    with open('market_data.json', 'r', encoding='utf-8') as f:
+    with open(filename, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 
-def update_html_with_data(html_file, data):
+def normalize_market_data(data):
+    """
+    将两种数据格式统一为渲染视图
+
+    - market.json（data_collector_v2）：产品以英文键存储，包含全国均价、涨跌和各省份数据
+    - market_data.json（data_collector）：产品以中文名存储，只有全国价格
+
+    Returns:
+        {'date': 日期, 'products': {中文名: {'price', 'change', 'change_ratio', 'regions'}}}
+    """
+    view = {
+        'date': data.get('update_date') or data.get('date') or datetime.now().strftime('%Y-%m-%d'),
+        'products': {}
+    }
+
+    for product_key, product_info in data.get('products', {}).items():
+        name = product_info.get('name', product_key)
+        if 'national_price' in product_info:
+            view['products'][name] = {
+                'price': product_info.get('national_price'),
+                'change': product_info.get('national_change'),
+                'change_ratio': product_info.get('national_change_ratio'),
+                'regions': product_info.get('regions', {})
+            }
+        else:
+            view['products'][name] = {
+                'price': product_info.get('price'),
+                'change': None,
+                'change_ratio': None,
+                'regions': {}
+            }
+
+    return view
+
+
+def format_price(product_name, price):
+    """格式化价格（玉米、豆粕显示整数，其余保留2位小数）"""
+    if PRODUCT_DECIMALS.get(product_name, 2) == 0:
+        return str(int(round(price)))
+    return f"{price:.2f}"
+
+
+def format_change(product_name, change):
+    """格式化涨跌（带符号，持平显示0）"""
+    if change == 0:
+        return "0"
+    if PRODUCT_DECIMALS.get(product_name, 2) == 0:
+        return f"{int(round(change)):+d}"
+    return f"{change:+.2f}"
+
+
+def change_class(change):
+    """涨跌样式类名"""
+    if change > 0:
+        return 'up'
+    if change < 0:
+        return 'down'
+    return 'flat'
+
+
+class PageTemplate:
+    """
+    编译后的页面模板
+
+    编译时扫描一次HTML，把页面拆分为静态片段和具名插槽
+    （日期、每个产品的全国价格/涨跌/涨跌幅、每个省份的价格/涨跌）；
+    渲染时按顺序拼接静态片段和插槽的值，不再对页面做任何正则匹配。
+    同一个模板可以反复用于渲染多份数据。
+    """
+
+    def __init__(self, html_content):
+        self.fragments = []
+        self.slots = []
+
+        product = None
+        region = None
+        position = 0
+
+        for match in SLOT_PATTERN.finditer(html_content):
+            kind = match.lastgroup
+            text = TAG_TEXT_PATTERN.search(match.group()).group(1)
+
+            if kind == 'product_name':
+                product = text.strip()
+                region = None
+                continue
+            if kind == 'region_name':
+                region = text.strip()
+                continue
+
+            self.fragments.append(html_content[position:match.start()])
+            self.slots.append((kind, product, region, match.group()))
+            position = match.end()
+
+        self.fragments.append(html_content[position:])
+
+    @classmethod
+    def from_file(cls, html_file):
+        """从文件编译模板"""
+        with open(html_file, 'r', encoding='utf-8') as f:
+            return cls(f.read())
+
+    @property
+    def slot_names(self):
+        """插槽名称列表，如 生猪.national_price、生猪.河北.region_price"""
+        names = []
+        for kind, product, region, _ in self.slots:
+            names.append('.'.join(part for part in (product, region, kind) if part))
+        return names
+
+    def render_slot(self, view, kind, product, region, original):
+        """渲染单个插槽，没有对应数据时保留原内容"""
+        if kind == 'date':
+            return f'<p class="date-text">{html.escape(str(view["date"]))}</p>'
+
+        product_data = view['products'].get(product)
+        if product_data is None:
+            return original
+
+        if kind.startswith('region_'):
+            product_data = product_data['regions'].get(region)
+            if product_data is None:
+                return original
+
+        price = product_data.get('price')
+        change = product_data.get('change')
+
+        if kind in ('national_price', 'region_price'):
+            if price is None:
+                return original
+            css = kind.replace('_', '-')
+            return f'<span class="{css}">{format_price(product, price)}</span>'
+
+        if kind in ('national_change', 'region_change'):
+            if change is None:
+                return original
+            css = kind.replace('_', '-')
+            return f'<span class="{css} {change_class(change)}">{format_change(product, change)}</span>'
+
+        if kind == 'national_ratio':
+            ratio = product_data.get('change_ratio')
+            if ratio is None or change is None:
+                return original
+            return f'<span class="national-ratio {change_class(change)}">({ratio:+.2f}%)</span>'
+
+        return original
+
+    def render(self, view):
+        """用渲染视图填充所有插槽"""
+        parts = [self.fragments[0]]
+        for slot, fragment in zip(self.slots, self.fragments[1:]):
+            parts.append(self.render_slot(view, *slot))
+            parts.append(fragment)
+        return ''.join(parts)
+
+
+def write_atomic(filename, content):
+    """先写入同目录下的临时文件再替换，避免页面被读取到一半"""
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.html')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, filename)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def update_html_with_data(html_file, data, template=None):
     """
     更新HTML文件中的价格数据
 
     Args:
         html_file: HTML文件路径
-        data: 市场数据
+        data: 市场数据（market.json 或 market_data.json 格式）
+        template: 已编译的模板，不传时从 html_file 编译
     """
-    # 读取HTML文件
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-
-    # 更新日期
-    today = data.get('date', datetime.now().strftime('%Y-%m-%d'))
-    html_content = re.sub(
-        r'<p class="date-text">[^<]*</p>',
-        f'<p class="date-text">{today}</p>',
-        html_content
-    )
-
-    # 更新各个产品的价格
-    products = data.get('products', {})
-
-    # 生猪
-    if '生猪' in products:
-        price = products['生猪'].get('price', 0)
-        html_content = re.sub(
-            r'<span class="national-price">[0-9.]+</span>',
-            f'<span class="national-price">{price}</span>',
-            html_content,
-            count=1
-        )
-
-    # 仔猪
-    if '仔猪' in products:
-        price = products['仔猪'].get('price', 0)
-        html_content = re.sub(
-            r'<span class="national-price">[0-9.]+</span>',
-            f'<span class="national-price">{price}</span>',
-            html_content,
-            count=1
-        )
-
-    # 鸡蛋
-    if '鸡蛋' in products:
-        price = products['鸡蛋'].get('price', 0)
-        html_content = re.sub(
-            r'<span class="national-price">[0-9.]+</span>',
-            f'<span class="national-price">{price}</span>',
-            html_content,
-            count=1
-        )
-
-    # 淘汰鸡
-    if '淘汰鸡' in products:
-        price = products['淘汰鸡'].get('price', 0)
-        html_content = re.sub(
-            r'<span class="national-price">[0-9.]+</span>',
-            f'<span class="national-price">{price}</span>',
-            html_content,
-            count=1
-        )
-
-    # 玉米
-    if '玉米' in products:
-        price = products['玉米'].get('price', 0)
-        html_content = re.sub(
-            r'<span class="national-price">[0-9.]+</span>',
-            f'<span class="national-price">{price}</span>',
-            html_content,
-            count=1
-        )
-
-    # 豆粕
-    if '豆粕' in products:
-        price = products['豆粕'].get('price', 0)
-        html_content = re.sub(
-            r'<span class="national-price">[0-9.]+</span>',
-            f'<span class="national-price">{price}</span>',
-            html_content,
-            count=1
-        )
-
-    # 保存更新后的HTML文件
-    with open(html_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
-
-    print(f"HTML文件已更新: {html_file}")
+    if template is None:
+        template = PageTemplate.from_file(html_file)
+
+    with span('render.page', file=html_file, slots=len(template.slots)) as s:
+        content = template.render(normalize_market_data(data))
+        write_atomic(html_file, content)
+        s.set(bytes=len(content.encode('utf-8')))
+
+    print(f"HTML文件已更新: {html_file} ({len(template.slots)} 个数据位置)")
 
 
 def main():
@@ -112,9 +236,11 @@ def main():
     print("开始更新前端HTML页面")
     print("=" * 60)
 
-    # 加载数据
-    data = load_market_data()
-    print(f"数据日期: {data.get('date', '未知')}")
+    # 加载数据（优先使用包含各省份数据的 market.json）
+    data_file = 'market.json' if os.path.exists('market.json') else 'market_data.json'
+    data = load_market_data(data_file)
+    print(f"数据文件: {data_file}")
+    print(f"数据日期: {normalize_market_data(data)['date']}")
 
     # 更新index.html
     try:
@@ -129,4 +255,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    run_with_profiling(main, 'update_frontend')
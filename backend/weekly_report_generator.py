@@ -6,12 +6,14 @@
 """
 
 import json
-import openpyxl
-from openpyxl.styles import Font, Alignment
 from datetime import datetime, timedelta
 import os
 import random
+import time
 
+from profiling import run_with_profiling
+from registry import registry
+from tracing import span, traced
 
 def get_week_range(date=None):
     """获取本周的起止日期（周一到周日）"""
@@ -42,8 +44,11 @@ def load_history(history_file='market_history.json'):
         print(f"⚠️  历史数据文件不存在: {history_file}")
         return {}
 
-    with open(history_file, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    with span('history.read', file=history_file, bytes=os.path.getsize(history_file)) as s:
+        with open(history_file, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+        s.set(days=len(history))
+    return history
 
 
 def get_week_data(history, start_date, end_date):
@@ -61,105 +66,121 @@ def get_week_data(history, start_date, end_date):
     return week_data
 
 
-def calculate_week_average(week_data):
-    """计算周均价"""
-    products = ['生猪', '仔猪', '鸡蛋', '淘汰鸡', '玉米', '豆粕']
-    averages = {}
+def calculate_week_average(week_data, reg=registry):
+    """
+    计算周均价
 
-    for product in products:
-        prices = []
-        for day_data in week_data:
-            if product in day_data.get('products', {}):
-                price = day_data['products'][product].get('price')
-                if price is not None:
-                    prices.append(price)
+    Returns:
+        按产品序号排列的周均价列表（无数据的产品为 None）
+    """
+    names = reg.product_names
+    totals = [0.0] * len(names)
+    counts = [0] * len(names)
 
-        if prices:
-            averages[product] = sum(prices) / len(prices)
-        else:
-            averages[product] = None
+    for day_data in week_data:
+        products = day_data.get('products', {})
+        for index, name in enumerate(names):
+            item = products.get(name)
+            if item is not None and item.get('price') is not None:
+                totals[index] += item['price']
+                counts[index] += 1
 
-    return averages
+    return [total / count if count else None for total, count in zip(totals, counts)]
 
 
 def calculate_weekly_change(current_avg, previous_avg):
-    """计算与上周的涨跌"""
-    change = {}
-
-    for product in current_avg:
-        current_price = current_avg[product]
-        previous_price = previous_avg.get(product)
+    """计算与上周的涨跌（按产品序号排列，任一周无数据时为 None）"""
+    change = []
 
+    for current_price, previous_price in zip(current_avg, previous_avg):
         if current_price is not None and previous_price is not None:
             diff = current_price - previous_price
             percent = (diff / previous_price) * 100 if previous_price != 0 else 0
 
-            change[product] = {
+            change.append({
                 'diff': diff,
                 'percent': percent
-            }
+            })
         else:
-            change[product] = None
+            change.append(None)
 
     return change
 
 
-def generate_mock_provincial_data(national_avg, change_info):
-    """生成各省份的模拟数据（基于全国均价随机波动）"""
-    provinces = ["全国", "河北", "山东", "河南", "湖北", "四川", "黑龙江", "陕西", "甘肃", "广西", "广东", "江西", "福建"]
+def generate_mock_provincial_data(national_avg, change_info, reg=registry):
+    """
+    生成各省份的模拟数据（基于全国均价随机波动）
 
-    provincial_data = {}
+    Returns:
+        provincial_data[地区序号][产品序号] = (价格, 涨跌)，涨跌为 {'diff', 'percent'} 或 None
+    """
+    provincial_data = [None] * len(reg.regions)
 
-    for province in provinces:
-        provincial_data[province] = {}
+    # 先按周报顺序生成，再补充不在周报中的地区（如只作为相邻省份出现的省份），
+    # 所有地区都有数据，省份周报对比相邻省份时不会遇到空值
+    in_report = set(reg.report_order)
+    order = list(reg.report_order) + [region.index for region in reg.regions if region.index not in in_report]
 
-        for product in national_avg:
-            if province == "全国":
+    for region in order:
+        row = []
+
+        for base_price, base_change in zip(national_avg, change_info):
+            if region == reg.national:
                 # 全国均价
-                price = national_avg[product]
-                change = change_info[product]
+                row.append((base_price, base_change))
+                continue
+
+            # 各省份基于全国均价随机波动，波动范围：-5% 到 +5%
+            variation = random.uniform(-0.05, 0.05)
+            price = base_price * (1 + variation) if base_price is not None else None
+
+            # 涨跌也随机波动
+            if base_change:
+                change = {
+                    'diff': base_change['diff'] * random.uniform(0.8, 1.2),
+                    'percent': base_change['percent'] * random.uniform(0.8, 1.2)
+                }
             else:
-                # 各省份基于全国均价随机波动
-                base_price = national_avg[product]
-                # 波动范围：-5% 到 +5%
-                variation = random.uniform(-0.05, 0.05)
-                price = base_price * (1 + variation)
-
-                # 涨跌也随机波动
-                if change_info[product]:
-                    base_change = change_info[product]['diff']
-                    base_percent = change_info[product]['percent']
-                    change = {
-                        'diff': base_change * random.uniform(0.8, 1.2),
-                        'percent': base_percent * random.uniform(0.8, 1.2)
-                    }
-                else:
-                    change = None
-
-            provincial_data[province][product] = {
-                'price': price,
-                'change': change
-            }
+                change = None
+
+            row.append((price, change))
+
+        provincial_data[region] = row
 
     return provincial_data
 
 
-def format_price_change(product_name, price, change):
-    """格式化价格和涨跌信息"""
-    # 生猪、仔猪、鸡蛋、淘汰鸡保留2位小数
-    # 玉米、豆粕保留整数
-    decimal_products = ['生猪', '仔猪', '鸡蛋', '淘汰鸡']
-    integer_products = ['玉米', '豆粕']
+def prepare_weekly_data(history, date=None):
+    """
+    计算周报所需的数据（本周和上周日期范围、周均价、涨跌、各省份数据）
+
+    Returns:
+        {'week_start', 'week_end', 'days', 'current_avg', 'change_info', 'provincial_data'}
+    """
+    week_start, week_end = get_week_range(date)
+    last_week_start, last_week_end = get_previous_week_range(date)
+
+    week_data = get_week_data(history, week_start, week_end)
+    current_avg = calculate_week_average(week_data)
+    previous_avg = calculate_week_average(get_week_data(history, last_week_start, last_week_end))
+    change_info = calculate_weekly_change(current_avg, previous_avg)
+
+    return {
+        'week_start': week_start,
+        'week_end': week_end,
+        'days': len(week_data),
+        'current_avg': current_avg,
+        'change_info': change_info,
+        'provincial_data': generate_mock_provincial_data(current_avg, change_info)
+    }
+
 
+def format_price_change(product, price, change):
+    """格式化价格和涨跌信息（product 为注册表中的产品，小数位数为 0 的产品显示整数）"""
     if price is None:
         return "无数据"
 
-    if product_name in decimal_products:
-        price_str = f"{price:.2f}"
-    elif product_name in integer_products:
-        price_str = f"{int(price)}"
-    else:
-        price_str = f"{price:.2f}"
+    price_str = registry.format_value(product, price)
 
     if change is None:
         return price_str
@@ -167,75 +188,68 @@ def format_price_change(product_name, price, change):
     diff = change['diff']
     percent = change['percent']
 
-    if diff > 0:
-        return f"{price_str}(+{diff:.2f if product_name in decimal_products else int(diff)},+{percent:.2f}%)"
-    elif diff < 0:
-        return f"{price_str}({diff:.2f if product_name in decimal_products else int(diff)},{percent:.2f}%)"
-    else:
+    # 涨跌方向按格式化后的数值判断，按小数位数舍去后为 0 的涨跌显示为持平（避免 +0.00、-0）
+    diff_str = registry.format_value(product, abs(diff))
+    if float(diff_str) == 0:
         return f"{price_str}(0,0%)"
+    if diff > 0:
+        return f"{price_str}(+{diff_str},+{abs(percent):.2f}%)"
+    return f"{price_str}(-{diff_str},-{abs(percent):.2f}%)"
+
 
+@traced('report.excel', result='file')
+def generate_excel_report(provincial_data, week_start, week_end, regions=None, filename=None, reg=registry):
+    """生成Excel周报（可指定地区序号列表和文件名，用于生成省份周报）"""
+    # openpyxl 导入较慢，只在实际生成Excel时加载
+    import openpyxl
+    from openpyxl.styles import Font, Alignment
+    from openpyxl.utils import get_column_letter
 
-def generate_excel_report(provincial_data, week_start, week_end):
-    """生成Excel周报"""
     wb = openpyxl.Workbook()
     sheet = wb.active
     sheet.title = "重点省份行情"
 
-    # 定义省份列表
-    provinces = ["全国", "河北", "山东", "河南", "湖北", "四川", "黑龙江", "陕西", "甘肃", "广西", "广东", "江西", "福建"]
-
-    # 第一个表格：生猪、仔猪、鸡蛋
-    data_table1 = [["地区", "生猪(元/kg)", "仔猪(元/kg)", "鸡蛋(元/kg)"]]
-
-    for province in provinces:
-        row = [province]
-        for product in ["生猪", "仔猪", "鸡蛋"]:
-            price = provincial_data[province][product]['price']
-            change = provincial_data[province][product]['change']
-            row.append(format_price_change(product, price, change))
-        data_table1.append(row)
-
-    # 第二个表格：淘汰鸡、玉米、豆粕
-    data_table2 = [["地区", "淘汰鸡(元/kg)", "玉米(元/吨)", "豆粕(元/吨)"]]
-
-    for province in provinces:
-        row = [province]
-        for product in ["淘汰鸡", "玉米", "豆粕"]:
-            price = provincial_data[province][product]['price']
-            change = provincial_data[province][product]['change']
-            row.append(format_price_change(product, price, change))
-        data_table2.append(row)
-
-    # 写入第一个表格
-    for row_idx, row_data in enumerate(data_table1, start=1):
-        for col_idx, value in enumerate(row_data, start=1):
-            cell = sheet.cell(row=row_idx, column=col_idx, value=value)
-            cell.font = Font(name="Calibri", size=12)
-            cell.alignment = Alignment(horizontal="left", vertical="center")
-
-    # 写入第二个表格
-    row_start_table2 = len(data_table1) + 2
-    for row_idx, row_data in enumerate(data_table2, start=row_start_table2):
-        for col_idx, value in enumerate(row_data, start=1):
-            cell = sheet.cell(row=row_idx, column=col_idx, value=value)
-            cell.font = Font(name="Calibri", size=12)
-            cell.alignment = Alignment(horizontal="left", vertical="center")
+    # 默认按注册表中的周报顺序列出全国及各省份
+    if regions is None:
+        regions = reg.report_order
+
+    # 产品按注册顺序每3个一张表格（生猪、仔猪、鸡蛋 / 淘汰鸡、玉米、豆粕）
+    tables = []
+    for columns in reg.report_tables:
+        products = [reg.products[index] for index in columns]
+        table = [["地区"] + [f"{product.name}({product.report_unit})" for product in products]]
+        for region in regions:
+            cells = provincial_data[region]
+            table.append([reg.regions[region].name] +
+                         [format_price_change(product, *cells[product.index]) for product in products])
+        tables.append(table)
+
+    # 依次写入各表格，表格之间空一行
+    row_start = 1
+    for table in tables:
+        for row_idx, row_data in enumerate(table, start=row_start):
+            for col_idx, value in enumerate(row_data, start=1):
+                cell = sheet.cell(row=row_idx, column=col_idx, value=value)
+                cell.font = Font(name="Calibri", size=12)
+                cell.alignment = Alignment(horizontal="left", vertical="center")
+        row_start += len(table) + 1
 
     # 设置列宽
     sheet.column_dimensions['A'].width = 12
-    sheet.column_dimensions['B'].width = 20
-    sheet.column_dimensions['C'].width = 20
-    sheet.column_dimensions['D'].width = 20
+    for col_idx in range(2, max(len(columns) for columns in reg.report_tables) + 2):
+        sheet.column_dimensions[get_column_letter(col_idx)].width = 20
 
     # 保存文件
-    week_str = week_start.strftime("%Y-%m-%d") + "至" + week_end.strftime("%Y-%m-%d")
-    filename = f"本周行情数据_{week_str}.xlsx"
+    if filename is None:
+        week_str = week_start.strftime("%Y-%m-%d") + "至" + week_end.strftime("%Y-%m-%d")
+        filename = f"本周行情数据_{week_str}.xlsx"
     wb.save(filename)
     print(f"✅ Excel周报已生成: {filename}")
     return filename
 
 
-def generate_txt_report(provincial_data, week_start, week_end, current_avg, change_info):
+@traced('report.txt', result='file')
+def generate_txt_report(provincial_data, week_start, week_end, current_avg, change_info, reg=registry):
     """生成TXT周报"""
     week_str = week_start.strftime("%Y年%m月%d日") + "至" + week_end.strftime("%m月%d日")
     filename = f"每周周报_{week_start.strftime('%Y-%m-%d')}至{week_end.strftime('%Y-%m-%d')}.txt"
@@ -243,36 +257,23 @@ def generate_txt_report(provincial_data, week_start, week_end, current_avg, chan
     # 生成市场分析
     market_analysis = []
 
-    for product in ["生猪", "仔猪", "鸡蛋", "淘汰鸡", "玉米", "豆粕"]:
-        avg_price = current_avg.get(product)
-        change = change_info.get(product)
+    for product in reg.products:
+        avg_price = current_avg[product.index]
+        change = change_info[product.index]
 
         if avg_price and change:
-            trend = "上涨" if change['diff'] > 0 else "下跌" if change['diff'] < 0 else "持平"
             trend_cn = "上涨" if change['diff'] > 0 else "下跌" if change['diff'] < 0 else "持平"
 
-            # 根据产品生成不同的分析文本
-            if product == "生猪":
-                analysis = f"{product}市场：全国均价 {avg_price:.2f}元/kg ({change['diff']:.2f}，环比{trend_cn})。"
-                analysis += "本周生猪价格呈现震荡调整态势。"
-            elif product == "仔猪":
-                analysis = f"{product}市场：全国均价 {avg_price:.2f}元/kg ({change['diff']:.2f}，环比{trend_cn})。"
-                analysis += "仔猪价格受补栏需求影响。"
-            elif product == "鸡蛋":
-                analysis = f"{product}市场：全国均价 {avg_price:.2f}元/kg ({change['diff']:.2f}，环比{trend_cn})。"
-                analysis += "鸡蛋价格受供需关系影响。"
-            elif product == "淘汰鸡":
-                analysis = f"{product}市场：全国均价 {avg_price:.2f}元/kg ({change['diff']:.2f}，环比{trend_cn})。"
-                analysis += "淘汰鸡价格受养殖结构调整影响。"
-            elif product == "玉米":
-                analysis = f"{product}市场：全国均价 {int(avg_price)}元/吨 ({int(change['diff'])}，环比{trend_cn})。"
-                analysis += "玉米价格受市场供应和需求影响。"
-            elif product == "豆粕":
-                analysis = f"{product}市场：全国均价 {int(avg_price)}元/吨 ({int(change['diff'])}，环比{trend_cn})。"
-                analysis += "豆粕价格受国际市场和国内供需影响。"
+            # 分析文本按注册表中各产品的小数位数、周报单位和文案生成
+            analysis = (f"{product.name}市场：全国均价 {reg.format_value(product, avg_price)}{product.report_unit} "
+                        f"({reg.format_value(product, change['diff'])}，环比{trend_cn})。")
+            analysis += product.analysis
 
             market_analysis.append(f"{len(market_analysis)+1}. {analysis}")
 
+    forecast = "\n\n".join(f"{number}. {product.name}市场：{product.forecast}"
+                           for number, product in enumerate(reg.products, start=1))
+
     content = f"""
 ========================================
         安佑预混料市场周报
@@ -292,20 +293,76 @@ def generate_txt_report(provincial_data, week_start, week_end, current_avg, chan
 二、下周市场预测
 ========================================
 
-1. 生猪市场：预计将根据市场供需关系进行调整。建议关注出栏进度及政策动向。
+{forecast}
+
+========================================
+三、数据来源及免责声明
+========================================
+
+本报告数据来源于安佑心科技市场监测系统及行业公开数据，仅供参考，不构成投资建议。市场有风险，投资需谨慎。
+
+联系方式：安佑心科技
+更新时间：每日上午9:00
+
+========================================
+"""
+
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(content.strip())
+
+    print(f"✅ TXT周报已生成: {filename}")
+    return filename
+
+
+@traced('report.txt', args=('province',), result='file')
+def generate_province_txt_report(province, provincial_data, week_start, week_end, reg=registry):
+    """生成单个省份的TXT周报（与全国及相邻省份对比）"""
+    week_str = week_start.strftime("%Y年%m月%d日") + "至" + week_end.strftime("%m月%d日")
+    filename = (f"省份周报_{province}_{week_start.strftime('%Y-%m-%d')}"
+                f"至{week_end.strftime('%Y-%m-%d')}.txt")
+    region = reg.regions[reg.lookup_region(province)]
+    local_row = provincial_data[region.index]
+    national_row = provincial_data[reg.national]
+    neighbors = [reg.regions[index].name for index in region.neighbors]
 
-2. 仔猪市场：预计受补栏需求影响，价格将保持相对稳定。
+    comparison = []
+    for product in reg.products:
+        local_price, local_change = local_row[product.index]
+        national_price, national_change = national_row[product.index]
 
-3. 鸡蛋市场：预计短期价格或继续震荡，关注节日需求变化。
+        lines = [f"{len(comparison)+1}. {product.name}"]
+        lines.append(f"   {province}：{format_price_change(product, local_price, local_change)}")
+        lines.append(f"   全国：{format_price_change(product, national_price, national_change)}")
 
-4. 淘汰鸡市场：预计受养殖结构调整影响，价格将有所波动。
+        if local_price is not None and national_price:
+            gap = (local_price - national_price) / national_price * 100
+            position = "高于" if gap > 0 else "低于" if gap < 0 else "持平于"
+            lines.append(f"   {province}均价{position}全国均价 {abs(gap):.2f}%")
 
-5. 玉米市场：预计将继续受市场供需影响，价格或维持震荡。
+        for neighbor in region.neighbors:
+            price, change = provincial_data[neighbor][product.index]
+            lines.append(f"   {reg.regions[neighbor].name}：{format_price_change(product, price, change)}")
 
-6. 豆粕市场：预计受国际市场影响，价格或维持低位运行。
+        comparison.append("\n".join(lines))
 
+    content = f"""
 ========================================
-三、数据来源及免责声明
+      安佑预混料市场周报（{province}）
+========================================
+
+报告周期：{week_str}
+发布时间：{datetime.now().strftime("%Y年%m月%d日 %H:%M")}
+编制单位：安佑心科技
+对比地区：全国、{'、'.join(neighbors) if neighbors else '无'}
+
+========================================
+一、本省行情与全国及周边对比
+========================================
+
+{chr(10).join(comparison)}
+
+========================================
+二、数据来源及免责声明
 ========================================
 
 本报告数据来源于安佑心科技市场监测系统及行业公开数据，仅供参考，不构成投资建议。市场有风险，投资需谨慎。
@@ -319,18 +376,89 @@ def generate_txt_report(provincial_data, week_start, week_end, current_avg, chan
     with open(filename, 'w', encoding='utf-8') as f:
         f.write(content.strip())
 
-    print(f"✅ TXT周报已生成: {filename}")
     return filename
 
 
-def update_weekly_report_index(excel_filename, txt_filename, week_start, week_end):
+def generate_province_report_set(province, provincial_data, week_start, week_end, reg=registry):
+    """生成单个省份的Excel和TXT周报，并返回各文件耗时（在进程池中执行）"""
+    region = reg.regions[reg.lookup_region(province)]
+    regions = [region.index, reg.national] + list(region.neighbors)
+    week_str = week_start.strftime("%Y-%m-%d") + "至" + week_end.strftime("%Y-%m-%d")
+
+    start = time.perf_counter()
+    excel_filename = generate_excel_report(
+        provincial_data, week_start, week_end,
+        regions=regions,
+        filename=f"省份行情数据_{province}_{week_str}.xlsx",
+        reg=reg
+    )
+    excel_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    txt_filename = generate_province_txt_report(province, provincial_data, week_start, week_end, reg)
+    txt_elapsed = time.perf_counter() - start
+
+    return {
+        'province': province,
+        'excel': excel_filename,
+        'txt': txt_filename,
+        'timings': {
+            'excel': excel_elapsed,
+            'txt': txt_elapsed
+        }
+    }
+
+
+def generate_province_reports(provincial_data, week_start, week_end, max_workers=None, mp_context=None,
+                              reg=registry):
+    """
+    使用进程池并行生成各省份周报
+
+    各省份数据在主进程中计算一次后分发给子进程，子进程只负责渲染文件。
+    在多线程环境中调用时应传入 spawn 上下文，避免 fork 复制其他线程持有的锁。
+
+    Returns:
+        各省份的报告信息列表（按注册表中的地区顺序）
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    provinces = [reg.regions[index].name for index in reg.provinces if provincial_data[index] is not None]
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+        futures = [
+            executor.submit(generate_province_report_set, province, provincial_data, week_start, week_end, reg)
+            for province in provinces
+        ]
+        reports = [future.result() for future in futures]
+
+    for report in reports:
+        timings = report['timings']
+        print(f"  ✅ {report['province']}: Excel {timings['excel']:.3f}s, TXT {timings['txt']:.3f}s")
+
+    return reports
+
+
+def update_weekly_report_index(excel_filename, txt_filename, week_start, week_end, province_reports=None):
     """更新周报索引文件"""
+    province_reports = province_reports or []
+    artifacts = [excel_filename, txt_filename]
+    for report in province_reports:
+        artifacts.extend([report['excel'], report['txt']])
+
     index = {
         'latest': {
             'week_start': week_start.strftime('%Y-%m-%d'),
             'week_end': week_end.strftime('%Y-%m-%d'),
             'excel': excel_filename,
             'txt': txt_filename,
+            'provinces': {
+                report['province']: {
+                    'excel': report['excel'],
+                    'txt': report['txt']
+                }
+                for report in province_reports
+            },
+            'artifacts': artifacts,
             'generated_at': datetime.now().isoformat()
         },
         'history': []
@@ -343,18 +471,20 @@ def update_weekly_report_index(excel_filename, txt_filename, week_start, week_en
             if 'history' in old_index:
                 index['history'] = old_index['history']
 
-    # 添加最新报告到历史
-    index['history'].insert(0, index['latest'])
-
-    # 只保留最近10周
-    if len(index['history']) > 10:
-        index['history'] = index['history'][:10]
+    # 添加最新报告到历史（同一周重新生成时替换旧记录），按周倒序保存全部历史
+    index['history'] = [
+        entry for entry in index['history']
+        if entry.get('week_start') != index['latest']['week_start']
+    ]
+    index['history'].append(index['latest'])
+    index['history'].sort(key=lambda entry: entry.get('week_start', ''), reverse=True)
 
     # 保存
     with open('weekly_report_index.json', 'w', encoding='utf-8') as f:
         json.dump(index, f, ensure_ascii=False, indent=2)
 
     print(f"✅ 周报索引已更新")
+    return index
 
 
 def main():
@@ -391,9 +521,9 @@ def main():
         print("第4步：计算周均价...")
         current_avg = calculate_week_average(week_data)
         print("  全国周均价:")
-        for product, price in current_avg.items():
+        for product, price in zip(registry.products, current_avg):
             if price:
-                print(f"    {product}: {price:.2f} 元")
+                print(f"    {product.name}: {price:.2f} 元")
         print()
 
         # 5. 获取上周数据并计算涨跌
@@ -402,16 +532,16 @@ def main():
         previous_avg = calculate_week_average(last_week_data)
         change_info = calculate_weekly_change(current_avg, previous_avg)
 
-        for product, change in change_info.items():
+        for product, change in zip(registry.products, change_info):
             if change:
                 trend = "上涨" if change['diff'] > 0 else "下跌" if change['diff'] < 0 else "持平"
-                print(f"    {product}: {change['diff']:.2f} 元 ({trend} {abs(change['percent']):.2f}%)")
+                print(f"    {product.name}: {change['diff']:.2f} 元 ({trend} {abs(change['percent']):.2f}%)")
         print()
 
         # 6. 生成各省份数据
         print("第6步：生成各省份数据...")
         provincial_data = generate_mock_provincial_data(current_avg, change_info)
-        print(f"  已生成 {len(provincial_data)} 个省份的数据")
+        print(f"  已生成 {len(registry.report_order)} 个地区的数据")
         print()
 
         # 7. 生成Excel报告
@@ -424,9 +554,16 @@ def main():
         txt_filename = generate_txt_report(provincial_data, week_start, week_end, current_avg, change_info)
         print()
 
-        # 9. 更新索引文件
-        print("第9步：更新周报索引...")
-        update_weekly_report_index(excel_filename, txt_filename, week_start, week_end)
+        # 9. 并行生成各省份周报
+        print("第9步：生成各省份周报...")
+        start = time.perf_counter()
+        province_reports = generate_province_reports(provincial_data, week_start, week_end)
+        print(f"  共生成 {len(province_reports)} 个省份的周报，耗时 {time.perf_counter() - start:.2f}s")
+        print()
+
+        # 10. 更新索引文件
+        print("第10步：更新周报索引...")
+        update_weekly_report_index(excel_filename, txt_filename, week_start, week_end, province_reports)
         print()
 
         print("=" * 60)
@@ -442,4 +579,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    run_with_profiling(main, 'weekly_report_generator')
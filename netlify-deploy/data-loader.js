@@ -4,10 +4,74 @@ class MarketDataLoader {
         this.data = null;
         this.githubRawUrl = 'https://raw.githubusercontent.com/rexlhb/anyu-market-data/main/market.json';
         this.storageUrl = 'https://coze-coding-project.tos.coze.site/coze_storage_7592784756627144744/anyu-market/market.json';
+        // 按产品拆分的分片及清单
+        this.shardBaseUrl = 'https://raw.githubusercontent.com/rexlhb/anyu-market-data/main/backend/shards/';
+        this.manifest = null;
+    }
+
+    // 加载分片清单（清单很小，每次都从网络获取）
+    async loadManifest() {
+        const response = await fetch(this.shardBaseUrl + 'manifest.json', { cache: 'no-cache' });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        this.manifest = await response.json();
+        return this.manifest;
+    }
+
+    // 按清单中的哈希加载分片：本地缓存的哈希一致时直接使用缓存，不再请求
+    async loadShard(entry) {
+        const cacheKey = `anyu-shard:${entry.path}`;
+        try {
+            const cached = JSON.parse(localStorage.getItem(cacheKey) || 'null');
+            if (cached && cached.hash === entry.hash) {
+                return cached.data;
+            }
+        } catch (error) {
+            // 缓存不可用时直接请求
+        }
+
+        const response = await fetch(`${this.shardBaseUrl}${entry.path}?v=${entry.hash}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const data = await response.json();
+        try {
+            localStorage.setItem(cacheKey, JSON.stringify({ hash: entry.hash, data: data }));
+        } catch (error) {
+            // 存储空间不足时忽略
+        }
+        return data;
+    }
+
+    // 只加载单个产品的最新行情（如 'pig'）
+    async loadProduct(productKey) {
+        const manifest = this.manifest || await this.loadManifest();
+        const entry = manifest.products[productKey];
+        if (!entry || !entry.latest) {
+            throw new Error(`找不到产品分片: ${productKey}`);
+        }
+        return this.loadShard(entry.latest);
+    }
+
+    // 加载单个产品的近期历史
+    async loadProductHistory(productKey) {
+        const manifest = this.manifest || await this.loadManifest();
+        const entry = manifest.products[productKey];
+        if (!entry || !entry.history) {
+            throw new Error(`找不到产品历史分片: ${productKey}`);
+        }
+        return this.loadShard(entry.history);
     }
 
     // 尝试从多个数据源加载数据
     async loadData() {
+        // 构建时已内联到页面中的数据，无需再发起请求
+        if (window.__MARKET_DATA__) {
+            this.data = window.__MARKET_DATA__;
+            return this.data;
+        }
+
         const sources = [
             this.githubRawUrl,
             this.storageUrl,